@@ -358,6 +358,14 @@ class ArchiveConvertOptionParser(ConvertOptionParser):
         self.initoutputarchive(options)
         return super(ArchiveConvertOptionParser, self).recursiveprocess(options)
 
+    def canprocessinparallel(self, options):
+        """archives are shared by all files, so they can't be processed in
+        parallel"""
+        for filepurpose in ("input", "output", "template"):
+            if self.isarchive(getattr(options, filepurpose, None), filepurpose):
+                return False
+        return super(ArchiveConvertOptionParser, self).canprocessinparallel(options)
+
     def processfile(self, fileprocessor, options, fullinputpath, fulloutputpath, fulltemplatepath):
         """run an invidividual conversion"""
         if self.isarchive(options.output, 'output'):
@@ -51,11 +51,12 @@ def convertpot(input_file, output_file, template_file, tm=None, min_similarity=7
     return 1
 
 
-def convert_stores(input_store, template_store, temp_store=None, tm=None, min_similarity=75, fuzzymatching=True, **kwargs):
+def convert_stores(input_store, template_store, temp_store=None, tm=None, min_similarity=75, fuzzymatching=True, jobs=1, **kwargs):
     """Actual conversion function, works on stores not files, returns
     a properly initialized pretranslated output store, with structure
     based on input_store, metadata based on template_store, migrates
-    old translations from template_store and pretranslating from tm"""
+    old translations from template_store and pretranslating from tm.
+    With jobs > 1 the fuzzy matching is spread over that many processes."""
 
     if temp_store is None:
         temp_store = input_store
@@ -78,6 +79,7 @@ def convert_stores(input_store, template_store, temp_store=None, tm=None, min_si
 
     # Do matching
     match_locations = isinstance(input_store, po.pofile) and input_store.parseheader().get('X-Accelerator-Marker') in ('&', '~')
+    matchers = pretranslate.parallel_matchers(temp_store.units, template_store, matchers, match_locations, jobs)
     for input_unit in temp_store.units:
         if input_unit.istranslatable():
             input_unit = pretranslate.pretranslate_unit(input_unit, template_store, matchers, mark_reused=True, match_locations=match_locations)
@@ -245,6 +247,8 @@ def main(argv=None):
     parser.add_option("--nofuzzymatching", dest="fuzzymatching", action="store_false",
         default=True, help="Disable fuzzy matching")
     parser.passthrough.append("fuzzymatching")
+    # a single file is fuzzy matched with --jobs processes
+    parser.passthrough.append("jobs")
     parser.run(argv)
 
 
@@ -618,6 +618,22 @@ msgstr ""
         print 'Expected:\n%s' % expected
         assert str(newpo) == expected
 
+    def test_parallel_fuzzy_matching(self):
+        """tests that fuzzy matching in several processes gives the same
+        output as the serial run"""
+        potsource = ''
+        posource = ''
+        for i in range(20):
+            potsource += '#: source%d.c:%d\nmsgid "Unit number %d has been changed"\nmsgstr ""\n\n' % (i, i, i)
+            posource += '#: source%d.c:%d\nmsgid "Unit number %d has changed"\nmsgstr "Eenheid %d het verander"\n\n' % (i, i, i, i)
+        potsource += 'msgid "Unit number 1 has changed"\nmsgstr ""\n'
+        serial = wStringIO.StringIO()
+        pot2po.convertpot(wStringIO.StringIO(potsource), serial, wStringIO.StringIO(posource))
+        parallel = wStringIO.StringIO()
+        pot2po.convertpot(wStringIO.StringIO(potsource), parallel, wStringIO.StringIO(posource), jobs=3)
+        assert "#, fuzzy" in serial.getvalue()
+        assert parallel.getvalue() == serial.getvalue()
+
 
 class TestPOT2POCommand(test_convert.TestConvertCommand, TestPOT2PO):
     """Tests running actual pot2po commands on files"""
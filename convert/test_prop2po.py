@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+
 from py.test import mark
 
 from translate.convert import prop2po
@@ -221,3 +223,16 @@ class TestProp2POCommand(test_convert.TestConvertCommand, TestProp2PO):
         options = self.help_check(options, "--personality=TYPE")
         options = self.help_check(options, "--encoding=ENCODING")
         options = self.help_check(options, "--duplicates=DUPLICATESTYLE", last=True)
+
+    def test_parallel_jobs(self):
+        """tests that processing files in parallel gives the same output"""
+        for i in range(5):
+            self.create_testfile(os.path.join("input", "sub%d" % (i % 2), "file%d.properties" % i),
+                                 "prop%d=Value number %d\nother=Other value\n" % (i, i))
+        self.run_command("input", "serial")
+        self.run_command("input", "parallel", jobs=3)
+        for i in range(5):
+            outputname = os.path.join("sub%d" % (i % 2), "file%d.po" % i)
+            serial = self.read_testfile(os.path.join("serial", outputname))
+            assert "Value number %d" % i in serial
+            assert self.read_testfile(os.path.join("parallel", outputname)) == serial
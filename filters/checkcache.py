@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""An on-disk cache of the results of the checks on units, so that units
+that didn't change since an earlier run of pofilter don't have to be checked
+again.
+
+Results are kept in an SQLite database, under a key made from everything
+the checks look at: the configuration, classes and tests of the checkers,
+and the source, translation, plural forms, fuzzy and review state,
+locations and alternative translations of the unit (see L{CheckCache.key}).
+The least recently used results are removed when the cache holds more than
+its maximum number of entries.
+
+Checkers with a suggestion store are not cached, since their results depend
+on the store.
+"""
+
+try:
+    from sqlite3 import dbapi2
+except ImportError:
+    from pysqlite2 import dbapi2
+import marshal
+import os
+import time
+
+from translate import __version__ as toolkitversion
+from translate.misc.hash import md5_f
+
+
+def defaultfile():
+    """Returns the database that check results are cached in by default"""
+    userdir = os.path.expanduser("~")
+    if os.name == "nt":
+        return os.path.join(userdir, "Translate Toolkit", "checkcache.db")
+    return os.path.join(userdir, ".translate_toolkit", "checkcache.db")
+
+
+def _plain(value):
+    """Returns value in a form whose repr doesn't change between runs"""
+    if hasattr(value, "code") and hasattr(value, "punctranslate"):
+        # language objects are identified by their code
+        return value.code
+    if isinstance(value, dict):
+        items = value.items()
+        items.sort()
+        return items
+    return value
+
+
+def configkey(config):
+    """Returns a string that describes the given CheckerConfig"""
+    items = config.__dict__.items()
+    items.sort()
+    return "\n".join(["%s=%r" % (name, _plain(value)) for name, value in items])
+
+
+def checkerkey(checker):
+    """Returns a string that describes the checks that checker runs, to
+    tell its results apart from those of other checkers. TeeCheckers are
+    described by the checkers they combine."""
+    checkers = getattr(checker, "checkers", [checker])
+    parts = [toolkitversion.sver, str(toolkitversion.build)]
+    for subchecker in checkers:
+        tests = subchecker.defaultfilters.keys()
+        tests.sort()
+        parts.append("%s.%s" % (subchecker.__class__.__module__,
+                                subchecker.__class__.__name__))
+        parts.append(" ".join(tests))
+        parts.append(configkey(subchecker.config))
+    return "\0".join(parts)
+
+
+def _strings(string):
+    """Returns all the forms of a (multi)string"""
+    return getattr(string, "strings", [string])
+
+
+class CheckCache(object):
+    """The results of a checker, cached in the database at cachefile.
+
+    The hits and misses attributes count the units that were looked up in
+    this instance, and evictions the results removed to keep the cache below
+    maxentries. Changes are only written to the database by L{close}."""
+
+    maxentries = 500000
+    """The default maximum number of cached results"""
+
+    def __init__(self, checker, cachefile=None, maxentries=None):
+        if not cachefile:
+            cachefile = defaultfile()
+        cachedir = os.path.dirname(os.path.abspath(cachefile))
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        self.cachefile = cachefile
+        if maxentries is not None:
+            self.maxentries = maxentries
+        self.checker = checker
+        self.checkerkey = checkerkey(checker)
+        self.con = dbapi2.connect(cachefile)
+        self.con.text_factory = str
+        self.cur = self.con.cursor()
+        self.cur.execute("""CREATE TABLE IF NOT EXISTS checkresults(
+            key TEXT PRIMARY KEY,
+            failures BLOB,
+            lastused INTEGER);""")
+        self.cur.execute("""CREATE INDEX IF NOT EXISTS lastusedindex
+            ON checkresults(lastused);""")
+        self.con.commit()
+        self.now = int(time.time())
+        self._used = []
+        self._new = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cacheable(self):
+        """Returns whether the results of the checker can be cached"""
+        for checker in getattr(self.checker, "checkers", [self.checker]):
+            if getattr(checker, "suggestion_store", None):
+                return False
+        return True
+
+    def key(self, unit):
+        """Returns the cache key of the results of the checker on unit"""
+        parts = [self.checkerkey]
+        for string in _strings(unit.source) + [u"\1"] + _strings(unit.target):
+            parts.append(unicode(string or u"").encode("utf-8"))
+        parts.append(repr((unit.hasplural(), unit.isfuzzy(), unit.isreview(),
+                           unit.getlocations())))
+        getalttrans = getattr(unit, "getalttrans", None)
+        if getalttrans is not None:
+            parts.append(repr([unicode(alttrans.target) for alttrans in getalttrans()]))
+        return md5_f("\0".join(parts)).hexdigest()
+
+    def get(self, key):
+        """Returns the failures cached under key, or None"""
+        data = self._new.get(key)
+        if data is None:
+            self.cur.execute("""SELECT failures FROM checkresults
+                WHERE key=?;""", (key,))
+            row = self.cur.fetchone()
+            if row is not None:
+                data = str(row[0])
+        failures = None
+        if data is not None:
+            try:
+                failures = marshal.loads(data)
+            except (EOFError, ValueError, TypeError), e:
+                # a damaged entry, that will be replaced
+                pass
+        if failures is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._used.append(key)
+        return failures
+
+    def set(self, key, failures):
+        """Caches failures (a dictionary of test names and messages) under
+        key"""
+        try:
+            self._new[key] = marshal.dumps(failures)
+        except ValueError, e:
+            # messages that aren't strings, from an errorhandler
+            pass
+
+    def run_filters(self, unit):
+        """Returns the failures of the checker on unit, from the cache or by
+        running its tests"""
+        if not self.cacheable():
+            return self.checker.run_filters(unit)
+        key = self.key(unit)
+        failures = self.get(key)
+        if failures is None:
+            failures = self.checker.run_filters(unit)
+            self.set(key, failures)
+        return failures
+
+    def evict(self):
+        """Removes the least recently used results until the cache holds no
+        more than maxentries"""
+        self.cur.execute("""SELECT COUNT(*) FROM checkresults;""")
+        excess = self.cur.fetchone()[0] - self.maxentries
+        if excess <= 0:
+            return
+        self.cur.execute("""DELETE FROM checkresults WHERE key IN
+            (SELECT key FROM checkresults ORDER BY lastused LIMIT ?);""", (excess,))
+        self.evictions += excess
+
+    def flush(self):
+        """Writes the new results and the use of cached ones to the
+        database"""
+        self.cur.executemany("""INSERT OR REPLACE INTO checkresults
+            (key, failures, lastused) VALUES (?, ?, ?);""",
+            [(key, dbapi2.Binary(data), self.now)
+             for key, data in self._new.iteritems()])
+        self.cur.executemany("""UPDATE checkresults SET lastused=?
+            WHERE key=?;""", [(self.now, key) for key in self._used])
+        self._new = {}
+        self._used = []
+        self.evict()
+        self.con.commit()
+
+    def close(self):
+        """Flushes the changes and closes the database"""
+        self.flush()
+        self.cur.close()
+        self.con.close()
+
+    def report(self):
+        """Returns a line that describes how well the cache served"""
+        total = self.hits + self.misses
+        hitrate = 0.0
+        if total:
+            hitrate = 100.0 * self.hits / total
+        return "check cache: %d of %d units (%.1f%%) from the cache, %d evicted" % \
+               (self.hits, total, hitrate, self.evictions)
@@ -35,7 +35,6 @@ import re
 from translate.filters import helpers
 from translate.filters import decoration
 from translate.filters import prefilters
-from translate.filters import spelling
 from translate.lang import factory
 from translate.lang import data
 
@@ -252,10 +251,110 @@ def cache_results(f):
     return cached_f
 
 
+brackets = (u"[", u"]", u"{", u"}", u"(", u")")
+
+
+class StringFeatures(object):
+    """The features of a string that the tests compare, like its printf
+    variables, numbers or XML tags. Every feature is extracted the first time
+    a test asks for it, and then kept.
+
+    Features that depend on the language are extracted for the source
+    language if issource is true, and for the target language otherwise.
+    The checker keeps the features of source strings across units (see
+    L{UnitChecker.sourcefeatures}), since sources are often repeated."""
+
+    def __init__(self, checker, string, issource):
+        self.checker = checker
+        self.string = string
+        self.issource = issource
+
+    def __getattr__(self, name):
+        # only called for features that were not extracted yet
+        extract = getattr(self.__class__, "extract_" + name, None)
+        if extract is None:
+            raise AttributeError(name)
+        value = extract(self)
+        setattr(self, name, value)
+        return value
+
+    def extract_printf(self):
+        return list(printf_pat.finditer(self.string))
+
+    def extract_variables(self):
+        """the variables for every one of config.varmatches"""
+        return [varchecker(self.string) for varchecker in self.checker.varcheckers]
+
+    def validaccel(self):
+        if self.issource:
+            return self.checker.config.sourcelang.validaccel
+        return self.checker.config.lang.validaccel
+
+    def extract_accelerators(self):
+        """(count, countbad) for every one of config.accelmarkers"""
+        string = self.checker.filtervariables(self.string)
+        return [decoration.countaccelerators(accelmarker, self.validaccel())(string)
+                for accelmarker in self.checker.config.accelmarkers]
+
+    def extract_badaccelerators(self):
+        """the invalid accelerators for every one of config.accelmarkers"""
+        string = self.checker.filtervariables(self.string)
+        return [decoration.getaccelerators(accelmarker, self.validaccel())(string)[1]
+                for accelmarker in self.checker.config.accelmarkers]
+
+    def extract_numbers(self):
+        return decoration.getnumbers(self.string)
+
+    def extract_emails(self):
+        return decoration.getemails(self.string)
+
+    def extract_urls(self):
+        return decoration.geturls(self.string)
+
+    def extract_tags(self):
+        return tag_re.findall(self.string)
+
+    def extract_tagproperties(self):
+        config = self.checker.config
+        return [intuplelist(tagproperty, config.canchangetags)
+                for tagproperty in tagproperties(self.tags, config.ignoretags)]
+
+    def extract_brackets(self):
+        string = self.checker.filtervariables(self.string)
+        return [string.count(bracket) for bracket in brackets]
+
+    def extract_startpunc(self):
+        checker = self.checker
+        string = checker.filterxml(checker.filterwordswithpunctuation(
+                     checker.filteraccelerators(checker.filtervariables(self.string))))
+        if self.issource:
+            string = checker.config.lang.punctranslate(string)
+        return decoration.puncstart(string, checker.config.punctuation)
+
+    def extract_endpunc(self):
+        checker = self.checker
+        string = checker.filtervariables(self.string)
+        if self.issource:
+            string = checker.config.lang.punctranslate(string)
+        return decoration.puncend(string.rstrip(), checker.config.endpunctuation + u":")
+
+    def extract_caps(self):
+        """(capitals, letters, length) after removing variables"""
+        string = self.checker.removevariables(self.string)
+        if self.issource:
+            # TODO: review this. The 'I' is specific to English, so it
+            # probably serves no purpose to get sourcelang.sentenceend
+            string = re.sub(u"[^%s]( I )" % self.checker.config.sourcelang.sentenceend, u" i ", string)
+        return (helpers.filtercount(string, unicode.isupper),
+                helpers.filtercount(string, unicode.isalpha), len(string))
+
+
 class UnitChecker(object):
     """Parent Checker class which does the checking based on functions available
     in derived classes."""
     preconditions = {}
+    sourcefeatureslimit = 10000
+    """The number of source strings to keep the L{StringFeatures} of"""
 
     def __init__(self, checkerconfig=None, excludefilters=None,
                  limitfilters=None, errorhandler=None):
@@ -298,6 +397,10 @@ class UnitChecker(object):
     def setconfig(self, config):
         """sets the accelerator list"""
         self.config = config
+        self.plan = None
+        self.sourcefeaturescache = (None, {})
+        self.varcheckers = [decoration.getvariables(startmatch, endmatch)
+                for startmatch, endmatch in self.config.varmatches]
         self.accfilters = [prefilters.filteraccelerators(accelmarker) for accelmarker in self.config.accelmarkers]
         self.varfilters = [prefilters.filtervariables(startmatch, endmatch, prefilters.varname)
                 for startmatch, endmatch in self.config.varmatches]
@@ -312,6 +415,44 @@ class UnitChecker(object):
         if self.suggestion_store:
             self.suggestion_store.require_index()
 
+    def sourcefeatures(self, str1):
+        """returns the L{StringFeatures} of the source string str1
+
+        These are kept across units, until the language changes. When more
+        than sourcefeatureslimit strings are kept, they are all dropped."""
+        lang, cache = self.sourcefeaturescache
+        if lang is not self.config.lang:
+            cache = {}
+            self.sourcefeaturescache = (self.config.lang, cache)
+        # plain unicode keys, since comparing multistrings is slow
+        key = unicode(str1)
+        features = cache.get(key)
+        if features is None:
+            if len(cache) >= self.sourcefeatureslimit:
+                cache.clear()
+            features = cache[key] = StringFeatures(self, str1, True)
+        return features
+
+    def targetfeatures(self, str2):
+        """returns the L{StringFeatures} of the translation str2, that are
+        kept for the current unit"""
+        key = ("targetfeatures", unicode(str2))
+        features = self.results_cache.get(key)
+        if features is None:
+            features = self.results_cache[key] = StringFeatures(self, str2, False)
+        return features
+
+    def features(self, str1, str2):
+        """returns the L{StringFeatures} of str1 and str2, for a test to
+        compare"""
+        # the tests of a unit are mostly given the same two strings
+        last = self.results_cache.get("features")
+        if last is not None and last[0] is str1 and last[1] is str2:
+            return last[2]
+        pair = (self.sourcefeatures(str1), self.targetfeatures(str2))
+        self.results_cache["features"] = (str1, str2, pair)
+        return pair
+
     def filtervariables(self, str1):
         """filter out variables from str1"""
         return helpers.multifilter(str1, self.varfilters)
@@ -348,16 +489,46 @@ class UnitChecker(object):
         Note that this can raise a FilterFailure as part of normal operation"""
         return test(unit)
 
-    def run_filters(self, unit):
-        """run all the tests in this suite, return failures as testname,
-        message_or_exception"""
-        self.results_cache = {}
-        failures = {}
-        ignores = self.config.lang.ignoretests[:]
-        functionnames = self.defaultfilters.keys()
-        priorityfunctionnames = self.preconditions.keys()
-        otherfunctionnames = filter(lambda functionname: functionname not in self.preconditions, functionnames)
-        for functionname in priorityfunctionnames + otherfunctionnames:
+    def orderedpreconditions(self):
+        """returns the names of the preconditions, ordered so that every
+        precondition comes before the preconditions that it makes us ignore"""
+        ignoredby = {}
+        for functionname, ignored in self.preconditions.iteritems():
+            ignoredby.setdefault(functionname, 0)
+            for ignoredfunctionname in ignored:
+                if ignoredfunctionname in self.preconditions:
+                    ignoredby[ignoredfunctionname] = ignoredby.get(ignoredfunctionname, 0) + 1
+        ready = [functionname for functionname, count in ignoredby.iteritems() if count == 0]
+        ready.sort()
+        ordered = []
+        while ready:
+            functionname = ready.pop(0)
+            ordered.append(functionname)
+            for ignoredfunctionname in self.preconditions[functionname]:
+                if ignoredfunctionname in ignoredby:
+                    ignoredby[ignoredfunctionname] -= 1
+                    if ignoredby[ignoredfunctionname] == 0:
+                        ready.append(ignoredfunctionname)
+                        ready.sort()
+        # preconditions in a cycle are run last, in name order
+        remaining = [functionname for functionname in self.preconditions if functionname not in ordered]
+        remaining.sort()
+        return ordered + remaining
+
+    def compileplan(self):
+        """returns the tests that run_filters() runs, as a list of
+        (functionname, filterfunction, filtermessage, isfilter, ignored)
+
+        The preconditions come first (see L{orderedpreconditions}), and the
+        tests ignored for the language are left out. isfilter says whether a
+        failure is reported, since some preconditions aren't filters
+        themselves, and ignored are the tests to skip if the test fails."""
+        ignores = self.config.lang.ignoretests
+        otherfunctionnames = [functionname for functionname in self.defaultfilters
+                              if functionname not in self.preconditions]
+        otherfunctionnames.sort()
+        plan = []
+        for functionname in self.orderedpreconditions() + otherfunctionnames:
             if functionname in ignores:
                 continue
             filterfunction = getattr(self, functionname, None)
@@ -365,7 +536,27 @@ class UnitChecker(object):
             # using TeeChecker
             if filterfunction is None:
                 continue
-            filtermessage = filterfunction.__doc__
+            plan.append((functionname, filterfunction, filterfunction.__doc__,
+                         functionname in self.defaultfilters,
+                         self.preconditions.get(functionname, ())))
+        return plan
+
+    def getplan(self):
+        """returns the plan from L{compileplan}, compiling it again if the
+        language changed since it was last used"""
+        if self.plan is None or self.plan[0] is not self.config.lang:
+            self.plan = (self.config.lang, self.compileplan())
+        return self.plan[1]
+
+    def run_filters(self, unit):
+        """run all the tests in this suite, return failures as testname,
+        message_or_exception"""
+        self.results_cache = {}
+        failures = {}
+        ignores = {}
+        for functionname, filterfunction, filtermessage, isfilter, ignored in self.getplan():
+            if functionname in ignores:
+                continue
             try:
                 filterresult = self.run_test(filterfunction, unit)
             except FilterFailure, e:
@@ -381,11 +572,10 @@ class UnitChecker(object):
             if not filterresult:
                 # we test some preconditions that aren't actually a cause for
                 # failure
-                if functionname in self.defaultfilters:
+                if isfilter:
                     failures[functionname] = filtermessage
-                if functionname in self.preconditions:
-                    for ignoredfunctionname in self.preconditions[functionname]:
-                        ignores.append(ignoredfunctionname)
+                for ignoredfunctionname in ignored:
+                    ignores[ignoredfunctionname] = True
         self.results_cache = {}
         return failures
 
@@ -643,13 +833,16 @@ class StandardChecker(TranslationChecker):
         # self.hasplural only set by run_filters, not always available
         if 'hasplural' in self.__dict__:
             plural = self.hasplural
-        for var_num2, match2 in enumerate(printf_pat.finditer(str2)):
+        features1, features2 = self.features(str1, str2)
+        printf1 = features1.printf
+        printf2 = features2.printf
+        for var_num2, match2 in enumerate(printf2):
             count2 = var_num2 + 1
             str2ord = match2.group('ord')
             str2key = match2.group('key')
             if str2ord:
                 str1ord = None
-                for var_num1, match1 in enumerate(printf_pat.finditer(str1)):
+                for var_num1, match1 in enumerate(printf1):
                     count1 = var_num1 + 1
                     if match1.group('ord'):
                         if str2ord == match1.group('ord'):
@@ -664,7 +857,7 @@ class StandardChecker(TranslationChecker):
                     raise FilterFailure(u"Added printf variable: %s" % match2.group())
             elif str2key:
                 str1key = None
-                for var_num1, match1 in enumerate(printf_pat.finditer(str1)):
+                for var_num1, match1 in enumerate(printf1):
                     count1 = var_num1 + 1
                     if match1.group('key') and str2key == match1.group('key'):
                         str1key = match1.group('key')
@@ -676,7 +869,7 @@ class StandardChecker(TranslationChecker):
                 if str1key == None:
                     raise FilterFailure(u"Added printf variable: %s" % match2.group())
             else:
-                for var_num1, match1 in enumerate(printf_pat.finditer(str1)):
+                for var_num1, match1 in enumerate(printf1):
                     count1 = var_num1 + 1
                     # '%.0s' "placeholder" in plural will match anything
                     if plural and match2.group('fullvar') == '.0s':
@@ -685,7 +878,7 @@ class StandardChecker(TranslationChecker):
                         raise FilterFailure(u"Different printf variable: %s" % match2.group())
 
         if count2 is None:
-            str1_variables = list(m.group() for m in printf_pat.finditer(str1))
+            str1_variables = [m.group() for m in printf1]
             if str1_variables:
                 raise FilterFailure(u"Missing printf variable: %s" % u", ".join(str1_variables))
 
@@ -695,20 +888,16 @@ class StandardChecker(TranslationChecker):
 
     def accelerators(self, str1, str2):
         """checks whether accelerators are consistent between the two strings"""
-        str1 = self.filtervariables(str1)
-        str2 = self.filtervariables(str2)
+        features1, features2 = self.features(str1, str2)
+        counts = zip(self.config.accelmarkers, features1.accelerators,
+                     features2.accelerators)
         messages = []
-        for accelmarker in self.config.accelmarkers:
-            counter1 = decoration.countaccelerators(accelmarker, self.config.sourcelang.validaccel)
-            counter2 = decoration.countaccelerators(accelmarker, self.config.lang.validaccel)
-            count1, countbad1 = counter1(str1)
-            count2, countbad2 = counter2(str2)
-            getaccel = decoration.getaccelerators(accelmarker, self.config.lang.validaccel)
-            accel2, bad2 = getaccel(str2)
+        for index, (accelmarker, (count1, countbad1), (count2, countbad2)) in enumerate(counts):
             if count1 == count2:
                 continue
             if count1 == 1 and count2 == 0:
                 if countbad2 == 1:
+                    bad2 = features2.badaccelerators[index]
                     messages.append(u"Accelerator '%s' appears before an invalid "
                                     "accelerator character '%s'" %
                                     (accelmarker, bad2[0]))
@@ -751,8 +940,10 @@ class StandardChecker(TranslationChecker):
         messages = []
         mismatch1, mismatch2 = [], []
         varnames1, varnames2 = [], []
-        for startmarker, endmarker in self.config.varmatches:
-            varchecker = decoration.getvariables(startmarker, endmarker)
+        features1, features2 = self.features(str1, str2)
+        variables = zip(self.config.varmatches, features1.variables,
+                        features2.variables)
+        for (startmarker, endmarker), vars1, vars2 in variables:
             if startmarker and endmarker:
                 if isinstance(endmarker, int):
                     redecorate = lambda var: startmarker + var
@@ -762,8 +953,6 @@ class StandardChecker(TranslationChecker):
                 redecorate = lambda var: startmarker + var
             else:
                 redecorate = lambda var: var
-            vars1 = varchecker(str1)
-            vars2 = varchecker(str2)
             if vars1 != vars2:
                 # we use counts to compare so we can handle multiple variables
                 vars1, vars2 = [var for var in vars1 if vars1.count(var) > vars2.count(var)], \
@@ -797,14 +986,16 @@ class StandardChecker(TranslationChecker):
 
     def emails(self, str1, str2):
         """checks that emails are not translated"""
-        if helpers.funcmatch(str1, str2, decoration.getemails):
+        features1, features2 = self.features(str1, str2)
+        if features1.emails == features2.emails:
             return True
         else:
             raise FilterFailure(u"Different e-mails")
 
     def urls(self, str1, str2):
         """checks that URLs are not translated"""
-        if helpers.funcmatch(str1, str2, decoration.geturls):
+        features1, features2 = self.features(str1, str2)
+        if features1.urls == features2.urls:
             return True
         else:
             raise FilterFailure(u"Different URLs")
@@ -812,7 +1003,8 @@ class StandardChecker(TranslationChecker):
     def numbers(self, str1, str2):
         """checks whether numbers of various forms are consistent between the
         two strings"""
-        if helpers.countsmatch(str1, str2, decoration.getnumbers(str1)):
+        features1, features2 = self.features(str1, str2)
+        if helpers.countsmatch(str1, str2, features1.numbers):
             return True
         else:
             raise FilterFailure(u"Different numbers")
@@ -834,22 +1026,16 @@ class StandardChecker(TranslationChecker):
 
     def startpunc(self, str1, str2):
         """checks whether punctuation at the beginning of the strings match"""
-        str1 = self.filterxml(self.filterwordswithpunctuation(self.filteraccelerators(self.filtervariables(str1))))
-        str1 = self.config.lang.punctranslate(str1)
-        str2 = self.filterxml(self.filterwordswithpunctuation(self.filteraccelerators(self.filtervariables(str2))))
-        if helpers.funcmatch(str1, str2, decoration.puncstart, self.config.punctuation):
+        features1, features2 = self.features(str1, str2)
+        if features1.startpunc == features2.startpunc:
             return True
         else:
             raise FilterFailure(u"Different punctuation at the start")
 
     def endpunc(self, str1, str2):
         """checks whether punctuation at the end of the strings match"""
-        str1 = self.filtervariables(str1)
-        str1 = self.config.lang.punctranslate(str1)
-        str2 = self.filtervariables(str2)
-        str1 = str1.rstrip()
-        str2 = str2.rstrip()
-        if helpers.funcmatch(str1, str2, decoration.puncend, self.config.endpunctuation + u":"):
+        features1, features2 = self.features(str1, str2)
+        if features1.endpunc == features2.endpunc:
             return True
         else:
             raise FilterFailure(u"Different punctuation at the end")
@@ -868,14 +1054,12 @@ class StandardChecker(TranslationChecker):
 
     def brackets(self, str1, str2):
         """checks that the number of brackets in both strings match"""
-        str1 = self.filtervariables(str1)
-        str2 = self.filtervariables(str2)
         messages = []
         missing = []
         extra = []
-        for bracket in (u"[", u"]", u"{", u"}", u"(", u")"):
-            count1 = str1.count(bracket)
-            count2 = str2.count(bracket)
+        features1, features2 = self.features(str1, str2)
+        counts = zip(brackets, features1.brackets, features2.brackets)
+        for bracket, count1, count2 in counts:
             if count2 < count1:
                 missing.append(u"'%s'" % bracket)
             elif count2 > count1:
@@ -931,15 +1115,9 @@ class StandardChecker(TranslationChecker):
 
     def simplecaps(self, str1, str2):
         """checks the capitalisation of two strings isn't wildly different"""
-        str1 = self.removevariables(str1)
-        str2 = self.removevariables(str2)
-        # TODO: review this. The 'I' is specific to English, so it probably
-        # serves no purpose to get sourcelang.sentenceend
-        str1 = re.sub(u"[^%s]( I )" % self.config.sourcelang.sentenceend, u" i ", str1)
-        capitals1 = helpers.filtercount(str1, unicode.isupper)
-        capitals2 = helpers.filtercount(str2, unicode.isupper)
-        alpha1 = helpers.filtercount(str1, unicode.isalpha)
-        alpha2 = helpers.filtercount(str2, unicode.isalpha)
+        features1, features2 = self.features(str1, str2)
+        capitals1, alpha1, length1 = features1.caps
+        capitals2, alpha2, length2 = features2.caps
         # Capture the all caps case
         if capitals1 == alpha1:
             if capitals2 == alpha2:
@@ -950,14 +1128,14 @@ class StandardChecker(TranslationChecker):
         # vaguely the same
         if capitals1 == 0 or capitals1 == 1:
             success = capitals2 == capitals1
-        elif capitals1 < len(str1) / 10:
-            success = capitals2 <= len(str2) / 8
-        elif len(str1) < 10:
+        elif capitals1 < length1 / 10:
+            success = capitals2 <= length2 / 8
+        elif length1 < 10:
             success = abs(capitals1 - capitals2) < 3
-        elif capitals1 > len(str1) * 6 / 10:
-            success = capitals2 > len(str2) * 6 / 10
+        elif capitals1 > length1 * 6 / 10:
+            success = capitals2 > length2 * 6 / 10
         else:
-            success = abs(capitals1 - capitals2) < (len(str1) + len(str2)) / 6
+            success = abs(capitals1 - capitals2) < (length1 + length2) / 6
         if success:
             return True
         else:
@@ -1058,29 +1236,19 @@ class StandardChecker(TranslationChecker):
 
     def xmltags(self, str1, str2):
         """checks that XML/HTML tags have not been translated"""
-        tags1 = tag_re.findall(str1)
+        features1, features2 = self.features(str1, str2)
+        tags1 = features1.tags
         if len(tags1) > 0:
             if (len(tags1[0]) == len(str1)) and not u"=" in tags1[0]:
                 return True
-            tags2 = tag_re.findall(str2)
-            properties1 = tagproperties(tags1, self.config.ignoretags)
-            properties2 = tagproperties(tags2, self.config.ignoretags)
-            filtered1 = []
-            filtered2 = []
-            for property1 in properties1:
-                filtered1 += [intuplelist(property1, self.config.canchangetags)]
-            for property2 in properties2:
-                filtered2 += [intuplelist(property2, self.config.canchangetags)]
-
             # TODO: consider the consequences of different ordering of
             # attributes/tags
-            if filtered1 != filtered2:
+            if features1.tagproperties != features2.tagproperties:
                 raise FilterFailure(u"Different XML tags")
         else:
             # No tags in str1, let's just check that none were added in str2.
             # This might be useful for fuzzy strings wrongly unfuzzied.
-            tags2 = tag_re.findall(str2)
-            if len(tags2) > 0:
+            if len(features2.tags) > 0:
                 raise FilterFailure(u"Added XML tags")
         return True
 
@@ -1120,6 +1288,8 @@ class StandardChecker(TranslationChecker):
         """checks words that don't pass a spell check"""
         if not self.config.targetlanguage:
             return True
+        # imported here, since enchant is slow to load and seldom used
+        from translate.filters import spelling
         if not spelling.available:
             return True
         # TODO: filterxml?
@@ -1127,15 +1297,15 @@ class StandardChecker(TranslationChecker):
                                                self.config.sourcelang.validaccel)
         str2 = self.filteraccelerators_by_list(self.filtervariables(str2),
                                                self.config.lang.validaccel)
-        ignore1 = []
+        ignore1 = [word for word, index in spelling.errors(str1, lang="en")]
         messages = []
-        for word, index, suggestions in spelling.check(str1, lang="en"):
-            ignore1.append(word)
-        for word, index, suggestions in spelling.check(str2, lang=self.config.targetlanguage):
+        for word, index in spelling.errors(str2, lang=self.config.targetlanguage):
             if word in self.config.notranslatewords:
                 continue
             if word in ignore1:
                 continue
+            # only ask for suggestions for words that might be reported
+            suggestions = spelling.suggest(word, self.config.targetlanguage)
             # hack to ignore hyphenisation rules
             if word in suggestions:
                 continue
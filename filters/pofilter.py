@@ -29,6 +29,7 @@ for full descriptions of all tests
 """
 
 import os
+import sys
 
 from translate.storage import factory
 from translate.storage.poheader import poheader
@@ -77,6 +78,11 @@ class pocheckfilter:
                                          checkerclasses=checkerclasses,
                                          languagecode=checkerconfig.targetlanguage)
         self.options = options
+        self.checkcache = None
+        if getattr(options, "checkcache", None):
+            from translate.filters import checkcache
+            self.checkcache = checkcache.CheckCache(self.checker, options.checkcache,
+                                                    getattr(options, "checkcachesize", None))
 
     def getfilterdocs(self):
         """lists the docs for filters available on checker..."""
@@ -93,7 +99,10 @@ class pocheckfilter:
             return []
         if not self.options.includereview and unit.isreview():
             return []
-        failures = self.checker.run_filters(unit)
+        if self.checkcache is None:
+            failures = self.checker.run_filters(unit)
+        else:
+            failures = self.checkcache.run_filters(unit)
         if failures and self.options.autocorrect:
             # we can't get away with bad unquoting / requoting if we're going to change the result...
             correction = autocorrect.correct(unit.source, unit.target)
@@ -162,7 +171,20 @@ class FilterOptionParser(optrecurse.RecursiveOptionParser):
         if options.listfilters:
             print options.checkfilter.getfilterdocs()
         else:
-            self.recursiveprocess(options)
+            try:
+                self.recursiveprocess(options)
+            finally:
+                checkcache = options.checkfilter.checkcache
+                if checkcache is not None:
+                    checkcache.close()
+                    print >> sys.stderr, checkcache.report()
+
+    def canprocessinparallel(self, options):
+        """the check cache is kept by this process, so files are not checked
+        in worker processes while it is used"""
+        if options.checkfilter.checkcache is not None:
+            return False
+        return optrecurse.RecursiveOptionParser.canprocessinparallel(self, options)
 
 
 def runfilter(inputfile, outputfile, templatefile, checkfilter=None):
@@ -235,6 +257,12 @@ def cmdlineparser():
     parser.add_option("", "--validcharsfile", dest="validcharsfile",
         default=None, type="string", metavar="FILE",
         help="read list of all valid characters from FILE (must be in UTF-8)")
+    parser.add_option("", "--checkcache", dest="checkcache",
+        default=None, type="string", metavar="FILE",
+        help="cache the results of the checks in FILE, to reuse them for unchanged units in later runs")
+    parser.add_option("", "--checkcachesize", dest="checkcachesize",
+        default=None, type="int", metavar="ENTRIES",
+        help="keep at most ENTRIES results in the check cache (default: 500000)")
     parser.passthrough.append('checkfilter')
     parser.description = __doc__
     return parser
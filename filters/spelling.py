@@ -19,37 +19,199 @@
 # along with translate; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
-"""An API to provide spell checking for use in checks or elsewhere."""
+"""An API to provide spell checking for use in checks or elsewhere.
 
+Whether a word is spelled correctly is remembered in a L{WordCache} for every
+language, and suggestions are only asked from the dictionary by L{suggest},
+for the words that are reported. If cachedir is set (from the
+TRANSLATE_SPELLCACHE environment variable by default), the words are kept
+in it between runs, for as long as the same dictionary is used."""
+
+import atexit
+import marshal
+import os
 import sys
+import tempfile
+import warnings
 
 available = False
 
 try:
     # Enchant
-    from enchant import checker, DictNotFoundError, Error as EnchantError
+    import enchant
+    from enchant import Error as EnchantError
+    from enchant.tokenize import get_tokenizer, TokenizerNotFoundError
     available = True
-    checkers = {}
+except ImportError:
+    pass
 
-    def check(text, lang):
-        if not lang in checkers:
-            try:
-                checkers[lang] = checker.SpellChecker(lang)
-                # some versions only report an error when checking something
-                checkers[lang].check(u'bla')
-            except EnchantError, e:
-                # sometimes this is raised instead of DictNotFoundError
-                print >> sys.stderr, str(e)
-                checkers[lang] = None
-
-        if not checkers[lang]:
+cachedir = os.environ.get("TRANSLATE_SPELLCACHE") or None
+"""The directory that the L{WordCache}s are saved in, or None"""
+
+
+class WordCache(object):
+    """A dictionary that only keeps the maxsize most recently used words.
+
+    Words are kept in two generations: when the recent one is full, it
+    replaces the old one, and words that are used from the old one are
+    moved to the recent one again."""
+
+    maxsize = 100000
+    """The default maximum number of words to keep"""
+
+    def __init__(self, maxsize=None):
+        if maxsize is not None:
+            self.maxsize = maxsize
+        self.recent = {}
+        self.old = {}
+
+    def get(self, word):
+        """Returns what is kept for word, or None"""
+        value = self.recent.get(word)
+        if value is None:
+            value = self.old.get(word)
+            if value is not None:
+                self.set(word, value)
+        return value
+
+    def set(self, word, value):
+        """Keeps value for word"""
+        if len(self.recent) >= self.maxsize / 2:
+            self.old = self.recent
+            self.recent = {}
+        self.recent[word] = value
+
+    def load(self, filename, dictionaryid):
+        """Adds the words saved in filename, if they were saved for the
+        dictionary described by dictionaryid"""
+        try:
+            cachefile = open(filename, "rb")
+        except IOError:
             return
-        spellchecker = checkers[lang]
-        spellchecker.set_text(unicode(text))
-        for err in spellchecker:
-            yield err.word, err.wordpos, err.suggest()
+        try:
+            try:
+                savedid, words = marshal.load(cachefile)
+            except (EOFError, ValueError, TypeError), e:
+                return
+        finally:
+            cachefile.close()
+        if savedid == dictionaryid:
+            words.update(self.old)
+            self.old = words
 
-except ImportError:
+    def save(self, filename, dictionaryid):
+        """Saves the words in filename, for the dictionary described by
+        dictionaryid"""
+        words = self.old.copy()
+        words.update(self.recent)
+        # write to a temporary file first, so that other processes never see
+        # a partial file
+        handle, temppath = tempfile.mkstemp(suffix=".tmp", dir=os.path.dirname(filename))
+        cachefile = os.fdopen(handle, "wb")
+        try:
+            marshal.dump((dictionaryid, words), cachefile)
+        finally:
+            cachefile.close()
+        try:
+            if os.path.exists(filename):
+                os.remove(filename)
+            os.rename(temppath, filename)
+        except OSError, e:
+            os.remove(temppath)
+
+
+dictionaries = {}
+"""The (dictionary, tokenize, words, suggestions) of every language that
+was checked, or None if it has no dictionary"""
 
-    def check(text, lang):
+
+def _dictionaryid(dictionary):
+    provider = getattr(dictionary, "provider", None)
+    return "%s %s %s" % (getattr(enchant, "__version__", ""),
+                         getattr(provider, "name", ""), dictionary.tag)
+
+
+def _cachefile(lang):
+    return os.path.join(cachedir, "%s.words" % lang)
+
+
+def getdictionary(lang):
+    """Returns the (dictionary, tokenize, words, suggestions) of lang, or
+    None if there is no dictionary for it. words is the L{WordCache} of
+    whether words are spelled correctly, and suggestions that of the
+    suggestions for the misspelled ones."""
+    if not available:
+        return None
+    if not lang in dictionaries:
+        try:
+            dictionary = enchant.Dict(lang)
+            # some versions only report an error when checking something
+            dictionary.check(u'bla')
+        except EnchantError, e:
+            # sometimes this is raised instead of DictNotFoundError
+            print >> sys.stderr, str(e)
+            dictionaries[lang] = None
+            return None
+        try:
+            tokenize = get_tokenizer(lang)
+        except TokenizerNotFoundError:
+            # like enchant's SpellChecker, use the default tokenizer
+            tokenize = get_tokenizer()
+        words = WordCache()
+        if cachedir:
+            words.load(_cachefile(lang), _dictionaryid(dictionary))
+        dictionaries[lang] = (dictionary, tokenize, words, WordCache(1000))
+    return dictionaries[lang]
+
+
+def savecaches():
+    """Saves the words of every checked language in cachedir, if it is set.
+    Since this runs when the program exits, errors are only warned about."""
+    if not cachedir:
+        return
+    try:
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        for lang, found in dictionaries.iteritems():
+            if found is not None:
+                dictionary, tokenize, words, suggestions = found
+                words.save(_cachefile(lang), _dictionaryid(dictionary))
+    except (OSError, IOError), e:
+        warnings.warn("Could not save the spell checking cache in %s: %s" % (cachedir, e))
+
+
+def errors(text, lang):
+    """Yields the word and position of every misspelled word in text"""
+    found = getdictionary(lang)
+    if found is None:
+        return
+    dictionary, tokenize, words, suggestions = found
+    for word, wordpos in tokenize(unicode(text)):
+        correct = words.get(word)
+        if correct is None:
+            correct = bool(dictionary.check(word))
+            words.set(word, correct)
+        if not correct:
+            yield word, wordpos
+
+
+def suggest(word, lang):
+    """Returns the suggested spellings of word"""
+    found = getdictionary(lang)
+    if found is None:
         return []
+    dictionary, tokenize, words, suggestions = found
+    suggested = suggestions.get(word)
+    if suggested is None:
+        suggested = dictionary.suggest(word)
+        suggestions.set(word, suggested)
+    return suggested
+
+
+def check(text, lang):
+    """Yields the word, position and suggestions of every misspelled word in
+    text"""
+    for word, wordpos in errors(text, lang):
+        yield word, wordpos, suggest(word, lang)
+
+atexit.register(savecaches)
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+from translate.filters import checkcache, checks, pofilter
+from translate.storage import po
+
+
+class TestCheckCache:
+
+    def setup_method(self, method):
+        self.path = os.path.realpath("%s_%s" % (self.__class__.__name__, method.__name__))
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+        self.cachefile = os.path.join(self.path, "checkcache.db")
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.path)
+
+    def getcache(self, checker=None, **kwargs):
+        if checker is None:
+            checker = checks.StandardChecker()
+        return checkcache.CheckCache(checker, self.cachefile, **kwargs)
+
+    def test_hit(self):
+        """Tests that results are reused in a later run"""
+        unit = po.pounit(u"Open the file")
+        unit.target = u"maak die lêer oop"
+        cache = self.getcache()
+        failures = cache.run_filters(unit)
+        assert "startcaps" in failures
+        cache.close()
+        cache = self.getcache()
+        assert cache.run_filters(unit) == failures
+        unit.target = u"Maak die lêer oop"
+        assert cache.run_filters(unit) == {}
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.close()
+
+    def test_key(self):
+        """Tests that the key tells apart what the checks look at"""
+        cache = self.getcache()
+        unit = po.pounit(u"File")
+        unit.target = u"Lêer"
+        key = cache.key(unit)
+        unit.markfuzzy()
+        assert cache.key(unit) != key
+        unit.markfuzzy(False)
+        unit.addlocation(u"file.c:1")
+        assert cache.key(unit) != key
+        other = self.getcache(checks.StandardChecker(checks.CheckerConfig(targetlanguage="fr")))
+        assert other.key(po.pounit(u"File")) != cache.key(po.pounit(u"File"))
+        other.close()
+        cache.close()
+
+    def test_filters(self):
+        """Tests that results are kept apart for different sets of tests"""
+        unit = po.pounit(u"Delete %s files.")
+        unit.target = u"Skrap lêers"
+        full = self.getcache()
+        limited = self.getcache(checks.StandardChecker(limitfilters=["endpunc"]))
+        excluded = self.getcache(checks.StandardChecker(excludefilters={"printf": True}))
+        assert limited.key(unit) != full.key(unit)
+        assert excluded.key(unit) != full.key(unit)
+        assert limited.key(unit) != excluded.key(unit)
+        assert limited.run_filters(unit).keys() == ["endpunc"]
+        limited.close()
+        excluded.close()
+        failures = full.run_filters(unit)
+        assert "endpunc" in failures and "printf" in failures
+        assert (full.hits, full.misses) == (0, 1)
+        full.close()
+
+    def test_eviction(self):
+        """Tests that the least recently used results are removed"""
+        cache = self.getcache()
+        units = []
+        for i in range(3):
+            unit = po.pounit(u"File %d" % i)
+            unit.target = u"Lêer %d" % i
+            units.append(unit)
+        cache.run_filters(units[0])
+        cache.run_filters(units[1])
+        cache.close()
+        cache = self.getcache(maxentries=2)
+        cache.now += 1
+        cache.run_filters(units[0])
+        cache.run_filters(units[2])
+        cache.close()
+        assert cache.evictions == 1
+        cache = self.getcache()
+        cache.run_filters(units[0])
+        cache.run_filters(units[1])
+        assert (cache.hits, cache.misses) == (1, 1)
+        cache.close()
+
+    def test_pofilter(self):
+        """Tests that pofilter uses the cache when asked to"""
+        options, args = pofilter.cmdlineparser().parse_args(["test.po", "--checkcache", self.cachefile])
+        checkerconfig = pofilter.build_checkerconfig(options)
+        checkfilter = pofilter.pocheckfilter(options, None, checkerconfig)
+        unit = po.pounit(u"Open the file")
+        unit.target = u"maak die lêer oop"
+        assert "startcaps" in checkfilter.filterunit(unit)
+        assert "startcaps" in checkfilter.filterunit(unit)
+        assert checkfilter.checkcache.hits == 1
+        checkfilter.checkcache.close()
+        assert checkfilter.checkcache.report().startswith("check cache: 1 of 2 units (50.0%)")
@@ -71,6 +71,40 @@ def test_construct():
     kdechecker = checks.KdeChecker()
 
 
+def test_plan():
+    """tests that preconditions run before the tests they make us ignore, and
+    that the plan follows the target language"""
+    stdchecker = checks.StandardChecker()
+    names = [functionname for functionname, function, message, isfilter, ignored in stdchecker.getplan()]
+    assert names.index("untranslated") < names.index("blank") < names.index("simplecaps")
+    assert names.index("untranslated") < names.index("purepunc")
+    assert "startcaps" in names
+    unit = po.pounit(u"...")
+    assert stdchecker.run_filters(unit).keys() == ["untranslated"]
+    stdchecker.config.updatetargetlanguage("ja")
+    names = [functionname for functionname, function, message, isfilter, ignored in stdchecker.getplan()]
+    assert "startcaps" not in names
+
+
+def test_features():
+    """tests that the features of source strings are kept across units, and
+    those of translations only for one unit"""
+    mozillachecker = checks.MozillaChecker()
+    unit = po.pounit(u"Open &File %s")
+    unit.target = u"Maak &Lêer oop %s"
+    mozillachecker.run_filters(unit)
+    features1 = mozillachecker.sourcefeatures(u"Open &File %s")
+    assert features1.accelerators == [(1, 0)]
+    assert [match.group() for match in features1.printf] == [u"%s"]
+    unit.target = u"Maak Lêer oop"
+    failures = mozillachecker.run_filters(unit)
+    assert "accelerators" in failures and "printf" in failures
+    assert mozillachecker.sourcefeatures(u"Open &File %s") is features1
+    assert mozillachecker.targetfeatures(u"Maak Lêer oop").accelerators == [(0, 0)]
+    mozillachecker.config.updatetargetlanguage("ja")
+    assert mozillachecker.sourcefeatures(u"Open &File %s") is not features1
+
+
 def test_accelerator_markers():
     """test that we have the correct accelerator marker for the various default configs"""
     stdchecker = checks.StandardChecker()
@@ -607,6 +641,9 @@ def test_simplecaps():
     assert passes(ooochecker.simplecaps, "SOLK (%PRODUCTNAME Link)", "SOLK (%PRODUCTNAME Thumanyo)")
     assert passes(ooochecker.simplecaps, "%STAROFFICE Image", "Tshifanyiso tsha %STAROFFICE")
     assert passes(stdchecker.simplecaps, "Flies, flies, everywhere! Ack!", u"Vlieë, oral vlieë! Jig!")
+    # the lengths are measured without the variables
+    mozillachecker = checks.MozillaChecker()
+    assert fails(mozillachecker.simplecaps, u'WORLD:&FileHello<a href="x">$VAR$</b>Hello', u'\xbfQue<b>[')
 
 
 def test_spellcheck():
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+from translate.filters import checks, spelling
+
+
+class TestWordCache:
+
+    def setup_method(self, method):
+        self.path = os.path.realpath("%s_%s" % (self.__class__.__name__, method.__name__))
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.path)
+
+    def test_bounded(self):
+        """tests that only the most recently used words are kept"""
+        words = spelling.WordCache(4)
+        words.set(u"one", True)
+        words.set(u"two", False)
+        words.set(u"three", True)
+        assert words.get(u"one") is True
+        words.set(u"four", True)
+        words.set(u"five", False)
+        assert words.get(u"one") is True
+        assert words.get(u"two") is None
+        assert words.get(u"five") is False
+        assert len(words.recent) + len(words.old) <= 4
+
+    def test_save(self):
+        """tests that saved words are only loaded for the same dictionary"""
+        filename = os.path.join(self.path, "af.words")
+        words = spelling.WordCache()
+        words.set(u"lêer", True)
+        words.set(u"leër", False)
+        words.save(filename, "myspell af")
+        words.save(filename, "myspell af")
+        assert os.listdir(self.path) == ["af.words"]
+        loaded = spelling.WordCache()
+        loaded.load(filename, "myspell af")
+        assert loaded.get(u"lêer") is True
+        assert loaded.get(u"leër") is False
+        other = spelling.WordCache()
+        other.load(filename, "hunspell af")
+        assert other.get(u"lêer") is None
+
+
+class StubDictionary:
+    """A dictionary that knows a few words, and remembers what it was asked
+    to suggest"""
+
+    tag = "stub"
+
+    def __init__(self, words):
+        self.words = words
+        self.suggested = []
+
+    def check(self, word):
+        return word in self.words
+
+    def suggest(self, word):
+        self.suggested.append(word)
+        return [word.upper()]
+
+
+def tokenize(text):
+    position = 0
+    for word in text.split():
+        position = text.index(word, position)
+        yield word, position
+        position += len(word)
+
+
+class TestSpellcheck:
+
+    def setup_method(self, method):
+        self.saved = (spelling.available, spelling.dictionaries, spelling.cachedir)
+        self.path = os.path.realpath("%s_%s" % (self.__class__.__name__, method.__name__))
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+        spelling.available = True
+        spelling.dictionaries = {}
+        spelling.cachedir = None
+        self.source = StubDictionary([u"Open", u"the"])
+        self.target = StubDictionary([u"Maak", u"die", u"oop"])
+        for lang, dictionary in (("en", self.source), ("af", self.target)):
+            spelling.dictionaries[lang] = (dictionary, tokenize, spelling.WordCache(), spelling.WordCache(1000))
+
+    def teardown_method(self, method):
+        spelling.available, spelling.dictionaries, spelling.cachedir = self.saved
+        shutil.rmtree(self.path)
+
+    def test_suggest_reported(self):
+        """tests that suggestions are only asked for reported target words"""
+        checker = checks.StandardChecker(checks.CheckerConfig(targetlanguage="af", notranslatewords=["Mozilla"]))
+        try:
+            checker.spellcheck(u"Open the Mozilla fyle", u"Maak die Mozilla fyle lêer oop")
+        except checks.FilterFailure, e:
+            assert u"lêer" in unicode(e)
+        else:
+            assert False, "lêer should be reported"
+        assert self.target.suggested == [u"lêer"]
+        assert self.source.suggested == []
+        assert checker.spellcheck(u"Open the file", u"Maak die file oop")
+        assert self.target.suggested == [u"lêer"]
+
+    def test_savecaches_error(self, recwarn):
+        """tests that a cache directory that can't be created is only warned
+        about"""
+        filename = os.path.join(self.path, "file")
+        open(filename, "w").write("not a directory")
+        spelling.cachedir = os.path.join(filename, "spellcache")
+        spelling.savecaches()
+        assert recwarn.pop(UserWarning)
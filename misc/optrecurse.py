@@ -28,10 +28,19 @@ try:
     from cStringIO import StringIO
 except ImportError:
     from StringIO import StringIO
-
 from translate.misc import progressbar
 from translate import __version__
 
+# The parser, options and files being processed by worker processes when
+# processing files in parallel. The workers inherit them when they are forked.
+_worker_state = None
+
+
+def _processfile_worker(index):
+    """processes the file at index in the inherited list of files"""
+    parser, options, files = _worker_state
+    return parser.processfileinworker(options, files[index])
+
 
 class ManPageOption(optparse.Option, object):
     ACTIONS = optparse.Option.ACTIONS + ("manpage",)
@@ -77,6 +86,11 @@ class ManHelpFormatter(optparse.HelpFormatter):
 class RecursiveOptionParser(optparse.OptionParser, object):
     """A specialized Option Parser for recursing through directories."""
 
+    sniffinput = False
+    """Whether to skip input files that L{translate.storage.factory.sniff}
+    doesn't recognise as translation stores while recursing, instead of
+    failing on them later"""
+
     def __init__(self, formats, usetemplates=False, allowmissingtemplate=False,
                  description=None):
         """Construct the specialized Option Parser.
@@ -92,6 +106,7 @@ class RecursiveOptionParser(optparse.OptionParser, object):
         self.setmanpageoption()
         self.setprogressoptions()
         self.seterrorleveloptions()
+        self.setjobsoption()
         self.setformats(formats, usetemplates)
         self.setpsycooption()
         self.passthrough = []
@@ -329,6 +344,13 @@ class RecursiveOptionParser(optparse.OptionParser, object):
                 help="show errorlevel as: %s" % (", ".join(self.errorleveltypes)))
         self.define_option(errorleveloption)
 
+    def setjobsoption(self):
+        """sets the option for the number of processes to use"""
+        jobsoption = optparse.Option("-j", "--jobs", dest="jobs", default=1,
+                type="int", metavar="JOBS",
+                help="process files in JOBS parallel processes (default: 1)")
+        self.define_option(jobsoption)
+
     def getformathelp(self, formats):
         """make a nice help string for describing formats..."""
         if None in formats:
@@ -502,6 +524,7 @@ class RecursiveOptionParser(optparse.OptionParser, object):
         options.recursiveoutput = self.isrecursive(options.output, 'output') and getattr(options, "allowrecursiveoutput", True)
         options.recursivetemplate = self.usetemplates and self.isrecursive(options.template, 'template') and getattr(options, "allowrecursivetemplate", True)
         self.initprogressbar(inputfiles, options)
+        files = []
         for inputpath in inputfiles:
             try:
                 templatepath = self.gettemplatename(options, inputpath)
@@ -522,18 +545,70 @@ class RecursiveOptionParser(optparse.OptionParser, object):
                     raise
                 self.warning("Couldn't handle input file %s" % inputpath, options, sys.exc_info())
                 continue
-            try:
-                success = self.processfile(fileprocessor, options,
-                                           fullinputpath, fulloutputpath,
-                                           fulltemplatepath)
-            except Exception, error:
-                if isinstance(error, KeyboardInterrupt):
-                    raise
-                self.warning("Error processing: input %s, output %s, template %s" % (fullinputpath, fulloutputpath, fulltemplatepath), options, sys.exc_info())
-                success = False
-            self.reportprogress(inputpath, success)
+            files.append((inputpath, fileprocessor, fullinputpath, fulloutputpath, fulltemplatepath))
+        if getattr(options, "jobs", 1) > 1 and len(files) > 1 and self.canprocessinparallel(options):
+            self.processfilesinparallel(options, files)
+        else:
+            for filedetails in files:
+                self.reportprogress(filedetails[0], self.safeprocessfile(options, filedetails))
         del self.progressbar
 
+    def safeprocessfile(self, options, filedetails):
+        """processes a file from the list built by recursiveprocess, turning
+        errors into warnings"""
+        inputpath, fileprocessor, fullinputpath, fulloutputpath, fulltemplatepath = filedetails
+        try:
+            return self.processfile(fileprocessor, options,
+                                    fullinputpath, fulloutputpath,
+                                    fulltemplatepath)
+        except Exception, error:
+            if isinstance(error, KeyboardInterrupt):
+                raise
+            self.warning("Error processing: input %s, output %s, template %s" % (fullinputpath, fulloutputpath, fulltemplatepath), options, sys.exc_info())
+            return False
+
+    def canprocessinparallel(self, options):
+        """returns whether the files can be processed in separate processes.
+        This needs every file to be written to its own output file, and fork
+        support to share the parser state with the worker processes."""
+        if not (hasattr(os, "fork") and options.output and options.recursiveoutput):
+            return False
+        # multiprocessing is only imported when it is needed, since it is
+        # slow to import
+        try:
+            import multiprocessing
+        except ImportError:
+            return False
+        return True
+
+    def processfilesinparallel(self, options, files):
+        """processes the files from recursiveprocess with a pool of
+        options.jobs worker processes, reporting progress as they finish"""
+        import multiprocessing
+        global _worker_state
+        _worker_state = (self, options, files)
+        pool = multiprocessing.Pool(options.jobs)
+        try:
+            results = pool.imap(_processfile_worker, range(len(files)))
+            for filedetails in files:
+                self.reportprogress(filedetails[0], results.next())
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        pool.join()
+        _worker_state = None
+
+    def processfileinworker(self, options, filedetails):
+        """processes a single file in a worker process"""
+        # The file processors mustn't start their own worker processes
+        options.jobs = 1
+        try:
+            return self.safeprocessfile(options, filedetails)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+
     def openinputfile(self, options, fullinputpath):
         """opens the input file"""
         if fullinputpath is None:
@@ -643,6 +718,8 @@ class RecursiveOptionParser(optparse.OptionParser, object):
         dirstack = ['']
         join = os.path.join
         inputfiles = []
+        if self.sniffinput:
+            from translate.storage import factory
         while dirstack:
             top = dirstack.pop(-1)
             names = os.listdir(join(options.input, top))
@@ -659,6 +736,8 @@ class RecursiveOptionParser(optparse.OptionParser, object):
                     if not self.isvalidinputname(options, name):
                         # only handle names that match recognized input file extensions
                         continue
+                    if self.sniffinput and factory.sniff(fullinputpath) is None:
+                        continue
                     inputfiles.append(inputpath)
             # make sure the directories are processed next time round...
             dirs.reverse()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import os
+import shutil
 
 from translate.misc import optrecurse
 
@@ -20,3 +21,33 @@ class TestRecursiveOptionParser:
         root = os.path.join(dirname, name)
         print fullpath
         assert self.parser.splitext(fullpath) == (root, extension)
+
+
+class TestRecurseInputFiles:
+
+    def setup_method(self, method):
+        self.path = os.path.realpath("%s_%s" % (self.__class__.__name__, method.__name__))
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(os.path.join(self.path, "sub"))
+        open(os.path.join(self.path, "test.po"), "w").write('msgid "test"\nmsgstr "rest"\n')
+        open(os.path.join(self.path, "sub", "messages.data"), "w").write('msgid "test"\nmsgstr "rest"\n')
+        open(os.path.join(self.path, "sub", "notes.txt"), "w").write("Just some notes\n")
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.path)
+
+    def recurseinputfiles(self, sniffinput):
+        parser = optrecurse.RecursiveOptionParser({"po": ("po", None), "*": ("po", None)})
+        parser.sniffinput = sniffinput
+        options, args = parser.parse_args(["-i", self.path])
+        options.inputformats = parser.inputformats
+        inputfiles = parser.recurseinputfiles(options)
+        inputfiles.sort()
+        return inputfiles
+
+    def test_sniffinput(self):
+        """test that only files recognised as stores are found when
+        sniffinput is set"""
+        assert self.recurseinputfiles(False) == [os.path.join("sub", "messages.data"), os.path.join("sub", "notes.txt"), "test.po"]
+        assert self.recurseinputfiles(True) == [os.path.join("sub", "messages.data"), "test.po"]
@@ -5,7 +5,6 @@ __all__ = ['accepts', 'returns', 'yields', 'TypeCheckError', 'Length', 'Empty'
           ,'register_type', 'is_registered_type', 'unregister_type'
           ,'Function']
 
-import inspect
 import types
 
 from types import GeneratorType, FunctionType, MethodType, ClassType, TypeType
@@ -1378,6 +1377,8 @@ def typecheck_args(*v_sig, **kw_sig):
         else:
             wrapped_func = func
 
+        # inspect is slow to import, and only needed with typechecking enabled
+        import inspect
         param_list, varg_name, kwarg_name, defaults = inspect.getargspec(wrapped_func)
         args_to_params = _gen_arg_to_param(wrapped_func, (param_list, varg_name, kwarg_name, defaults))
 
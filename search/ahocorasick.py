@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A multi-pattern string matcher, to find which of many terms occur in a
+text with one pass over the text.
+
+This is the automaton of Aho and Corasick, "Efficient string matching: an aid
+to bibliographic search": a trie of the patterns, with links from every
+state to the state of its longest suffix that is also in the trie.
+"""
+
+
+class Automaton(object):
+    """Finds all the patterns added to it in a text.
+
+    States are numbered, with 0 the empty prefix. Patterns can be added
+    at any time; the failure links are calculated again before the next
+    search."""
+
+    def __init__(self, patterns=()):
+        # the transitions of every state
+        self.goto = [{}]
+        # the pattern that ends in every state, or None
+        self.terminal = [None]
+        self.fail = None
+        # the patterns that end in every state, including those of its suffixes
+        self.outputs = None
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern):
+        """Adds pattern to the patterns to search for. Empty patterns are
+        ignored."""
+        if not pattern:
+            return
+        goto = self.goto
+        state = 0
+        for char in pattern:
+            nextstate = goto[state].get(char)
+            if nextstate is None:
+                nextstate = len(goto)
+                goto[state][char] = nextstate
+                goto.append({})
+                self.terminal.append(None)
+            state = nextstate
+        self.terminal[state] = pattern
+        self.fail = None
+
+    def __len__(self):
+        return len([pattern for pattern in self.terminal if pattern is not None])
+
+    def build(self):
+        """Calculates the failure links and outputs of all states, breadth
+        first so that the links of shorter prefixes are known"""
+        goto = self.goto
+        terminal = self.terminal
+        fail = [0] * len(goto)
+        outputs = [()] * len(goto)
+        queue = []
+        for state in goto[0].itervalues():
+            queue.append(state)
+            if terminal[state] is not None:
+                outputs[state] = (terminal[state],)
+        index = 0
+        while index < len(queue):
+            state = queue[index]
+            index += 1
+            for char, nextstate in goto[state].iteritems():
+                queue.append(nextstate)
+                suffix = fail[state]
+                while suffix and char not in goto[suffix]:
+                    suffix = fail[suffix]
+                suffix = goto[suffix].get(char, 0)
+                fail[nextstate] = suffix
+                if terminal[nextstate] is not None:
+                    outputs[nextstate] = (terminal[nextstate],) + outputs[suffix]
+                else:
+                    # shared with the suffix, to save memory
+                    outputs[nextstate] = outputs[suffix]
+        self.fail = fail
+        self.outputs = outputs
+
+    def iterfind(self, text):
+        """Yields (position, pattern) for every occurrence of every pattern in
+        text, ordered by the end of the occurrence"""
+        if self.fail is None:
+            self.build()
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        state = 0
+        for end, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern in outputs[state]:
+                yield end + 1 - len(pattern), pattern
+
+    def findfirst(self, text):
+        """Returns a dictionary with the position of the first occurrence of
+        every pattern that occurs in text, like text.find(pattern) would"""
+        found = {}
+        for position, pattern in self.iterfind(text):
+            if pattern not in found:
+                found[pattern] = position
+        return found
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+
+"""Compares scoring many TM candidates against one string at once with
+L{lshtein.LevenshteinComparer.similarities} to calling similarity() for every
+candidate, as the matchers did before.
+
+Without Python-Levenshtein installed this shows the gain of the bit-parallel
+distance; with it, both use the native distance.
+
+Usage: benchmark_lshtein.py [number of candidates] [number of queries]
+"""
+
+import random
+import sys
+import time
+
+from translate.search import lshtein
+
+sample_words = ["file", "open", "save", "the", "a", "window", "close",
+                "print", "edit", "view", "new", "recent", "document", "%s"]
+
+
+def sample_strings(count):
+    strings = []
+    for i in range(count):
+        words = [random.choice(sample_words) for j in range(random.randint(1, 12))]
+        strings.append(u" ".join(words))
+    return strings
+
+
+def main():
+    count = 5000
+    queries = 50
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    if len(sys.argv) > 2:
+        queries = int(sys.argv[2])
+    random.seed(0)
+    candidates = sample_strings(count)
+    texts = sample_strings(queries)
+    comparer = lshtein.LevenshteinComparer(70)
+    print "%d candidates, %d queries, using %s" % \
+          (count, queries, lshtein.bestdistance().__name__)
+    for stoppercentage in [40, 75]:
+        start = time.time()
+        for text in texts:
+            pairs = [comparer.similarity(text, candidate, stoppercentage)
+                     for candidate in candidates]
+        pairtime = time.time() - start
+        start = time.time()
+        for text in texts:
+            batch = comparer.similarities(text, candidates, stoppercentage)
+        batchtime = time.time() - start
+        print "stop at %d%%: per pair %.3fs  batch %.3fs  speedup %.1fx" % \
+              (stoppercentage, pairtime, batchtime, pairtime / max(batchtime, 1e-6))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A compiled binary translation memory format for use by
+L{translate.search.match.matcher}.
+
+The file is opened with mmap, so loading it takes near-constant time and only
+the length windows that are actually searched are paged in. All numbers are
+unsigned 32 bit little-endian integers. The file consists of:
+    - the magic string "TTKCTM01"
+    - the number of entries N and the longest source length M
+    - a length index of M + 2 entry numbers: the first entry with a source
+      of at least that many characters
+    - N entry records, sorted by source length: offset and size of the
+      source, target and notes in the string table, and flags
+    - the string table with UTF-8 encoded strings; plural forms are separated
+      by NUL characters
+"""
+
+import mmap
+import struct
+
+from translate.misc.multistring import multistring
+
+MAGIC = "TTKCTM01"
+HEADER = "<8sII"
+HEADER_SIZE = struct.calcsize(HEADER)
+INDEX_ENTRY = "<I"
+INDEX_ENTRY_SIZE = struct.calcsize(INDEX_ENTRY)
+RECORD = "<7I"
+RECORD_SIZE = struct.calcsize(RECORD)
+
+FLAG_FUZZY = 1
+FLAG_PLURAL = 2
+
+
+def iscompiledtm(filename):
+    """Returns whether filename is a compiled translation memory"""
+    if not isinstance(filename, basestring):
+        return False
+    try:
+        tmfile = open(filename, "rb")
+    except IOError:
+        return False
+    try:
+        return tmfile.read(len(MAGIC)) == MAGIC
+    finally:
+        tmfile.close()
+
+
+def _encode(string):
+    """Returns the UTF-8 representation of a string or multistring"""
+    if isinstance(string, multistring) and len(string.strings) > 1:
+        return u"\0".join([unicode(s) for s in string.strings]).encode("utf-8")
+    return unicode(string).encode("utf-8")
+
+
+def _decode(data, plural):
+    """Reverses L{_encode}"""
+    string = data.decode("utf-8")
+    if plural:
+        return multistring(string.split(u"\0"))
+    return string
+
+
+def writetm(units, tmfile):
+    """Writes the given candidate units, as found in
+    L{translate.search.match.matcher}.candidates, to tmfile.
+
+    Identical strings are stored only once in the string table."""
+    units = list(units)
+    sources = []
+    for unit in units:
+        source = getattr(unit, "orig_source", unit.source)
+        target = getattr(unit, "orig_target", unit.target)
+        sources.append((len(unicode(source)), source, target, unit))
+    # sort by source length only, to keep the order of units of the same
+    # length, like the stable sort in the matcher
+    sources.sort(key=lambda item: item[0])
+    maxlength = 0
+    if sources:
+        maxlength = sources[-1][0]
+
+    strings = []
+    stringoffsets = {}
+    stringsize = [0]
+
+    def addstring(data):
+        if data not in stringoffsets:
+            stringoffsets[data] = stringsize[0]
+            strings.append(data)
+            stringsize[0] += len(data)
+        return stringoffsets[data], len(data)
+
+    lengthindex = []
+    records = []
+    for entrynumber, (length, source, target, unit) in enumerate(sources):
+        while len(lengthindex) <= length:
+            lengthindex.append(entrynumber)
+        flags = 0
+        if unit.fuzzy:
+            flags |= FLAG_FUZZY
+        if isinstance(source, multistring) and len(source.strings) > 1:
+            flags |= FLAG_PLURAL
+        sourceoffset, sourcesize = addstring(_encode(source))
+        targetoffset, targetsize = addstring(_encode(target))
+        notesoffset, notessize = addstring(unicode(unit.getnotes()).encode("utf-8"))
+        records.append(struct.pack(RECORD, sourceoffset, sourcesize,
+                                   targetoffset, targetsize,
+                                   notesoffset, notessize, flags))
+    while len(lengthindex) < maxlength + 2:
+        lengthindex.append(len(sources))
+
+    tmfile.write(struct.pack(HEADER, MAGIC, len(sources), maxlength))
+    tmfile.write("".join([struct.pack(INDEX_ENTRY, entry) for entry in lengthindex]))
+    tmfile.write("".join(records))
+    tmfile.write("".join(strings))
+
+
+class CompiledTM(object):
+    """A read-only sequence of the candidate units in a compiled translation
+    memory file, sorted by source length. Units are only decoded when they
+    are accessed."""
+
+    def __init__(self, filename):
+        # match imports this module
+        from translate.search import match
+        self.UnitClass = match.candidateunit
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count, self.maxlength = struct.unpack(HEADER, self._map[:HEADER_SIZE])
+        if magic != MAGIC:
+            self.close()
+            raise ValueError("%s is not a compiled translation memory" % filename)
+        self._indexstart = HEADER_SIZE
+        self._recordstart = self._indexstart + (self.maxlength + 2) * INDEX_ENTRY_SIZE
+        self._stringstart = self._recordstart + self._count * RECORD_SIZE
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("compiled TM index out of range")
+        position = self._recordstart + index * RECORD_SIZE
+        (sourceoffset, sourcesize, targetoffset, targetsize,
+         notesoffset, notessize, flags) = struct.unpack(RECORD, self._map[position:position+RECORD_SIZE])
+        plural = flags & FLAG_PLURAL
+        return self.UnitClass(self._getstring(sourceoffset, sourcesize, plural),
+                              self._getstring(targetoffset, targetsize, plural),
+                              self._getstring(notesoffset, notessize, False),
+                              bool(flags & FLAG_FUZZY))
+
+    def __iter__(self):
+        for index in xrange(self._count):
+            yield self[index]
+
+    def _getstring(self, offset, size, plural):
+        start = self._stringstart + offset
+        return _decode(self._map[start:start+size], plural)
+
+    def lengthstart(self, length):
+        """Returns the number of the first unit with a source of at least
+        length characters"""
+        length = max(0, min(length, self.maxlength + 1))
+        position = self._indexstart + length * INDEX_ENTRY_SIZE
+        return struct.unpack(INDEX_ENTRY, self._map[position:position+INDEX_ENTRY_SIZE])[0]
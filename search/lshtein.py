@@ -65,13 +65,88 @@ def native_distance(a, b, stopvalue=0):
     string types."""
     return Levenshtein.distance(a, b)
 
-try:
-    import Levenshtein as Levenshtein
-    distance = native_distance
-except ImportError:
-    import logging
-    logging.warning("Python-Levenshtein not found. Continuing with built-in (slower) fuzzy matching.")
-    distance = python_distance
+Levenshtein = None
+
+
+def _selectdistance():
+    """Returns native_distance if Python-Levenshtein is available, and
+    python_distance otherwise.
+
+    This is only done when the first distance is calculated, so that tools
+    that import this module without matching anything don't pay for the
+    import (or see the warning)."""
+    global Levenshtein
+    try:
+        import Levenshtein as native
+    except ImportError:
+        import logging
+        logging.warning("Python-Levenshtein not found. Continuing with built-in (slower) fuzzy matching.")
+        return python_distance
+    Levenshtein = native
+    return native_distance
+
+
+def distance(a, b, stopvalue=-1):
+    """Calculates the distance with the best available implementation. The
+    first call replaces this function with the one that was selected."""
+    return bestdistance()(a, b, stopvalue)
+
+
+def bestdistance():
+    """Returns the distance function that L{distance} uses, selecting it if
+    that wasn't done yet"""
+    global distance
+    if distance not in (native_distance, python_distance):
+        distance = _selectdistance()
+    return distance
+
+
+def _bitmasks(a):
+    """Returns a dictionary with the positions of every item of a as bits,
+    for L{_bitdistance}"""
+    masks = {}
+    bit = 1
+    for item in a:
+        masks[item] = masks.get(item, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def _bitdistance(masks, length, b, stopvalue):
+    """Calculates the distance between b and the non-empty sequence of the
+    given length that masks were calculated for, with the bit-parallel
+    algorithm of Myers, as formulated by Hyyrö.
+
+    A column of the distance matrix is kept in the bits of two integers, so
+    that every item of b takes a constant number of operations on them
+    instead of a loop over a. It stops as soon as the distance can not be
+    stopvalue or less any more, and then returns a lower bound for it."""
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive = full
+    negative = 0
+    score = length
+    remaining = len(b)
+    getmask = masks.get
+    for item in b:
+        mask = getmask(item, 0)
+        vertical = mask | negative
+        horizontal = (((mask & positive) + positive) ^ positive) | mask
+        hpositive = negative | (~(horizontal | positive) & full)
+        hnegative = positive & horizontal
+        if hpositive & last:
+            score += 1
+        elif hnegative & last:
+            score -= 1
+        hpositive = ((hpositive << 1) | 1) & full
+        hnegative = (hnegative << 1) & full
+        positive = hnegative | (~(vertical | hpositive) & full)
+        negative = hpositive & vertical
+        # every remaining item can lower the distance by one at most
+        remaining -= 1
+        if score - remaining > stopvalue:
+            return score - remaining
+    return score
 
 
 class LevenshteinComparer:
@@ -153,6 +228,52 @@ class LevenshteinComparer:
             penalty = 0
         return 100 - (dist*1.0/l2)*100 - penalty
 
+    def similarities(self, a, candidates, stoppercentage=40):
+        """Returns the similarity between a and each of the candidates, the
+        same as similarity() would.
+
+        Without Python-Levenshtein this is much faster than calling
+        similarity() for every candidate: a is only prepared once, and the
+        distances are calculated with L{_bitdistance}, which also stops early
+        for every candidate that can't reach stoppercentage."""
+        if bestdistance() is native_distance:
+            return [self.similarity_real(a, b, stoppercentage) for b in candidates]
+        results = []
+        append = results.append
+        la = len(a)
+        if la == 0:
+            return [0] * len(candidates)
+        pattern = a[:self.MAX_LEN]
+        masks = _bitmasks(pattern)
+        length = len(pattern)
+        for b in candidates:
+            l1, l2 = la, len(b)
+            if l2 == 0:
+                append(0)
+                continue
+            if l1 > l2:
+                l1, l2 = l2, l1
+            maxsimilarity = 100 - 100.0*abs(l1 - l2)/l2
+            if maxsimilarity < stoppercentage:
+                append(maxsimilarity * 1.0)
+                continue
+            penalty = 0
+            if l2 > self.MAX_LEN:
+                b = b[:self.MAX_LEN]
+                l2 = self.MAX_LEN
+                penalty += 7
+                if l1 > self.MAX_LEN:
+                    penalty += 7
+            stopvalue = math.ceil((100.0 - stoppercentage)/100 * l2)
+            dist = _bitdistance(masks, length, b, stopvalue)
+            if dist > stopvalue:
+                append(stoppercentage - 1.0)
+                continue
+            if dist != 0:
+                penalty = 0
+            append(100 - (dist*1.0/l2)*100 - penalty)
+        return results
+
 
 if __name__ == "__main__":
     from sys import argv
@@ -21,9 +21,13 @@
 """Class to perform translation memory matching from a store of translation units"""
 
 import heapq
+import math
 import re
 
+from translate.search import ahocorasick
+from translate.search import compiledtm
 from translate.search import lshtein
+from translate.search import ngram
 from translate.search import terminology
 from translate.storage import base
 from translate.storage import po
@@ -35,6 +39,58 @@ def sourcelen(unit):
     return len(unit.source)
 
 
+class candidateunit(object):
+    """A compact translation memory entry, with only the attributes the
+    matchers need. Full units are only built for the best matches, in
+    L{matcher.buildunits}."""
+
+    __slots__ = ("source", "target", "notes", "fuzzy", "orig_source", "orig_target")
+
+    def __init__(self, source, target, notes=u"", fuzzy=False):
+        # We need to ensure that we don't pass multistrings futher, since
+        # some modules (like the native Levenshtein) can't use it.
+        if isinstance(source, multistring):
+            if len(source.strings) > 1:
+                self.orig_source = source
+                self.orig_target = target
+            source = unicode(source)
+            target = unicode(target)
+        self.source = source
+        self.target = target
+        self.notes = notes
+        self.fuzzy = fuzzy
+
+    def getid(self):
+        return self.source
+
+    def getcontext(self):
+        return u""
+
+    def getlocations(self):
+        return []
+
+    def hasplural(self):
+        return False
+
+    def getnotes(self, origin=None):
+        return self.notes
+
+    def addnote(self, text, origin=None, position="append"):
+        if position == "append" and self.notes:
+            self.notes += '\n' + text
+        else:
+            self.notes = text
+
+    def isfuzzy(self):
+        return self.fuzzy
+
+    def istranslated(self):
+        return bool(self.target) and not self.fuzzy
+
+    def markfuzzy(self, value=True):
+        self.fuzzy = value
+
+
 def _sort_matches(matches, match_info):
 
     def _matches_cmp(x, y):
@@ -49,14 +105,22 @@ class matcher(object):
     """A class that will do matching and store configuration for the matching process"""
 
     sort_reverse = False
+    batchsize = 64
+    """The number of candidates that are scored together, if the comparer
+    supports it"""
 
-    def __init__(self, store, max_candidates=10, min_similarity=75, max_length=70, comparer=None, usefuzzy=False):
+    def __init__(self, store, max_candidates=10, min_similarity=75, max_length=70, comparer=None, usefuzzy=False, ngramfilter=False):
         """max_candidates is the maximum number of candidates that should be assembled,
         min_similarity is the minimum similarity that must be attained to be included in
-        the result, comparer is an optional Comparer with similarity() function"""
+        the result, comparer is an optional Comparer with similarity() function.
+        If ngramfilter is true, a character n-gram index is used to skip
+        candidates that can not reach min_similarity (only with the default
+        Levenshtein comparer)."""
         if comparer is None:
             comparer = lshtein.LevenshteinComparer(max_length)
         self.comparer = comparer
+        self.ngramfilter = ngramfilter and isinstance(comparer, lshtein.LevenshteinComparer)
+        self.ngramindex = None
         self.setparameters(max_candidates, min_similarity, max_length)
         self.usefuzzy = usefuzzy
         self.inittm(store)
@@ -83,11 +147,20 @@ class matcher(object):
         # reverse is deprectated - just use self.sort_reverse
         self.existingunits = {}
         self.candidates = base.TranslationStore()
+        self.ngramindex = None
 
-        if isinstance(stores, base.TranslationStore):
+        if isinstance(stores, (base.TranslationStore, compiledtm.CompiledTM)):
             stores = [stores]
+        if len(stores) == 1 and isinstance(stores[0], compiledtm.CompiledTM):
+            # A compiled TM is already filtered and sorted, and is only read
+            # as far as needed
+            self.candidates.units = stores[0]
+            return
         for store in stores:
-            self.extendtm(store.units, store=store, sort=False)
+            if isinstance(store, compiledtm.CompiledTM):
+                self.candidates.units.extend(store)
+            else:
+                self.extendtm(store.units, store=store, sort=False)
         self.candidates.units.sort(key=sourcelen, reverse=self.sort_reverse)
         # print "TM initialised with %d candidates (%d to %d characters long)" % \
         #        (len(self.candidates.units), len(self.candidates.units[0].source), len(self.candidates.units[-1].source))
@@ -104,29 +177,31 @@ class matcher(object):
         """
         if isinstance(units, base.TranslationUnit):
             units = [units]
+        if isinstance(self.candidates.units, compiledtm.CompiledTM):
+            self.candidates.units = list(self.candidates.units)
         candidates = filter(self.usable, units)
+        append = self.candidates.units.append
         for candidate in candidates:
-            simpleunit = base.TranslationUnit("")
-            # We need to ensure that we don't pass multistrings futher, since
-            # some modules (like the native Levenshtein) can't use it.
-            if isinstance(candidate.source, multistring):
-                if len(candidate.source.strings) > 1:
-                    simpleunit.orig_source = candidate.source
-                    simpleunit.orig_target = candidate.target
-                simpleunit.source = unicode(candidate.source)
-                simpleunit.target = unicode(candidate.target)
-            else:
-                simpleunit.source = candidate.source
-                simpleunit.target = candidate.target
             # If we now only get translator comments, we don't get programmer
             # comments in TM suggestions (in Pootle, for example). If we get all
             # notes, pot2po adds all previous comments as translator comments
             # in the new po file
-            simpleunit.addnote(candidate.getnotes(origin="translator"))
-            simpleunit.fuzzy = candidate.isfuzzy()
-            self.candidates.units.append(simpleunit)
+            append(candidateunit(candidate.source, candidate.target,
+                                 candidate.getnotes(origin="translator"),
+                                 candidate.isfuzzy()))
         if sort:
             self.candidates.units.sort(key=sourcelen, reverse=self.sort_reverse)
+        # keys in the n-gram index are positions in the candidates list
+        self.ngramindex = None
+
+    def getngramindex(self):
+        """Returns the n-gram index of the candidates, building it if the
+        candidates changed since it was last used."""
+        if self.ngramindex is None:
+            self.ngramindex = ngram.NgramIndex()
+            for key, candidate in enumerate(self.candidates.units):
+                self.ngramindex.add(key, candidate.source)
+        return self.ngramindex
 
     def setparameters(self, max_candidates=10, min_similarity=75, max_length=70):
         """Sets the parameters without reinitialising the tm. If a parameter
@@ -167,34 +242,67 @@ class matcher(object):
 
         # minimum source string length to be considered
         startlength = self.getstartlength(min_similarity, text)
-        startindex = 0
-        endindex = len(self.candidates.units)
-        while startindex < endindex:
-            mid = (startindex + endindex) // 2
-            if sourcelen(self.candidates.units[mid]) < startlength:
-                startindex = mid + 1
-            else:
-                endindex = mid
+        if isinstance(self.candidates.units, compiledtm.CompiledTM):
+            startindex = self.candidates.units.lengthstart(int(math.ceil(startlength)))
+        else:
+            startindex = 0
+            endindex = len(self.candidates.units)
+            while startindex < endindex:
+                mid = (startindex + endindex) // 2
+                if sourcelen(self.candidates.units[mid]) < startlength:
+                    startindex = mid + 1
+                else:
+                    endindex = mid
 
         # maximum source string length to be considered
         stoplength = self.getstoplength(min_similarity, text)
         lowestscore = 0
 
-        for candidate in self.candidates.units[startindex:]:
-            cmpstring = candidate.source
-            if len(cmpstring) > stoplength:
-                break
-            similarity = self.comparer.similarity(text, cmpstring, min_similarity)
-            if similarity < min_similarity:
-                continue
-            if similarity > lowestscore:
-                heapq.heapreplace(bestcandidates, (similarity, candidate))
-                lowestscore = bestcandidates[0][0]
-                if lowestscore >= 100:
+        ngramquery = None
+        if self.ngramfilter:
+            ngramquery = self.getngramindex().query(text, self.comparer.MAX_LEN, startlength, stoplength)
+
+        # Comparers with a similarities() method score a batch of candidates
+        # at once. Candidates are scored with the min_similarity from before
+        # the batch, and checked against the current one afterwards, which
+        # gives the same results as scoring them one by one.
+        similarities = getattr(self.comparer, "similarities", None)
+        batchsize = 1
+        if similarities is not None:
+            batchsize = self.batchsize
+        units = self.candidates.units
+        key = startindex
+        endindex = len(units)
+        while key < endindex:
+            batch = []
+            while key < endindex and len(batch) < batchsize:
+                candidate = units[key]
+                cmpstring = candidate.source
+                if len(cmpstring) > stoplength:
+                    endindex = key
                     break
-                if min_similarity < lowestscore:
-                    min_similarity = lowestscore
-                    stoplength = self.getstoplength(min_similarity, text)
+                if ngramquery is None or ngramquery.possible(key, len(cmpstring), min_similarity):
+                    batch.append(candidate)
+                key += 1
+            if similarities is not None:
+                scores = similarities(text, [candidate.source for candidate in batch], min_similarity)
+            else:
+                scores = [self.comparer.similarity(text, candidate.source, min_similarity) for candidate in batch]
+            for candidate, similarity in zip(batch, scores):
+                if len(candidate.source) > stoplength:
+                    endindex = key
+                    break
+                if similarity < min_similarity:
+                    continue
+                if similarity > lowestscore:
+                    heapq.heapreplace(bestcandidates, (similarity, candidate))
+                    lowestscore = bestcandidates[0][0]
+                    if lowestscore >= 100:
+                        endindex = key
+                        break
+                    if min_similarity < lowestscore:
+                        min_similarity = lowestscore
+                        stoplength = self.getstoplength(min_similarity, text)
 
         #Remove the empty ones:
         def notzero(item):
@@ -256,6 +364,7 @@ class terminologymatcher(matcher):
 
     def inittm(self, store):
         """Normal initialisation, but convert all source strings to lower case"""
+        self.automaton = None
         matcher.inittm(self, store)
         extras = []
         for unit in self.candidates.units:
@@ -263,16 +372,37 @@ class terminologymatcher(matcher):
             for ignorepattern_re, replacement in ignorepatterns_re:
                 (newterm, occurrences) = ignorepattern_re.subn(replacement, source)
                 if occurrences:
-                    new_unit = type(unit).buildfromunit(unit)
-                    new_unit.source = newterm
-                    # We mark it fuzzy to indicate that it isn't pristine
-                    unit.markfuzzy()
+                    new_unit = candidateunit(newterm, unit.target, unit.notes, unit.isfuzzy())
                     extras.append(new_unit)
         self.candidates.units.sort(key=sourcelen, reverse=self.sort_reverse)
         if extras:
             # We don't sort, so that the altered forms are at the back and
             # considered last.
             self.extendtm(extras, sort=False)
+        self.getautomaton()
+
+    def extendtm(self, units, store=None, sort=True):
+        """Extends the memory with extra unit(s), see L{matcher.extendtm}"""
+        matcher.extendtm(self, units, store, sort)
+        self.automaton = None
+
+    def getautomaton(self):
+        """Returns an L{ahocorasick.Automaton} that finds the source strings of
+        the candidates, and a dictionary with the positions in the candidates
+        list of every source string. They are built again if the candidates
+        changed since they were last used."""
+        if self.automaton is None:
+            automaton = ahocorasick.Automaton()
+            termkeys = {}
+            for key, candidate in enumerate(self.candidates.units):
+                source = candidate.source
+                if source not in termkeys:
+                    termkeys[source] = []
+                    automaton.add(source)
+                termkeys[source].append(key)
+            automaton.build()
+            self.automaton = (automaton, termkeys)
+        return self.automaton
 
     def getstartlength(self, min_similarity, text):
         # Let's number false matches by not working with terms of two
@@ -305,29 +435,48 @@ class terminologymatcher(matcher):
         matches = []
         known = set()
 
-        # We want to limit our search in self.candidates, so we want to ignore
-        # all units with a source string that is too long. We use binary search
-        # to find the first string short enough to occur in text, from where we
-        # start our search in the candidates.
-
-        # the maximum possible length is text_l
-        startindex = 0
-        endindex = len(self.candidates.units)
-        while startindex < endindex:
-            mid = (startindex + endindex) // 2
-            if sourcelen(self.candidates.units[mid]) > text_l:
-                startindex = mid + 1
-            else:
-                endindex = mid
-
-        for cand in self.candidates.units[startindex:]:
-            source = cand.source
-            if (source, cand.target) in known:
-                continue
-            if comparer.similarity(text, source, self.MIN_SIMILARITY):
-                match_info[source] = {'pos': comparer.match_info[source]['pos']}
+        if isinstance(comparer, terminology.TerminologyComparer):
+            # One pass of the automaton over the text finds all the terms in
+            # it, at the position where comparer.similarity() would find them.
+            # The candidates are kept in the order of the candidates list.
+            automaton, termkeys = self.getautomaton()
+            positions = automaton.findfirst(text[:comparer.MAX_LEN])
+            keys = []
+            for source in positions:
+                keys.extend(termkeys[source])
+            keys.sort()
+            for key in keys:
+                cand = self.candidates.units[key]
+                source = cand.source
+                if (source, cand.target) in known:
+                    continue
+                match_info[source] = {'pos': positions[source]}
                 matches.append(cand)
                 known.add((source, cand.target))
+        else:
+            # We want to limit our search in self.candidates, so we want to
+            # ignore all units with a source string that is too long. We use
+            # binary search to find the first string short enough to occur in
+            # text, from where we start our search in the candidates.
+
+            # the maximum possible length is text_l
+            startindex = 0
+            endindex = len(self.candidates.units)
+            while startindex < endindex:
+                mid = (startindex + endindex) // 2
+                if sourcelen(self.candidates.units[mid]) > text_l:
+                    startindex = mid + 1
+                else:
+                    endindex = mid
+
+            for cand in self.candidates.units[startindex:]:
+                source = cand.source
+                if (source, cand.target) in known:
+                    continue
+                if comparer.similarity(text, source, self.MIN_SIMILARITY):
+                    match_info[source] = {'pos': comparer.match_info[source]['pos']}
+                    matches.append(cand)
+                    known.add((source, cand.target))
 
         final_matches = []
         lastend = 0
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""A character n-gram index to prefilter candidates for fuzzy matching.
+
+Two strings with a Levenshtein distance of at most k share at least
+max(len(a), len(b)) - n + 1 - k*n of their n-grams (counted with
+multiplicity). This count filter allows us to discard candidates that can not
+reach a given similarity without calculating the distance at all. See
+Ukkonen, "Approximate string-matching with q-grams and maximal matches".
+"""
+
+NGRAM_LENGTH = 3
+
+
+def ngrams(text, n=NGRAM_LENGTH):
+    """Returns a dictionary with the number of occurrences of every n-gram in
+    text"""
+    counts = {}
+    for i in range(len(text) - n + 1):
+        gram = text[i:i+n]
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def min_shared(length_a, length_b, min_similarity, n=NGRAM_LENGTH, max_len=None):
+    """Returns the minimum number of n-grams that strings of the given lengths
+    must share to reach min_similarity as calculated by
+    L{translate.search.lshtein.LevenshteinComparer}.
+
+    If max_len is given, strings longer than that are truncated by the
+    comparer, and no lower bound can be given for them."""
+    longest = max(length_a, length_b)
+    if max_len is not None and longest > max_len:
+        return 0
+    # the tiny extra avoids pruning candidates right at the cutoff because of
+    # floating point rounding
+    max_distance = int((100 - min_similarity) * longest / 100.0 + 1e-9)
+    return longest - n + 1 - max_distance * n
+
+
+class NgramIndex(object):
+    """An inverted index from n-grams to the keys of the strings containing
+    them, grouped by the length of the strings.
+
+    The pruned and passed attributes count the candidates that were
+    discarded or kept by all queries on this index."""
+
+    def __init__(self, n=NGRAM_LENGTH):
+        self.n = n
+        self.postings = {}
+        self.pruned = 0
+        self.passed = 0
+
+    def add(self, key, text):
+        """Adds text to the index, identified by key"""
+        length = len(text)
+        for gram, count in ngrams(text, self.n).iteritems():
+            self.postings.setdefault(gram, {}).setdefault(length, []).append((key, count))
+
+    def query(self, text, max_len=None, minlen=0, maxlen=None):
+        """Returns an L{NgramQuery} to filter candidates for text with a
+        length between minlen and maxlen"""
+        return NgramQuery(self, text, max_len, minlen, maxlen)
+
+
+class NgramQuery(object):
+    """The n-grams shared by a query string with every string in an
+    L{NgramIndex} with a length between minlen and maxlen"""
+
+    def __init__(self, index, text, max_len=None, minlen=0, maxlen=None):
+        self.index = index
+        self.length = len(text)
+        self.max_len = max_len
+        self.minlen = minlen
+        self.maxlen = maxlen
+        self.shared = {}
+        shared = self.shared
+        postings = index.postings
+        for gram, count in ngrams(text, index.n).iteritems():
+            for length, keys in postings.get(gram, {}).iteritems():
+                if length < minlen or (maxlen is not None and length > maxlen):
+                    continue
+                for key, candidatecount in keys:
+                    shared[key] = shared.get(key, 0) + min(count, candidatecount)
+
+    def possible(self, key, length, min_similarity):
+        """Returns whether the candidate identified by key, with the given
+        length, can possibly reach min_similarity. Candidates outside the
+        length window of the query are never pruned."""
+        if length < self.minlen or (self.maxlen is not None and length > self.maxlen):
+            self.index.passed += 1
+            return True
+        bound = min_shared(self.length, length, min_similarity, self.index.n, self.max_len)
+        if bound > 0 and self.shared.get(key, 0) < bound:
+            self.index.pruned += 1
+            return False
+        self.index.passed += 1
+        return True
@@ -0,0 +1,27 @@
+from translate.search import ahocorasick
+
+
+class TestAutomaton:
+    """Test the multi-pattern matcher"""
+
+    def test_findfirst(self):
+        """Tests that the first occurrence of every pattern is found"""
+        automaton = ahocorasick.Automaton(["he", "she", "his", "hers", "x"])
+        assert automaton.findfirst("ushers") == {"she": 1, "he": 2, "hers": 2}
+        assert automaton.findfirst("his hers") == {"his": 0, "he": 4, "hers": 4}
+        assert automaton.findfirst("") == {}
+
+    def test_iterfind(self):
+        """Tests that overlapping occurrences are all found"""
+        automaton = ahocorasick.Automaton(["aa", "a"])
+        assert list(automaton.iterfind("aaa")) == \
+               [(0, "a"), (0, "aa"), (1, "a"), (1, "aa"), (2, "a")]
+
+    def test_add(self):
+        """Tests that patterns can be added after a search"""
+        automaton = ahocorasick.Automaton([u"l\xeaer"])
+        assert automaton.findfirst(u"Open l\xeaers") == {u"l\xeaer": 5}
+        automaton.add(u"open")
+        automaton.add(u"")
+        assert len(automaton) == 2
+        assert automaton.findfirst(u"open l\xeaers") == {u"open": 0, u"l\xeaer": 5}
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+from translate.search import compiledtm
+from translate.search import match
+from translate.storage import po
+from translate.misc.multistring import multistring
+
+
+class TestCompiledTM:
+
+    def setup_method(self, method):
+        self.filename = "%s_%s.ctm" % (self.__class__.__name__, method.__name__)
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def teardown_method(self, method):
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def buildstore(self, sources):
+        store = po.pofile()
+        for source in sources:
+            unit = store.addsourceunit(source)
+            unit.target = source.upper()
+        return store
+
+    def compile(self, stores):
+        tmfile = open(self.filename, "wb")
+        compiledtm.writetm(match.matcher(stores).candidates.units, tmfile)
+        tmfile.close()
+        return compiledtm.CompiledTM(self.filename)
+
+    def test_roundtrip(self):
+        """test that entries are read back as written, sorted by length"""
+        store = self.buildstore([u"Ek skop die bal", u"hand", u"Hy skop die bal", u"Tuisblad ê"])
+        # units[0] is the header
+        store.units[2].addnote(u"a note", origin="translator")
+        store.units[2].markfuzzy()
+        store.addsourceunit(multistring([u"%d file", u"%d files"])).target = [u"%d lêer", u"%d lêers"]
+        matcher = match.matcher(store, usefuzzy=True)
+        tmfile = open(self.filename, "wb")
+        compiledtm.writetm(matcher.candidates.units, tmfile)
+        tmfile.close()
+        assert compiledtm.iscompiledtm(self.filename)
+        assert not compiledtm.iscompiledtm(__file__)
+        tm = compiledtm.CompiledTM(self.filename)
+        assert len(tm) == 5
+        assert [unit.source for unit in tm] == [unit.source for unit in matcher.candidates.units]
+        assert tm[0].source == u"hand"
+        assert tm[0].fuzzy
+        assert tm[0].getnotes() == u"a note"
+        assert tm[1].source == u"%d file"
+        assert tm[1].orig_target == multistring([u"%d lêer", u"%d lêers"])
+        assert tm[-1].target == u"HY SKOP DIE BAL"
+        assert tm.lengthstart(0) == 0
+        assert tm.lengthstart(5) == 1
+        assert tm.lengthstart(15) == 3
+        assert tm.lengthstart(16) == 5
+        assert tm.lengthstart(100) == 5
+        tm.close()
+
+    def test_matching(self):
+        """test that matching against a compiled TM gives the same results"""
+        store = self.buildstore([u"hand", u"asdf", u"fdas", u"haas", u"pond",
+                                 u"Ek skop die bal", u"Hy skop die bal", u"Ek skop die balle"])
+        tm = self.compile(store)
+        expected = match.matcher(store)
+        compiled = match.matcher(tm)
+        for text in (u"hond", u"Ek skop die bal", u"Jy skop die bal"):
+            # ties are returned in arbitrary order
+            results = [(unit.source, unit.target, unit.getnotes()) for unit in compiled.matches(text)]
+            assert sorted(results) == sorted([(unit.source, unit.target, unit.getnotes())
+                                              for unit in expected.matches(text)])
+        compiled.extendtm(self.buildstore([u"hund"]).units)
+        assert u"hund" in [unit.source for unit in compiled.matches(u"hond")]
+        tm.close()
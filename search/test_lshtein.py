@@ -33,3 +33,29 @@ class TestLevenshtein:
         #since the sentence is long it might be chopped and report higher.
         assert levenshtein.similarity(sentence, sentence[0:62], 0) > 25
         assert levenshtein.similarity(sentence, sentence[0:62], 0) < 50
+
+    def test_bitdistance(self):
+        """Tests that the bit-parallel distance is the same as the one of
+        python_distance"""
+        for a, b in [("word", "word"), ("word", "woord"), ("kitten", "sitting"),
+                     (u"caf\xe9", u"cafe"), ("a", "aaaaaaaa"), ("abcdef", "fedcba")]:
+            for first, second in [(a, b), (b, a)]:
+                masks = lshtein._bitmasks(first)
+                assert lshtein._bitdistance(masks, len(first), second, 100) == \
+                       lshtein.python_distance(first, second)
+        # it gives up when the distance must be more than stopvalue
+        masks = lshtein._bitmasks("aaaaaaaaaa")
+        assert lshtein._bitdistance(masks, 10, "bbbbbbbbbb", 3) > 3
+
+    def test_similarities(self):
+        """Tests that scoring many candidates at once gives the same results
+        as scoring them one by one"""
+        sentence = "A long, dreary sentence about a cow that never new his mother."
+        candidates = ["", "word", "words", "wood", "A cow", sentence, sentence[:30],
+                      sentence.upper(), "w" * 200]
+        levenshtein = lshtein.LevenshteinComparer(max_len=40)
+        for text in ["word", sentence, ""]:
+            for stoppercentage in [0, 40, 75]:
+                assert levenshtein.similarities(text, candidates, stoppercentage) == \
+                       [levenshtein.similarity(text, candidate, stoppercentage)
+                        for candidate in candidates]
@@ -43,6 +43,36 @@ class TestMatch:
         candidates.sort()
         assert candidates[1:] == ["Ek skop die balle", "Hy skop die bal"]
 
+    def test_ngramfilter(self):
+        """Test that the n-gram filter does not change the results"""
+        sources = ["Hy skop die bal", "Ek skop die bal", "Jannie skop die bal",
+                   "Ek skop die balle", "Niemand skop die bal nie", "hand",
+                   "pond", "Ek sing", "Bal skop ek", "Sy hou van sokker",
+                   "Ons hardloop baie"]
+        csvfile = self.buildcsv(sources)
+        matcher = match.matcher(csvfile)
+        filtered = match.matcher(csvfile, ngramfilter=True)
+        for text in sources + ["hond", "Ek skop die bal nie"]:
+            # ties are returned in arbitrary order
+            expected = sorted(self.candidatestrings(matcher.matches(text)))
+            assert sorted(self.candidatestrings(filtered.matches(text))) == expected
+        assert filtered.ngramindex.pruned > 0
+        filtered.extendtm(self.buildcsv(["Ons skop die bal"]).units)
+        assert filtered.ngramindex is None
+        assert "Ons skop die bal" in self.candidatestrings(filtered.matches("Ons skop die balle"))
+
+    def test_compact_candidates(self):
+        """Test that candidates are kept as compact records, and full units
+        are only built for the results"""
+        csvfile = self.buildcsv(["hand", "pond"], ["hand", "dam"])
+        matcher = match.matcher(csvfile)
+        candidate = matcher.candidates.units[0]
+        assert isinstance(candidate, match.candidateunit)
+        assert not hasattr(candidate, "__dict__")
+        units = matcher.matches("hand")
+        assert units[0].target == "hand"
+        assert units[0].getnotes() == "100%"
+
     def test_multiple_store(self):
         """Test using multiple datastores"""
         csvfile1 = self.buildcsv(["hand", "asdf", "fdas"])
@@ -87,6 +117,19 @@ class TestMatch:
         candidates.sort()
         assert candidates == ["computer", "file"]
 
+    def test_terminology_overlap(self):
+        """Tests that the longest of overlapping terms is used, and that the
+        automaton follows extendtm()"""
+        csvfile = self.buildcsv(["file", "file manager", "manager", "open"])
+        matcher = match.terminologymatcher(csvfile)
+        candidates = self.candidatestrings(matcher.matches("Open the file manager"))
+        assert candidates == ["open", "file manager"]
+        assert matcher.match_info["file manager"]["pos"] == 9
+        csvfile2 = self.buildcsv(["the file"])
+        matcher.extendtm(csvfile2.units, store=csvfile2)
+        candidates = self.candidatestrings(matcher.matches("Open the file manager"))
+        assert candidates == ["open", "the file", "manager"]
+
     def test_brackets(self):
         """Tests that brackets at the end of a term are ignored"""
         csvfile = self.buildcsv(["file (noun)", "ISP (Internet Service Provider)"])
@@ -128,3 +171,23 @@ class TestMatch:
         assert candidates == ["preorder"]
         candidates = self.candidatestrings(matcher.matches("You can pre order"))
         assert candidates == ["pre order"]
+
+    def test_unit2dict(self):
+        """Tests that terminology matches can be converted for the web"""
+        csvfile = self.buildcsv(["file"], [u"l\xeaer"])
+        matcher = match.terminologymatcher(csvfile)
+        unit = matcher.matches("Open the file")[0]
+        assert match.unit2dict(unit) == {"source": "file", "target": u"l\xeaer",
+                                         "quality": None, "context": u""}
+        assert unit.getid() == "file"
+        assert unit.getlocations() == []
+        assert not unit.hasplural()
+
+    def test_altered_forms_fuzzy(self):
+        """Tests that altered forms of terms keep the state of the term"""
+        csvfile = self.buildcsv(["pre-order"])
+        matcher = match.terminologymatcher(csvfile)
+        for text in ("You can pre-order", "You can preorder", "You can pre order"):
+            matches = matcher.matches(text)
+            assert len(matches) == 1
+            assert not matches[0].isfuzzy()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from translate.search import lshtein
+from translate.search import ngram
+
+
+def test_ngrams():
+    """test counting of n-grams"""
+    assert ngram.ngrams(u"ab") == {}
+    assert ngram.ngrams(u"abc") == {u"abc": 1}
+    assert ngram.ngrams(u"aaaa") == {u"aaa": 2}
+    assert ngram.ngrams(u"abcd", 2) == {u"ab": 1, u"bc": 1, u"cd": 1}
+
+
+def test_min_shared():
+    """test the count filter bound"""
+    # identical strings of length 10 share all 8 trigrams
+    assert ngram.min_shared(10, 10, 100) == 8
+    # one edit allowed, which destroys at most 3 trigrams
+    assert ngram.min_shared(10, 10, 90) == 5
+    # no bound for strings truncated by the comparer
+    assert ngram.min_shared(10, 80, 10, max_len=70) == 0
+
+
+def test_filter_is_lossless():
+    """test that the filter never prunes a candidate that reaches the cutoff"""
+    comparer = lshtein.LevenshteinComparer()
+    candidates = [u"Open file", u"Open files", u"Open a file", u"Close file",
+                  u"Save file", u"Open fi le", u"file Open", u"Openfile",
+                  u"Ek skop die bal", u"Hy skop die bal", u"zzzzzzzzz"]
+    index = ngram.NgramIndex()
+    for key, candidate in enumerate(candidates):
+        index.add(key, candidate)
+    for text in candidates:
+        for min_similarity in (30, 50, 75, 90, 100):
+            query = index.query(text, comparer.MAX_LEN)
+            for key, candidate in enumerate(candidates):
+                possible = query.possible(key, len(candidate), min_similarity)
+                similarity = comparer.similarity(text, candidate, min_similarity)
+                if similarity >= min_similarity:
+                    assert possible
+    assert index.pruned > 0
+
+
+def test_length_window():
+    """test that only candidates inside the length window are counted, and
+    that the others are not pruned"""
+    index = ngram.NgramIndex()
+    candidates = [u"Open file", u"Open the file", u"Open the file now, please"]
+    for key, candidate in enumerate(candidates):
+        index.add(key, candidate)
+    query = index.query(u"Open file", minlen=7, maxlen=12)
+    assert query.shared.keys() == [0]
+    assert query.possible(0, len(candidates[0]), 90)
+    assert query.possible(2, len(candidates[2]), 90)
+    assert index.pruned == 0
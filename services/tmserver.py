@@ -40,12 +40,14 @@ class TMServer(object):
     """A RESTful JSON TM server."""
 
     def __init__(self, tmdbfile, tmfiles, max_candidates=3, min_similarity=75,
-            max_length=1000, prefix="", source_lang=None, target_lang=None):
+            max_length=1000, prefix="", source_lang=None, target_lang=None,
+            use_index=False, ngram_filter=False):
         if not isinstance(tmdbfile, unicode):
             import sys
             tmdbfile = tmdbfile.decode(sys.getfilesystemencoding())
 
-        self.tmdb = tmdb.TMDB(tmdbfile, max_candidates, min_similarity, max_length)
+        self.tmdb = tmdb.TMDB(tmdbfile, max_candidates, min_similarity, max_length,
+                              use_index=use_index, ngram_filter=ngram_filter)
 
         if tmfiles:
             self._load_files(tmfiles, source_lang, target_lang)
@@ -58,6 +60,9 @@ class TMServer(object):
                       PUT=self.add_unit,
                       DELETE=self.forget_unit)
 
+        self.rest.add("/{slang}/{tlang}/units/",
+                      POST=self.translate_units)
+
         self.rest.add("/{slang}/{tlang}/store/{sid:any}",
                       GET=self.get_store_stats,
                       PUT=self.upload_store,
@@ -67,10 +72,10 @@ class TMServer(object):
     def _load_files(self, tmfiles, source_lang, target_lang):
         from translate.storage import factory
         if isinstance(tmfiles, list):
-            [self.tmdb.add_store(factory.getobject(tmfile), source_lang, target_lang) \
+            [self.tmdb.add_units(factory.iterunits(tmfile), source_lang, target_lang) \
                     for tmfile in tmfiles]
         elif tmfiles:
-            self.tmdb.add_store(factory.getobject(tmfiles), source_lang, target_lang)
+            self.tmdb.add_units(factory.iterunits(tmfiles), source_lang, target_lang)
 
     @selector.opliant
     def translate_unit(self, environ, start_response, uid, slang, tlang):
@@ -86,6 +91,16 @@ class TMServer(object):
             pass
         return [response]
 
+    @selector.opliant
+    def translate_units(self, environ, start_response, slang, tlang):
+        """return suggestions for a JSON list of source strings as a list of
+        lists of candidates, in the same order"""
+        start_response("200 OK", [('Content-type', 'text/plain')])
+        sources = json.loads(environ['wsgi.input'].read(int(environ['CONTENT_LENGTH'])))
+        candidates = self.tmdb.translate_units(sources, slang, tlang)
+        response = json.dumps(candidates)
+        return [response]
+
     @selector.opliant
     def add_unit(self, environ, start_response, uid, slang, tlang):
         start_response("200 OK", [('Content-type', 'text/plain')])
@@ -173,6 +188,10 @@ def main():
                       help="minimum similarity")
     parser.add_option("--max-length", dest="max_length", type="int", default=1000,
                       help="Maxmimum string length")
+    parser.add_option("--in-memory-index", action="store_true", dest="use_index", default=False,
+                      help="answer queries from an in-memory index instead of the database")
+    parser.add_option("--ngram-filter", action="store_true", dest="ngram_filter", default=False,
+                      help="skip hopeless candidates with a trigram index (requires --in-memory-index)")
     parser.add_option("--debug", action="store_true", dest="debug", default=False,
                       help="enable debugging features")
 
@@ -197,7 +216,8 @@ def main():
 
     application = TMServer(options.tmdbfile, options.tmfiles, max_candidates=options.max_candidates,
                            min_similarity=options.min_similarity, max_length=options.max_length,
-                           prefix="/tmserver", source_lang=options.source_lang, target_lang=options.target_lang)
+                           prefix="/tmserver", source_lang=options.source_lang, target_lang=options.target_lang,
+                           use_index=options.use_index, ngram_filter=options.ngram_filter)
     wsgi.launch_server(options.bind, options.port, application.rest)
 
 
@@ -26,6 +26,8 @@
 """
 
 import logging
+import os
+import tempfile
 try:
     import cPickle as pickle
 except ImportError:
@@ -487,6 +489,9 @@ class TranslationStore(object):
     """A list of file extentions associated with this store type"""
     _binary = False
     """Indicates whether a file should be accessed as a binary file."""
+    _picklable = True
+    """Indicates whether the store survives pickling, so that it can be kept
+    in a L{storecache.StoreCache}."""
     suggestions_in_format = False
     """Indicates if format can store suggestions and alternative translation
     for a unit"""
@@ -762,18 +767,69 @@ class TranslationStore(object):
         """parser to process the given source string"""
         self.units = pickle.loads(data).units
 
+    def iterserialize(self):
+        """Yields the string representation of the store in parts, that
+        together are the same as str(self).
+
+        Stores that can convert their units one at a time override this, so
+        that the output doesn't have to be built in memory as a whole."""
+        yield str(self)
+
+    def serialize(self, out):
+        """Writes the string representation to the file-like object out."""
+        for chunk in self.iterserialize():
+            out.write(chunk)
+
     def savefile(self, storefile):
-        """Writes the string representation to the given file (or filename)."""
-        storestring = str(self)
+        """Writes the string representation to the given file (or filename).
+
+        A filename is written through a temporary file in the same directory,
+        that only replaces it once the store was serialised completely, so
+        that a failure doesn't destroy the existing file."""
         if isinstance(storefile, basestring):
-            mode = 'w'
-            if self._binary:
-                mode = 'wb'
-            storefile = open(storefile, mode)
+            self._savefilename(storefile)
+            self.fileobj = None
+            self.filename = storefile
+            return
+        try:
+            self.serialize(storefile)
+        finally:
+            storefile.close()
         self.fileobj = storefile
         self._assignname()
-        storefile.write(storestring)
-        storefile.close()
+
+    def _savefilename(self, filename):
+        """Serialises the store to a temporary file that is then renamed to
+        filename"""
+        mode = 'w'
+        if self._binary:
+            mode = 'wb'
+        # replace the file a symbolic link points to, not the link
+        realpath = os.path.realpath(filename)
+        handle, temppath = tempfile.mkstemp(prefix=".", suffix=".tmp",
+                                            dir=os.path.dirname(realpath))
+        try:
+            tempfileobj = os.fdopen(handle, mode)
+            try:
+                self.serialize(tempfileobj)
+            finally:
+                tempfileobj.close()
+            # mkstemp only lets the owner read the file
+            if os.path.exists(realpath):
+                filemode = os.stat(realpath).st_mode & 07777
+            else:
+                umask = os.umask(0)
+                os.umask(umask)
+                filemode = 0666 & ~umask
+            os.chmod(temppath, filemode)
+            if os.name == "nt" and os.path.exists(realpath):
+                # Windows can't rename over an existing file
+                os.remove(realpath)
+            os.rename(temppath, realpath)
+        except:
+            if os.path.exists(temppath):
+                os.remove(temppath)
+            raise
 
     def save(self):
         """Save to the file that data was originally read from, if
@@ -783,9 +839,13 @@ class TranslationStore(object):
         if self._binary:
             mode = 'wb'
         if not fileobj:
-            filename = getattr(self, "filename", None)
-            if filename:
-                fileobj = file(filename, mode)
+            # savefile writes filenames through a temporary file
+            fileobj = getattr(self, "filename", None)
+        elif isinstance(fileobj, file):
+            fileobj.close()
+            fileobj = getattr(fileobj, "name", None)
+            if not fileobj:
+                raise ValueError("No file or filename to save to")
         else:
             fileobj.close()
             filename = getattr(fileobj, "name",
@@ -815,3 +875,14 @@ class TranslationStore(object):
         newstore._assignname()
         return newstore
     parsefile = classmethod(parsefile)
+
+    def iterfile(cls, storefile):
+        """Yields the units in the given file (or filename) one at a time.
+
+        Stores that can parse a file incrementally override this, so that
+        tools that only need to look at every unit once don't have to keep
+        the whole file in memory. The store the units belong to might not
+        contain all of them."""
+        for unit in cls.parsefile(storefile).units:
+            yield unit
+    iterfile = classmethod(iterfile)
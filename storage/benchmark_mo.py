@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Shows how writing MO files with L{translate.storage.mo} scales with the
+number of messages, compared to building the string tables by concatenation
+as it was done before.
+
+The concatenation is only timed up to 20000 messages, since it takes very
+long for more.
+
+Usage: benchmark_mo.py [largest number of messages]
+"""
+
+import sys
+import time
+
+from translate.storage import mo
+
+LEGACY_LIMIT = 20000
+
+
+def legacy_tables(keys, values):
+    ids = strs = ''
+    offsets = []
+    for id, string in zip(keys, values):
+        offsets.append((len(ids), len(id), len(strs), len(string)))
+        ids = ids + id + '\0'
+        strs = strs + string + '\0'
+    koffsets = []
+    voffsets = []
+    for o1, l1, o2, l2 in offsets:
+        koffsets = koffsets + [l1, o1]
+        voffsets = voffsets + [l2, o2]
+    return ids, strs, koffsets + voffsets
+
+
+def sample_store(count):
+    store = mo.mofile()
+    for i in range(count):
+        unit = mo.mounit(u"Message number %d with some text" % i)
+        unit.target = u"Boodskap nommer %d met énige teks" % i
+        store.addunit(unit)
+    return store
+
+
+def main():
+    largest = 80000
+    if len(sys.argv) > 1:
+        largest = int(sys.argv[1])
+    count = 1000
+    print "%8s %10s %12s %10s" % ("messages", "mo (s)", "us/message", "legacy (s)")
+    while count <= largest:
+        store = sample_store(count)
+        start = time.time()
+        for chunk in store.iterserialize():
+            pass
+        elapsed = time.time() - start
+        legacy = "-"
+        if count <= LEGACY_LIMIT:
+            keys = [unit.source.encode("utf-8") for unit in store.units]
+            keys.sort()
+            values = [unit.target.encode("utf-8") for unit in store.units]
+            start = time.time()
+            legacy_tables(keys, values)
+            legacy = "%.3f" % (time.time() - start)
+        print "%8d %10.3f %12.1f %10s" % (count, elapsed, elapsed * 1e6 / count, legacy)
+        count *= 2
+        if count > largest and count / 2 < largest:
+            count = largest
+
+if __name__ == "__main__":
+    main()
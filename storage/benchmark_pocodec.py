@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Compares the PO line codec in L{translate.storage.pypo} with the generic
+quoting functions it replaced, on the strings of a large generated PO file.
+
+Usage: benchmark_pocodec.py [number of units]
+"""
+
+import random
+import sys
+import time
+
+from translate.misc import quote
+from translate.storage import pypo
+
+sample_words = ["file", "open", "%s", '"quoted"', "C:\\path", "tab\t",
+                "line\n", "window", "the", "a", u"caf\u00e9", u"\u65e5\u672c"]
+
+
+def legacy_extractpoline(line):
+    return quote.extractwithoutquotes(line, '"', '"', '\\', includeescapes=pypo.unescapehandler)[0]
+
+
+def legacy_escapeforpo(line):
+    special_locations = []
+    for special_key in pypo.po_escape_map:
+        special_locations.extend(quote.find_all(line, special_key))
+    special_locations = dict.fromkeys(special_locations).keys()
+    special_locations.sort()
+    escaped_line = ""
+    last_location = 0
+    for location in special_locations:
+        escaped_line += line[last_location:location]
+        escaped_line += pypo.po_escape_map[line[location:location+1]]
+        last_location = location + 1
+    escaped_line += line[last_location:]
+    return escaped_line
+
+
+def sample_strings(count):
+    random.seed(0)
+    strings = []
+    for i in range(count):
+        words = [random.choice(sample_words) for j in range(random.randint(1, 25))]
+        strings.append(u" ".join(words))
+    return strings
+
+
+def timeit(function, items):
+    start = time.time()
+    for item in items:
+        function(item)
+    return time.time() - start
+
+
+def main():
+    count = 20000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    strings = sample_strings(count)
+    lines = []
+    for string in strings:
+        lines.extend(pypo.quoteforpo(string))
+    escapelines = [string.replace(u"\n", u"") for string in strings]
+    print "%d strings, %d quoted lines" % (len(strings), len(lines))
+    for name, legacy, codec, items in [
+            ("unquote", legacy_extractpoline, pypo.extractpoline, lines),
+            ("escape", legacy_escapeforpo, pypo.escapeforpo, escapelines)]:
+        legacytime = timeit(legacy, items)
+        codectime = timeit(codec, items)
+        print "%-8s legacy %.3fs  codec %.3fs  speedup %.1fx" % \
+              (name, legacytime, codectime, legacytime / max(codectime, 1e-6))
+
+if __name__ == "__main__":
+    main()
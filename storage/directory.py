@@ -34,8 +34,11 @@ from translate.storage import factory
 class Directory:
     """This class represents a directory."""
 
-    def __init__(self, dir=None):
+    def __init__(self, dir=None, onlystores=False):
+        """If onlystores is True, only files that L{factory.sniff} recognises
+        as translation stores are included."""
         self.dir = dir
+        self.onlystores = onlystores
         self.filedata = []
 
     def file_iter(self):
@@ -68,7 +71,11 @@ class Directory:
 
         def addfile(arg, dirname, fnames):
             for fname in fnames:
-                if path.isfile(path.join(dirname, fname)):
-                    self.filedata.append((dirname, fname))
+                fullname = path.join(dirname, fname)
+                if not path.isfile(fullname):
+                    continue
+                if self.onlystores and factory.sniff(fullname) is None:
+                    continue
+                self.filedata.append((dirname, fname))
 
         path.walk(self.dir, addfile, None)
@@ -43,11 +43,28 @@ from translate.misc import quote
 
 import re
 import warnings
-try:
-    from lxml import etree
-    import StringIO
-except ImportError:
-    etree = None
+
+
+class _ChunkReader(object):
+    """A file-like object to read the strings of an iterator as one stream,
+    without joining them"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += self._chunks.next()
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        data = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return data
+
 
 labelsuffixes = (".label", ".title")
 """Label suffixes: entries with this suffix are able to be comibed with accesskeys
@@ -445,6 +462,15 @@ class dtdfile(base.TranslationStore):
             return source.encode(getattr(self, "encoding", "UTF-8"))
         return source
 
+    def iterserialize(self):
+        """yields the source of every unit in turn, raising a TypeError (like
+        str() does) if the store doesn't validate"""
+        if not self._valid_store():
+            warnings.warn("DTD file '%s' does not validate" % self.filename)
+            raise TypeError("DTD file '%s' does not validate" % self.filename)
+        for dtd in self.units:
+            yield str(dtd)
+
     def getoutput(self):
         """convert the units back to source"""
         sources = [str(dtd) for dtd in self.units]
@@ -465,10 +491,17 @@ class dtdfile(base.TranslationStore):
         @return: If the store passes validation
         @rtype: Boolean
         """
+        # lxml is only imported here, so that tools that don't write DTD
+        # files (like podebug) don't have to load it
+        try:
+            from lxml import etree
+        except ImportError:
+            etree = None
         if etree is not None:
             try:
                 # #expand is a Mozilla hack and are removed as they are not valid in DTDs
-                dtd = etree.DTD(StringIO.StringIO(re.sub("#expand", "", self.getoutput())))
+                sources = (re.sub("#expand", "", str(dtd)) for dtd in self.units)
+                dtd = etree.DTD(_ChunkReader(sources))
             except etree.DTDParseError:
                 return False
         return True
@@ -21,6 +21,7 @@
 
 """factory methods to build real storage objects that conform to base.py"""
 
+import cStringIO
 import os
 
 
@@ -85,28 +86,125 @@ def _examine_txt(storefile):
 hiddenclasses = {"txt": _examine_txt}
 
 
+sniffers = []
+"""Functions that recognise a type of file from its start. Each is called
+with the first L{PEEK_SIZE} bytes of a file, and returns a key of
+L{classes_str} (or L{decompressclass}), or None. See L{registersniffer}."""
+
+PEEK_SIZE = 600
+"""The number of bytes at the start of a file that sniffers look at"""
+
+
+def registersniffer(sniffer):
+    """Adds a function to the L{sniffers}. Sniffers are tried in the order
+    they were registered."""
+    sniffers.append(sniffer)
+
+
+def registermagic(magic, extension):
+    """Recognises files that start with the bytes magic as files with the
+    given extension"""
+    registersniffer(lambda start: start.startswith(magic) and extension or None)
+
+
+def registermarker(marker, extension):
+    """Recognises files that have marker close to their start as files with
+    the given extension"""
+    registersniffer(lambda start: marker in start and extension or None)
+
+registermagic("\x1f\x8b", "gz")
+registermagic("BZh", "bz2")
+registermagic("\xde\x12\x04\x95", "mo")
+registermagic("\x95\x04\x12\xde", "mo")
+registermagic("\x3c\xb8\x64\x18\xca\xef\x9c\x95\xcd\x21\x1c\xbf\x60\xa1\xbd\xdd", "qm")
+registermarker('<xliff ', 'xlf')
+registermarker('msgid "', 'po')
+registermarker('%Wordfast TM', 'txt')
+registermarker('<!DOCTYPE TS>', 'ts')
+registermarker('<tmx ', 'tmx')
+registermarker('#UTX', 'utx')
+registermarker('<martif', 'tbx')
+registermarker('<!DOCTYPE QPH>', 'qph')
+registermarker('<RTF Preamble>', 'txt')
+
+
+def _sniffstart(start):
+    """Returns the extension that the sniffers find for a file that starts
+    with start, or None"""
+    for sniffer in sniffers:
+        extension = sniffer(start)
+        if extension:
+            return extension
+    return None
+
+
 def _guessextention(storefile):
     """Guesses the type of a file object by looking at the first few characters.
     The return value is a file extention ."""
     start = storefile.read(300).strip()
-    if '<xliff ' in start:
-        extention = 'xlf'
-    elif 'msgid "' in start:
-        extention = 'po'
-    elif '%Wordfast TM' in start:
-        extention = 'txt'
-    elif '<!DOCTYPE TS>' in start:
-        extention = 'ts'
-    elif '<tmx ' in start:
-        extention = 'tmx'
-    elif '#UTX' in start:
-        extention = 'utx'
-    else:
+    extention = _sniffstart(start)
+    # compressed files can only be opened by name
+    if extention not in classes_str and extention not in hiddenclasses:
         raise ValueError("Failed to guess file type.")
     storefile.seek(0)
     return extention
 
 
+def _peek(filename, decomp=None):
+    """Returns the first L{PEEK_SIZE} bytes of the (decompressed) file"""
+    if decomp:
+        _module, _class = decompressclass[decomp]
+        module = __import__(_module, globals(), {}, [])
+        storefile = getattr(module, _class)(filename)
+    else:
+        storefile = open(filename, "rb")
+    try:
+        return storefile.read(PEEK_SIZE)
+    finally:
+        storefile.close()
+
+
+def sniff(filename):
+    """Returns the key in L{classes_str} for the type of store in the named
+    file, or None if it isn't a file we can parse.
+
+    A known extension is trusted without opening the file; otherwise the
+    first bytes of the file are given to the L{sniffers}."""
+    root, ext = os.path.splitext(filename)
+    ext = ext[len(os.path.extsep):].lower()
+    decomp = None
+    if ext in decompressclass:
+        decomp = ext
+        root, ext = os.path.splitext(root)
+        ext = ext[len(os.path.extsep):].lower()
+    if ext in classes_str:
+        return ext
+    try:
+        start = _peek(filename, decomp)
+        if not decomp:
+            decomp = _sniffstart(start)
+            if decomp not in decompressclass:
+                decomp = None
+            else:
+                start = _peek(filename, decomp)
+    except (IOError, EOFError), e:
+        return None
+    if ext in hiddenclasses:
+        try:
+            return hiddenclasses[ext](cStringIO.StringIO(start))
+        except ValueError, e:
+            return None
+    extension = _sniffstart(start.strip())
+    if extension in hiddenclasses:
+        try:
+            extension = hiddenclasses[extension](cStringIO.StringIO(start))
+        except ValueError, e:
+            return None
+    if extension in classes_str:
+        return extension
+    return None
+
+
 def _getdummyname(storefile):
     """Provides a dummy name for a file object without a name attribute, by guessing the file type."""
     return 'dummy.' + _guessextention(storefile)
@@ -161,6 +259,32 @@ def getclass(storefile, ignore=None, classes=None, classes_str=classes_str, hidd
     return storeclass
 
 
+storecache = None
+"""The L{storecache.StoreCache} that getobject() takes parsed stores from.
+Caching is off unless this is set, or the TRANSLATE_STORECACHE environment
+variable names a cache directory."""
+
+
+def _getstorecache():
+    global storecache
+    if storecache is None and os.environ.get("TRANSLATE_STORECACHE"):
+        from translate.storage.storecache import StoreCache
+        storecache = StoreCache(os.environ["TRANSLATE_STORECACHE"])
+    return storecache
+
+
+def _parsestore(storefile, storefilename, storeclass):
+    """Parses the existing storefile, decompressing it if necessary"""
+    name, ext = os.path.splitext(storefilename)
+    ext = ext[len(os.path.extsep):].lower()
+    if ext in decompressclass:
+        _module, _class = decompressclass[ext]
+        module = __import__(_module, globals(), {}, [])
+        _file = getattr(module, _class)
+        storefile = _file(storefilename)
+    return storeclass.parsefile(storefile)
+
+
 def getobject(storefile, ignore=None, classes=None, classes_str=classes_str, hiddenclasses=hiddenclasses):
     """Factory that returns a usable object for the type of file presented.
 
@@ -168,6 +292,7 @@ def getobject(storefile, ignore=None, classes=None, classes_str=classes_str, hid
     @param storefile: File object or file name.
 
     Specify ignore to ignore some part at the back of the name (like .gz).
+    Files given by name are taken from the L{storecache} if it is enabled.
     """
 
     if isinstance(storefile, basestring):
@@ -177,20 +302,38 @@ def getobject(storefile, ignore=None, classes=None, classes_str=classes_str, hid
     storefilename = _getname(storefile)
     storeclass = getclass(storefile, ignore, classes=classes, classes_str=classes_str, hiddenclasses=hiddenclasses)
     if os.path.exists(storefilename) or not getattr(storefile, "closed", True):
-        name, ext = os.path.splitext(storefilename)
-        ext = ext[len(os.path.extsep):].lower()
-        if ext in decompressclass:
-            _module, _class = decompressclass[ext]
-            module = __import__(_module, globals(), {}, [])
-            _file = getattr(module, _class)
-            storefile = _file(storefilename)
-        store = storeclass.parsefile(storefile)
+        cache = _getstorecache()
+        if cache is not None and isinstance(storefile, basestring):
+            store = cache.getstore(storefilename, storeclass,
+                                   lambda: _parsestore(storefile, storefilename, storeclass))
+        else:
+            store = _parsestore(storefile, storefilename, storeclass)
     else:
         store = storeclass()
         store.filename = storefilename
     return store
 
 
+def iterunits(storefile, ignore=None, classes=None, classes_str=classes_str, hiddenclasses=hiddenclasses):
+    """Factory that returns an iterator over the units in the file presented,
+    that doesn't keep the whole file in memory if the store supports it. See
+    L{base.TranslationStore.iterfile}.
+
+    @type storefile: file or str
+    @param storefile: File object or file name.
+    """
+    storefilename = _getname(storefile)
+    storeclass = getclass(storefile, ignore, classes=classes, classes_str=classes_str, hiddenclasses=hiddenclasses)
+    name, ext = os.path.splitext(storefilename)
+    ext = ext[len(os.path.extsep):].lower()
+    if ext in decompressclass:
+        _module, _class = decompressclass[ext]
+        module = __import__(_module, globals(), {}, [])
+        _file = getattr(module, _class)
+        storefile = _file(storefilename)
+    return storeclass.iterfile(storefile)
+
+
 supported = [
         ('Gettext PO file', ['po', 'pot'], ["text/x-gettext-catalog", "text/x-gettext-translation", "text/x-po", "text/x-pot"]),
         ('XLIFF Translation File', ['xlf', 'xliff', 'sdlxliff'], ["application/x-xliff", "application/x-xliff+xml"]),
@@ -273,6 +273,8 @@ class LISAfile(base.TranslationStore):
     XMLskeleton = ""
 
     namespace = None
+    # lxml elements don't survive pickling
+    _picklable = False
 
     def __init__(self, inputfile=None, sourcelanguage='en',
                  targetlanguage=None, unitclass=None):
@@ -326,6 +328,15 @@ class LISAfile(base.TranslationStore):
         return etree.tostring(self.document, pretty_print=True,
                               xml_declaration=True, encoding='utf-8')
 
+    def serialize(self, out):
+        """Writes the file's XML to the file-like object out, as lxml
+        serialises it"""
+        # lxml writes the encoding in upper case in the declaration, unlike
+        # etree.tostring()
+        out.write("<?xml version='1.0' encoding='utf-8'?>\n")
+        self.document.write(out, pretty_print=True, xml_declaration=False,
+                            encoding='utf-8')
+
     def parse(self, xml):
         """Populates this object from the given xml string"""
         if not hasattr(self, 'filename'):
@@ -347,3 +358,51 @@ class LISAfile(base.TranslationStore):
         for entry in self.document.getroot().iterdescendants(self.namespaced(self.UnitClass.rootNode)):
             term = self.UnitClass.createfromxmlElement(entry)
             self.addunit(term, new=False)
+
+    def iterfile(cls, storefile):
+        """Yields the units of the given file (or filename) one at a time,
+        while the document is parsed with etree.iterparse.
+
+        Units are taken out of the document once the parser moves past them,
+        so that only the header and the current unit are kept in memory.
+        Anything that depends on the position of a unit in the document (like
+        the id of XLIFF units in groups) should therefore be read before the
+        next unit is requested. The units belong to a store that contains none of
+        them; use the normal parsing for files that will be edited."""
+        if isinstance(storefile, basestring):
+            storefile = open(storefile, 'rb')
+        kwargs = {}
+        if etree.LXML_VERSION >= (2, 1, 0):
+            kwargs['strip_cdata'] = False
+        store = cls()
+        store.fileobj = storefile
+        store._assignname()
+        unittag = None
+        hasbody = False
+        try:
+            for event, element in etree.iterparse(storefile, events=("start", "end"), **kwargs):
+                if unittag is None:
+                    # the first event is the start of the root element
+                    store.document = element.getroottree()
+                    store.namespace = element.nsmap.get(None, None)
+                    unittag = store.namespaced(cls.UnitClass.rootNode)
+                    continue
+                if event != "end" or element.tag != unittag:
+                    continue
+                if not hasbody:
+                    # the body only exists once we reach the first unit
+                    store.initbody()
+                    hasbody = True
+                # drop the units (and anything else) we already went past;
+                # the parser might still add text after the current one
+                parent = element.getparent()
+                while element.getprevious() is not None:
+                    del parent[0]
+                unit = cls.UnitClass.createfromxmlElement(element)
+                unit.namespace = store.namespace
+                unit._store = store
+                yield unit
+            store._encoding = store.document.docinfo.encoding
+        finally:
+            storefile.close()
+    iterfile = classmethod(iterfile)
@@ -51,6 +51,8 @@ from translate.storage import po
 from translate.storage import poheader
 
 MO_MAGIC_NUMBER = 0x950412deL
+# The number of keys or values that are written out at once
+STRING_BATCH = 1000
 
 
 def mounpack(filename='messages.mo'):
@@ -95,7 +97,7 @@ def get_next_prime_number(start):
         if (num == 2) or (num == 3):
             return True
         # check for numbers > 4
-        for divider in range(2, num / 2):
+        for divider in xrange(2, int(num ** 0.5) + 1):
             if num % divider == 0:
                 return False
         return True
@@ -149,6 +151,11 @@ class mofile(poheader.poheader, base.TranslationStore):
 
     def __str__(self):
         """Output a string representation of the MO data file"""
+        return "".join(self.iterserialize())
+
+    def iterserialize(self):
+        """Yields the MO data file in parts: the header and the tables first,
+        then the keys and the values in batches"""
         # check the header of this file for the copyright note of this function
 
         def add_to_hash_table(string, i):
@@ -196,47 +203,45 @@ class mofile(poheader.poheader, base.TranslationStore):
         keys = MESSAGES.keys()
         # the keys are sorted in the .mo file
         keys.sort()
-        offsets = []
-        ids = strs = ''
+        # The header is 7 32-bit unsigned integers, followed by the key and
+        # value index and the hash table; then the keys start
+        keystart = 7 * 4 + 16 * len(keys) + hash_size * 4
+        # The index has the size of the string and the file offset of each
+        # entry. Each string is NUL terminated; the NUL does not count into
+        # the size.
+        koffsets = array.array("i")
+        values = []
+        offset = keystart
         for i, id in enumerate(keys):
-            # For each string, we need size and file offset.  Each string is
-            # NUL terminated; the NUL does not count into the size.
             # TODO: We don't do any encoding detection from the PO Header
             add_to_hash_table(id, i)
             string = MESSAGES[id] # id already encoded for use as dictionary key
             if isinstance(string, unicode):
                 string = string.encode('utf-8')
-            offsets.append((len(ids), len(id), len(strs), len(string)))
-            ids = ids + id + '\0'
-            strs = strs + string + '\0'
-        output = ''
-        # The header is 7 32-bit unsigned integers
-        keystart = 7 * 4 + 16 * len(keys) + hash_size * 4
+            values.append(string)
+            koffsets.extend((len(id), offset))
+            offset += len(id) + 1
         # and the values start after the keys
-        valuestart = keystart + len(ids)
-        koffsets = []
-        voffsets = []
-        # The string table first has the list of keys, then the list of values.
-        # Each entry has first the size of the string, then the file offset.
-        for o1, l1, o2, l2 in offsets:
-            koffsets = koffsets + [l1, o1 + keystart]
-            voffsets = voffsets + [l2, o2 + valuestart]
-        offsets = koffsets + voffsets
-        output = struct.pack("Iiiiiii",
-                             MO_MAGIC_NUMBER,   # Magic
-                             0,                 # Version
-                             len(keys),         # # of entries
-                             7 * 4,             # start of key index
-                             7 * 4 + len(keys) * 8, # start of value index
-                             hash_size,         # size of hash table
-                             7 * 4 + 2 * (len(keys) * 8)) # offset of hash table
+        voffsets = array.array("i")
+        for string in values:
+            voffsets.extend((len(string), offset))
+            offset += len(string) + 1
+        yield struct.pack("Iiiiiii",
+                          MO_MAGIC_NUMBER,   # Magic
+                          0,                 # Version
+                          len(keys),         # # of entries
+                          7 * 4,             # start of key index
+                          7 * 4 + len(keys) * 8, # start of value index
+                          hash_size,         # size of hash table
+                          7 * 4 + 2 * (len(keys) * 8)) # offset of hash table
         # additional data is not necessary for empty mo files
         if (len(keys) > 0):
-            output = output + array.array("i", offsets).tostring()
-            output = output + hash_table.tostring()
-            output = output + ids
-            output = output + strs
-        return output
+            yield koffsets.tostring()
+            yield voffsets.tostring()
+            yield hash_table.tostring()
+            for strings in (keys, values):
+                for start in xrange(0, len(strings), STRING_BATCH):
+                    yield "\0".join(strings[start:start+STRING_BATCH]) + "\0"
 
     def parse(self, input):
         """parses the given file or file source string"""
@@ -20,7 +20,6 @@
 # Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
 
 import re
-import urllib
 
 from translate.storage import base
 from translate.storage import poheader
@@ -43,6 +42,8 @@ def extract_msgid_comment(text):
 
 def quote_plus(text):
     """Quote the query fragment of a URL; replacing ' ' with '+'"""
+    # urllib is imported here, since it loads the socket and ssl modules
+    import urllib
     return urllib.quote_plus(text.encode("utf-8"))
 
 
@@ -50,6 +51,7 @@ def quote_plus(text):
 @returns(unicode)
 def unquote_plus(text):
     """unquote('%7e/abc+def') -> '~/abc def'"""
+    import urllib
     try:
         return urllib.unquote_plus(text).decode('utf-8')
     except UnicodeEncodeError, e:
@@ -311,15 +311,13 @@ def set_encoding(parse_state, store, unit):
     charset = None
     if isinstance(unit.msgstr, list) and len(unit.msgstr) > 0 and isinstance(unit.msgstr[0], str):
         charset = re.search("charset=([^\\s\\\\n]+)", "".join(unit.msgstr))
-    if charset:
+    if charset and charset.group(1) != 'CHARSET':
         encoding = charset.group(1)
-        if encoding != 'CHARSET':
-            store._encoding = encoding
-        else:
-            store._encoding = 'utf-8'
     else:
-        store._encoding = 'utf-8'
-    parse_state.encoding = store._encoding
+        encoding = 'utf-8'
+    if store is not None:
+        store._encoding = encoding
+    parse_state.encoding = encoding
 
 
 def decode_list(lst, decode):
@@ -347,9 +345,19 @@ def parse_header(parse_state, store):
     return first_unit
 
 
-def parse_units(parse_state, store):
+def iter_units(parse_state, store=None):
+    """Yields the header and then every other unit, one at a time.
+
+    The units following the header are decoded with the charset it declares,
+    which is also stored in store if one is given. The units are not added
+    to store."""
     unit = parse_header(parse_state, store)
     while unit:
-        store.addunit(unit)
+        yield unit
         unit = parse_unit(parse_state)
+
+
+def parse_units(parse_state, store):
+    for unit in iter_units(parse_state, store):
+        store.addunit(unit)
     return parse_state.eof
@@ -531,10 +531,12 @@ class propfile(base.TranslationStore):
 
     def __str__(self):
         """convert the units back to lines"""
-        lines = []
+        return "".join(self.iterserialize())
+
+    def iterserialize(self):
+        """yields the lines of every unit in turn"""
         for unit in self.units:
-            lines.append(str(unit))
-        return "".join(lines)
+            yield str(unit)
 
 
 class javafile(propfile):
@@ -41,25 +41,35 @@ lsep = "\n#: "
 po_unescape_map = {"\\r": "\r", "\\t": "\t", '\\"': '"', '\\n': '\n', '\\\\': '\\'}
 po_escape_map = dict([(value, key) for (key, value) in po_unescape_map.items()])
 
+# The PO line codec. A quoted line is scanned once by _po_string_re, which
+# skips escaped characters outside of strings and matches every string with
+# its closing quote (group 2 is empty if the line ends inside the string).
+_po_string_re = re.compile(r'\\.|"([^"\\]*(?:\\.[^"\\]*)*)("?)', re.DOTALL)
+_po_line_re = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"$', re.DOTALL)
+_po_escape_re = re.compile(r'\\.', re.DOTALL)
+_po_special_re = re.compile(r'[\r\t"\n\\]')
+
+
+def _po_unescape(match):
+    escape = match.group()
+    return po_unescape_map.get(escape, escape)
+
+
+def _po_escape(match):
+    return po_escape_map[match.group()]
+
 
 def escapeforpo(line):
     """Escapes a line for po format. assumes no \n occurs in the line.
 
     @param line: unescaped text
     """
-    special_locations = []
-    for special_key in po_escape_map:
-        special_locations.extend(quote.find_all(line, special_key))
-    special_locations = dict.fromkeys(special_locations).keys()
-    special_locations.sort()
-    escaped_line = ""
-    last_location = 0
-    for location in special_locations:
-        escaped_line += line[last_location:location]
-        escaped_line += po_escape_map[line[location:location+1]]
-        last_location = location + 1
-    escaped_line += line[last_location:]
-    return escaped_line
+    if type(line) in (str, unicode):
+        # a few replace() calls are faster than any regular expression, with
+        # the backslash first so that no escape is escaped again
+        return line.replace("\\", "\\\\").replace('"', '\\"').replace("\t", "\\t").replace("\r", "\\r").replace("\n", "\\n")
+    # subclasses like multistring might change replace()
+    return _po_special_re.sub(_po_escape, line)
 
 
 def unescapehandler(escape):
@@ -68,6 +78,9 @@ def unescapehandler(escape):
 
 def wrapline(line):
     """Wrap text for po files."""
+    if 0 < len(line) <= 76:
+        # short lines are never wrapped
+        return [line]
     wrappedlines = textwrap.wrap(line, 76, replace_whitespace=False, expand_tabs=False, drop_whitespace=False)
 
     # Lines should not start with a space...
@@ -106,13 +119,33 @@ def quoteforpo(text):
     return polines
 
 
+def _unescapepostring(string):
+    if "\\" in string:
+        return _po_escape_re.sub(_po_unescape, string)
+    return string
+
+
 def extractpoline(line):
     """Remove quote and unescape line from po file.
 
     @param line: a quoted line from a po file (msgid or msgstr)
     """
-    extracted = quote.extractwithoutquotes(line, '"', '"', '\\', includeescapes=unescapehandler)[0]
-    return extracted
+    # almost all lines are a single string
+    match = _po_line_re.match(line)
+    if match:
+        return _unescapepostring(match.group(1))
+    extracted = []
+    for match in _po_string_re.finditer(line):
+        if match.group(1) is None:
+            # an escaped character outside of a string
+            continue
+        if match.group(2):
+            extracted.append(_unescapepostring(match.group(1)))
+        else:
+            # like quote.extractwithoutquotes, an unterminated string is
+            # included without unescaping it
+            extracted.append(line[match.start()+1:])
+    return line[:0].join(extracted)
 
 
 def unquotefrompo(postr):
@@ -123,6 +156,27 @@ def is_null(lst):
     return lst == [] or len(lst) == 1 and lst[0] == '""'
 
 
+def _rawkey(value):
+    """Returns a key that identifies the quoted lines of a unit, as used by
+    L{pounit._cached}. The lines are identified by their id(), which is much
+    cheaper than comparing them, so they have to be kept alive with the key."""
+    if isinstance(value, list):
+        return map(id, value)
+    if isinstance(value, dict):
+        return [(key, map(id, lines)) for key, lines in value.iteritems()]
+    return value
+
+
+def _copyraw(value):
+    """Returns a copy of the quoted lines of a unit, to keep them alive with
+    their L{_rawkey}"""
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return [list(lines) for lines in value.itervalues()]
+    return value
+
+
 def extractstr(string):
     left = string.find('"')
     right = string.rfind('"')
@@ -149,6 +203,12 @@ class pounit(pocommon.pounit):
     # fashion
     __shallow__ = ['_store']
 
+    # the unescaped source, target and context with the quoted lines they were
+    # decoded from, see _cached()
+    _source_cache = None
+    _target_cache = None
+    _context_cache = None
+
     def __init__(self, source=None, encoding="UTF-8"):
         self._encoding = encodingToUse(encoding)
         self.obsolete = False
@@ -182,6 +242,20 @@ class pounit(pocommon.pounit):
 
     allcomments = property(_get_all_comments)
 
+    def _cached(self, name, raw, decode):
+        """Returns the value decoded from the quoted lines in raw by decode(),
+        reusing the value cached in the attribute name while raw is unchanged.
+
+        Checking the lines is much cheaper than unescaping them again, and
+        also notices changes made directly to msgid, msgstr, etc."""
+        key = [_rawkey(lines) for lines in raw]
+        cache = getattr(self, name)
+        if cache is not None and cache[0] == key:
+            return cache[1]
+        value = decode()
+        setattr(self, name, (key, value, [_copyraw(lines) for lines in raw]))
+        return value
+
     def _get_source_vars(self, msgid, msgid_plural):
         multi = multistring(unquotefrompo(msgid), self._encoding)
         if self.hasplural():
@@ -211,7 +285,9 @@ class pounit(pocommon.pounit):
 
     def getsource(self):
         """Returns the unescaped msgid"""
-        return self._get_source_vars(self.msgid, self.msgid_plural)
+        return self._cached("_source_cache",
+                            (self.msgid, self.msgid_plural, self._encoding),
+                            lambda: self._get_source_vars(self.msgid, self.msgid_plural))
 
     def setsource(self, source):
         """Sets the msgid to the given (unescaped) value.
@@ -219,6 +295,7 @@ class pounit(pocommon.pounit):
         @param source: an unescaped source string.
         """
         self._rich_source = None
+        self._source_cache = None
         self.msgid, self.msgid_plural = self._set_source_vars(source)
     source = property(getsource, setsource)
 
@@ -236,6 +313,10 @@ class pounit(pocommon.pounit):
 
     def gettarget(self):
         """Returns the unescaped msgstr"""
+        return self._cached("_target_cache", (self.msgstr, self._encoding),
+                            self._get_target_vars)
+
+    def _get_target_vars(self):
         if isinstance(self.msgstr, dict):
             multi = multistring(map(unquotefrompo, self.msgstr.values()), self._encoding)
         else:
@@ -245,6 +326,7 @@ class pounit(pocommon.pounit):
     def settarget(self, target):
         """Sets the msgstr to the given (unescaped) value"""
         self._rich_target = None
+        self._target_cache = None
         if isinstance(target, str):
             target = target.decode(self._encoding)
         if self.hasplural():
@@ -327,6 +409,14 @@ class pounit(pocommon.pounit):
         """Remove all the translator's notes (other comments)"""
         self.othercomments = []
 
+    def __getstate__(self):
+        # the decoded strings are cached by the identity of the lines, which
+        # doesn't survive pickling
+        state = self.__dict__.copy()
+        for name in ("_source_cache", "_target_cache", "_context_cache"):
+            state.pop(name, None)
+        return state
+
     def __deepcopy__(self, memo={}):
         # Make an instance to serve as the copy
         new_unit = self.__class__()
@@ -666,6 +756,7 @@ class pounit(pocommon.pounit):
         return text.split('\n')[0].replace('_: ', '', 1)
 
     def setmsgidcomment(self, msgidcomment):
+        self._context_cache = None
         if msgidcomment:
             self.msgidcomments = ['"_: %s\\n"' % msgidcomment]
         else:
@@ -675,9 +766,11 @@ class pounit(pocommon.pounit):
 
     def getcontext(self):
         """Get the message context."""
-        return unquotefrompo(self.msgctxt) + self._extract_msgidcomments()
+        return self._cached("_context_cache", (self.msgctxt, self.msgidcomments),
+                            lambda: unquotefrompo(self.msgctxt) + self._extract_msgidcomments())
 
     def setcontext(self, context):
+        self._context_cache = None
         context = data.forceunicode(context)
         self.msgctxt = quoteforpo(context)
 
@@ -717,6 +810,28 @@ class pofile(pocommon.pofile):
 #        except Exception, e:
 #            raise base.ParseError(e)
 
+    def iterfile(cls, storefile):
+        """Yields the header and then the other units of the given file (or
+        filename) one at a time, while they are parsed.
+
+        The units belong to a store that only contains the header."""
+        if isinstance(storefile, basestring):
+            storefile = open(storefile, 'r')
+        store = cls()
+        store.units = []
+        store.fileobj = storefile
+        store._assignname()
+        try:
+            for unit in poparser.iter_units(poparser.ParseState(storefile, cls.UnitClass), store):
+                if not store.units and unit.isheader():
+                    store.addunit(unit)
+                else:
+                    unit._store = store
+                yield unit
+        finally:
+            storefile.close()
+    iterfile = classmethod(iterfile)
+
     def removeduplicates(self, duplicatestyle="merge"):
         """Make sure each msgid is unique ; merge comments etc from duplicates into original"""
         # TODO: can we handle consecutive calls to removeduplicates()? What
@@ -761,30 +876,49 @@ class pofile(pocommon.pofile):
 
     def __str__(self):
         """Convert to a string. double check that unicode is handled somehow here"""
-        output = self._getoutput()
-        if isinstance(output, unicode):
+        return "".join(self.iterserialize())
+
+    def iterserialize(self):
+        """Yields the encoded output of every unit in turn.
+
+        If the units can't be represented in the charset of the file, the
+        header is changed to UTF-8 before anything is yielded."""
+        encoding = getattr(self, "_encoding", "UTF-8")
+        if encoding.lower() not in ("utf-8", "utf8"):
             try:
-                return output.encode(getattr(self, "_encoding", "UTF-8"))
+                for chunk in self._iteroutput():
+                    chunk.encode(encoding)
             except UnicodeEncodeError, e:
                 self.updateheader(add=True, Content_Type="text/plain; charset=UTF-8")
                 self._encoding = "UTF-8"
                 for unit in self.units:
                     unit._encoding = "UTF-8"
-                return self._getoutput().encode("UTF-8")
-
-        return output
+                encoding = "UTF-8"
+        for chunk in self._iteroutput():
+            yield chunk.encode(encoding)
 
     def _getoutput(self):
         """convert the units back to lines"""
-        lines = []
+        return u"".join(self._iteroutput())
+
+    def _iteroutput(self):
+        """Yields the lines of the units in turn, without the whitespace at
+        the end of the file"""
+        # After the last pounit we will have \n\n and we only want to end in
+        # \n, so we hold on to trailing whitespace until we see more text
+        pending = u""
+        started = False
         for unit in self.units:
             unitsrc = unit._getoutput() + u"\n"
-            lines.append(unitsrc)
-        lines = u"".join(lines).rstrip()
-        #After the last pounit we will have \n\n and we only want to end in \n:
-        if lines:
-            lines += u"\n"
-        return lines
+            text = unitsrc.rstrip()
+            if text:
+                yield pending + text
+                pending = unitsrc[len(text):]
+                started = True
+            else:
+                pending += unitsrc
+        if started:
+            yield u"\n"
 
     def encode(self, lines):
         """encode any unicode strings in lines in self._encoding"""
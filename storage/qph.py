@@ -162,3 +162,7 @@ class QphFile(lisa.LISAfile):
         if not "<!DOCTYPE QPH>" in output[:30]:
             output = "<!DOCTYPE QPH>" + output
         return output
+
+    def serialize(self, out):
+        # the DOCTYPE fix above needs the start of the output
+        out.write(str(self))
@@ -34,11 +34,12 @@ import os.path
 import re
 import sys
 import stat
-import thread
+import threading
 from UserDict import UserDict
 
 from translate import __version__ as toolkitversion
 from translate.lang.common import Common
+from translate.misc.hash import md5_f
 from translate.misc.multistring import multistring
 from translate.storage import factory
 from translate.storage.workflow import StateEnum
@@ -100,6 +101,23 @@ def wordsinunit(unit):
     return sourcewords, targetwords
 
 
+def _strings(string):
+    if isinstance(string, multistring):
+        return [unicode(s) for s in string.strings]
+    return [unicode(string or "")]
+
+
+def unithash(unit):
+    """Returns a digest of everything in the unit that its statistics and
+    check results depend on."""
+    content = [unicode(unit.getid()), unicode(unit.get_state_id()),
+               unicode(unit.isfuzzy()), unicode(unit.getnotes())]
+    content.extend(_strings(unit.source))
+    content.append(u"")
+    content.extend(_strings(unit.target))
+    return md5_f(u"\0".join(content).encode("utf-8")).hexdigest()
+
+
 class Record(UserDict):
 
     def __init__(self, record_keys, record_values=None, compute_derived_values=lambda x: x):
@@ -131,26 +149,140 @@ class Record(UserDict):
         return ",".join([repr(x) for x in self.to_tuple()])
 
 
+class ConnectionPool(object):
+    """The connections to a statistics database, shared by all threads.
+
+    The database is put in WAL mode, so that readers never block on the
+    writer. All changes are made through a single connection, and threads
+    queue for it on a lock. At most max_readers connections are used for
+    reading at a time, and idle ones are reused by other threads, so that
+    short-lived threads don't leak connections."""
+
+    def __init__(self, statsfile, max_readers=4):
+        self.statsfile = statsfile
+        con = self._connect()
+        self._writer = (con, con.cursor())
+        self._writerlock = threading.RLock()
+        self._readers = []
+        self._readerslock = threading.Lock()
+        self._readerslots = threading.BoundedSemaphore(max_readers)
+        self._local = threading.local()
+
+    def _connect(self):
+        con = dbapi2.connect(self.statsfile, check_same_thread=False)
+        con.execute("""PRAGMA journal_mode=WAL;""")
+        return con
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self):
+        """Returns the connection and cursor used by the current thread, or
+        (None, None)"""
+        stack = self._stack()
+        if stack:
+            return stack[-1]
+        return None, None
+
+    def acquire_writer(self):
+        """Makes the writing connection the current one of this thread,
+        waiting for other threads to release it"""
+        self._writerlock.acquire()
+        self._stack().append(self._writer)
+
+    def release_writer(self):
+        self._stack().pop()
+        self._writerlock.release()
+
+    def acquire_reader(self):
+        """Makes an idle reading connection the current one of this thread.
+        Returns False if the thread already uses a connection."""
+        if self.current()[0] is not None:
+            return False
+        self._readerslots.acquire()
+        self._readerslock.acquire()
+        try:
+            if self._readers:
+                con = self._readers.pop()
+            else:
+                con = None
+        finally:
+            self._readerslock.release()
+        if con is None:
+            try:
+                con = self._connect()
+            except:
+                self._readerslots.release()
+                raise
+        self._stack().append((con, con.cursor()))
+        return True
+
+    def release_reader(self):
+        con, cur = self._stack().pop()
+        # closing the cursor ends its read transaction, so that the next
+        # thread sees the latest changes
+        cur.close()
+        self._readerslock.acquire()
+        try:
+            self._readers.append(con)
+        finally:
+            self._readerslock.release()
+        self._readerslots.release()
+
+    def close(self):
+        """Closes the writing connection and all idle reading connections"""
+        self._writer[0].close()
+        self._readerslock.acquire()
+        try:
+            for con in self._readers:
+                con.close()
+            self._readers = []
+        finally:
+            self._readerslock.release()
+
+
 def transaction(f):
-    """Modifies f to commit database changes if it executes without exceptions.
+    """Modifies f to run with the connection that writes to the database,
+    and to commit database changes if it executes without exceptions.
     Otherwise it rolls back the database.
 
-    ALL publicly accessible methods in StatsCache MUST be decorated with this
-    decorator.
+    ALL publicly accessible methods in StatsCache that can change the
+    database MUST be decorated with this decorator, and all others with
+    L{readonly}.
     """
 
     def decorated_f(self, *args, **kwargs):
+        self.pool.acquire_writer()
         try:
-            result = f(self, *args, **kwargs)
-            self.con.commit()
-            return result
-        except:
-            # If ANY exception is raised, we're left in an
-            # uncertain state and we MUST roll back any changes to avoid getting
-            # stuck in an inconsistent state.
-            if self.con:
-                self.con.rollback()
-            raise
+            try:
+                result = f(self, *args, **kwargs)
+                self.con.commit()
+                return result
+            except:
+                # If ANY exception is raised, we're left in an
+                # uncertain state and we MUST roll back any changes to avoid getting
+                # stuck in an inconsistent state.
+                if self.con:
+                    self.con.rollback()
+                raise
+        finally:
+            self.pool.release_writer()
+    return decorated_f
+
+
+def readonly(f):
+    """Modifies f to run with a reading connection from the pool, unless the
+    current thread already uses a connection."""
+
+    def decorated_f(self, *args, **kwargs):
+        acquired = self.pool.acquire_reader()
+        try:
+            return f(self, *args, **kwargs)
+        finally:
+            if acquired:
+                self.pool.release_reader()
     return decorated_f
 
 
@@ -177,7 +309,9 @@ class FileTotals(object):
 
     def __init__(self, cur):
         self.cur = cur
-        self.cur.execute("""
+
+    def create(cls, cur):
+        cur.execute("""
             CREATE TABLE IF NOT EXISTS filetotals(
                 fileid                  INTEGER PRIMARY KEY AUTOINCREMENT,
                 translatedsourcewords   INTEGER NOT NULL,
@@ -187,6 +321,7 @@ class FileTotals(object):
                 fuzzy                   INTEGER NOT NULL,
                 untranslated            INTEGER NOT NULL,
                 translatedtargetwords   INTEGER NOT NULL);""")
+    create = classmethod(create)
 
     def new_record(cls, state_for_db=None, sourcewords=None, targetwords=None):
         record = Record(cls.keys, compute_derived_values=cls._compute_derived_values)
@@ -274,46 +409,47 @@ def suggestion_filename(filename):
     return filename + suggestion_extension()
 
 
-# ALL PUBLICLY ACCESSIBLE METHODS MUST BE DECORATED WITH THE transaction DECORATOR.
+# ALL PUBLICLY ACCESSIBLE METHODS MUST BE DECORATED WITH THE transaction OR readonly DECORATOR.
 class StatsCache(object):
     """An object instantiated as a singleton for each statsfile that provides
-    access to the database cache from a pool of StatsCache objects."""
+    access to the database cache to all threads through a L{ConnectionPool}."""
     _caches = {}
+    _cacheslock = threading.Lock()
     defaultfile = None
-    con = None
-    """This cache's connection"""
-    cur = None
-    """The current cursor"""
+    max_readers = 4
+    """The maximum number of connections reading from the database at a
+    time"""
+    con = property(lambda self: self.pool.current()[0])
+    """The current thread's connection"""
+    cur = property(lambda self: self.pool.current()[1])
+    """The current thread's cursor"""
+    file_totals = property(lambda self: FileTotals(self.cur))
 
     def __new__(cls, statsfile=None):
-        current_thread = thread.get_ident()
 
         def make_database(statsfile):
 
-            def connect(cache):
-                cache.con = dbapi2.connect(statsfile)
-                cache.cur = cache.con.cursor()
-
-            def clear_old_data(cache):
+            def clear_old_data():
+                con = dbapi2.connect(statsfile)
                 try:
-                    cache.cur.execute("""SELECT min(toolkitbuild) FROM files""")
-                    val = cache.cur.fetchone()
-                    # If the database is empty, we have no idea whether its layout
-                    # is correct, so we might as well delete it.
-                    if val is None or val[0] < toolkitversion.build:
-                        cache.con.close()
-                        del cache
-                        os.unlink(statsfile)
-                        return True
-                    return False
-                except dbapi2.OperationalError:
-                    return False
-
-            cache = cls._caches.setdefault(current_thread, {})[statsfile] = object.__new__(cls)
-            connect(cache)
-            if clear_old_data(cache):
-                connect(cache)
+                    try:
+                        val = con.execute("""SELECT min(toolkitbuild) FROM files""").fetchone()
+                    except dbapi2.OperationalError:
+                        return
+                finally:
+                    con.close()
+                # If the database is empty, we have no idea whether its layout
+                # is correct, so we might as well delete it.
+                if val is None or val[0] < toolkitversion.build:
+                    for filename in (statsfile, statsfile + "-wal", statsfile + "-shm"):
+                        if os.path.exists(filename):
+                            os.unlink(filename)
+
+            clear_old_data()
+            cache = object.__new__(cls)
+            cache.pool = ConnectionPool(statsfile, cls.max_readers)
             cache.create()
+            cls._caches[statsfile] = cache
             return cache
 
         if not statsfile:
@@ -332,16 +468,20 @@ class StatsCache(object):
             statsfile = cls.defaultfile
         else:
             statsfile = os.path.realpath(statsfile)
-        # First see if a cache for this file already exists:
-        if current_thread in cls._caches and statsfile in cls._caches[current_thread]:
-            return cls._caches[current_thread][statsfile]
-        # No existing cache. Let's build a new one and keep a copy
-        return make_database(statsfile)
+        cls._cacheslock.acquire()
+        try:
+            # First see if a cache for this file already exists:
+            if statsfile in cls._caches:
+                return cls._caches[statsfile]
+            # No existing cache. Let's build a new one and keep a copy
+            return make_database(statsfile)
+        finally:
+            cls._cacheslock.release()
 
     @transaction
     def create(self):
         """Create all tables and indexes."""
-        self.file_totals = FileTotals(self.cur)
+        FileTotals.create(self.cur)
 
         self.cur.execute("""CREATE TABLE IF NOT EXISTS files(
             fileid INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -363,7 +503,13 @@ class StatsCache(object):
             state INTEGER,
             e_state INTEGER,
             sourcewords INTEGER,
-            targetwords INTEGER);""")
+            targetwords INTEGER,
+            hash VARCHAR);""")
+
+        # databases created before units were hashed miss the column
+        self.cur.execute("""PRAGMA table_info(units);""")
+        if "hash" not in [column[1] for column in self.cur.fetchall()]:
+            self.cur.execute("""ALTER TABLE units ADD COLUMN hash VARCHAR;""")
 
         self.cur.execute("""CREATE INDEX IF NOT EXISTS fileidindex
             ON units(fileid);""")
@@ -386,7 +532,16 @@ class StatsCache(object):
         self.cur.execute("""CREATE INDEX IF NOT EXISTS uniterrorindex
             ON uniterrors(fileid, configid);""")
 
-    @transaction
+        # units that changed since the checks with a configuration were cached
+        self.cur.execute("""CREATE TABLE IF NOT EXISTS pendingchecks(
+            fileid INTEGER NOT NULL,
+            configid INTEGER NOT NULL,
+            unitindex INTEGER NOT NULL);""")
+
+        self.cur.execute("""CREATE INDEX IF NOT EXISTS pendingchecksindex
+            ON pendingchecks(fileid, configid);""")
+
+    @readonly
     def _getfileid(self, filename, check_mod_info=True, store=None):
         """return fileid representing the given file in the statscache.
 
@@ -401,10 +556,24 @@ class StatsCache(object):
         if isinstance(filename, str):
             filename = unicode(filename, sys.getfilesystemencoding())
         realpath = os.path.realpath(filename)
+        if check_mod_info:
+            self.cur.execute("""SELECT fileid, st_mtime, st_size FROM files
+                    WHERE path=?;""", (realpath,))
+            filerow = self.cur.fetchone()
+            if filerow and (filerow[1], filerow[2]) == get_mod_info(realpath):
+                return filerow[0]
+        return self._updatefileid(realpath, check_mod_info, store)
+
+    @transaction
+    def _updatefileid(self, realpath, check_mod_info, store):
+        """Helper method for _getfileid() that makes changes. The file is
+        looked up again, since another thread might have recached it while
+        we waited to write."""
         self.cur.execute("""SELECT fileid, st_mtime, st_size FROM files
                 WHERE path=?;""", (realpath,))
         filerow = self.cur.fetchone()
         mod_info = get_mod_info(realpath)
+        fileid = None
         if filerow:
             fileid = filerow[0]
             if not check_mod_info:
@@ -416,12 +585,14 @@ class StatsCache(object):
             if (filerow[1], filerow[2]) == mod_info:
                 return fileid
 
-        # file wasn't in db at all, lets recache it
+        # file wasn't in db at all or changed, lets recache it
         if callable(store):
             store = store()
         else:
             store = store or factory.getobject(realpath)
 
+        if fileid is not None:
+            return self._recachestore(store, fileid, mod_info)
         return self._cachestore(store, realpath, mod_info)
 
     def _getstoredcheckerconfig(self, checker):
@@ -436,26 +607,31 @@ class StatsCache(object):
             return configrow[0]
 
     @transaction
-    def _cacheunitstats(self, units, fileid, unitindex=None, file_totals_record=FileTotals.new_record()):
-        """Cache the statistics for the supplied unit(s)."""
+    def _cacheunitstats(self, units, fileid, unitindex=None, file_totals_record=FileTotals.new_record(), unitindices=None):
+        """Cache the statistics for the supplied unit(s).
+
+        unitindices can give the index in the store of every unit."""
         unitvalues = []
         for index, unit in enumerate(units):
             if unit.istranslatable():
                 sourcewords, targetwords = wordsinunit(unit)
                 if unitindex:
                     index = unitindex
+                elif unitindices is not None:
+                    index = unitindices[index]
                 # what about plurals in .source and .target?
                 unit_state_for_db = statefordb(unit)
                 unitvalues.append((unit.getid(), fileid, index, \
                                 unit.source, unit.target, \
                                 sourcewords, targetwords, \
                                 unit_state_for_db,
-                                unit.get_state_id()))
+                                unit.get_state_id(),
+                                unithash(unit)))
                 file_totals_record = file_totals_record + FileTotals.new_record(unit_state_for_db, sourcewords, targetwords)
         # XXX: executemany is non-standard
         self.cur.executemany("""INSERT INTO units
-            (unitid, fileid, unitindex, source, target, sourcewords, targetwords, state, e_state)
-            values (?, ?, ?, ?, ?, ?, ?, ?, ?);""",
+            (unitid, fileid, unitindex, source, target, sourcewords, targetwords, state, e_state, hash)
+            values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);""",
             unitvalues)
         self.file_totals[fileid] = file_totals_record
         if unitindex:
@@ -477,6 +653,82 @@ class StatsCache(object):
         self._cacheunitstats(store.units, fileid)
         return fileid
 
+    @transaction
+    def _recachestore(self, store, fileid, mod_info):
+        """Updates the cached statistics of a file that changed on disk.
+
+        Units are compared by their L{unithash}, so that only units that were
+        added or changed are counted again. Their checks are queued in
+        pendingchecks for every checker configuration that has results for
+        this file, and run by L{_checkerrors} when they are needed."""
+        self.cur.execute("""UPDATE files
+                SET st_mtime=?, st_size=?, toolkitbuild=?
+                WHERE fileid=?;""", (mod_info[0], mod_info[1], toolkitversion.build, fileid))
+        self.cur.execute("""SELECT id, unitindex, hash, state, sourcewords, targetwords
+            FROM units WHERE fileid=?;""", (fileid,))
+        cached = {}
+        for row in self.cur.fetchall():
+            cached.setdefault(row[2], []).append(row)
+
+        file_totals_record = FileTotals.new_record()
+        # maps the old index of unchanged units to their new one
+        moved = {}
+        kept = []
+        newunits = []
+        newindices = []
+        for index, unit in enumerate(store.units):
+            if not unit.istranslatable():
+                continue
+            rows = cached.get(unithash(unit))
+            if rows:
+                rowid, oldindex, _hash, state, sourcewords, targetwords = rows.pop(0)
+                kept.append(rowid)
+                if oldindex != index:
+                    moved[oldindex] = index
+                    self.cur.execute("""UPDATE units SET unitindex=?
+                        WHERE id=?;""", (index, rowid))
+                file_totals_record = file_totals_record + FileTotals.new_record(state, sourcewords, targetwords)
+            else:
+                newunits.append(unit)
+                newindices.append(index)
+
+        stale = [row for rows in cached.itervalues() for row in rows]
+        self.cur.executemany("""DELETE FROM units WHERE id=?;""",
+            [(row[0],) for row in stale])
+        staleindices = dict.fromkeys([row[1] for row in stale])
+
+        # move or remove the cached check results of the old units
+        self.cur.execute("""SELECT errorid, unitindex FROM uniterrors
+            WHERE fileid=? AND unitindex != -1;""", (fileid,))
+        errors = self.cur.fetchall()
+        self.cur.executemany("""DELETE FROM uniterrors WHERE errorid=?;""",
+            [(errorid,) for errorid, unitindex in errors
+             if unitindex in staleindices])
+        self.cur.executemany("""UPDATE uniterrors SET unitindex=? WHERE errorid=?;""",
+            [(moved[unitindex], errorid) for errorid, unitindex in errors
+             if unitindex in moved])
+
+        self.cur.execute("""SELECT unitindex, configid FROM pendingchecks
+            WHERE fileid=?;""", (fileid,))
+        pending = self.cur.fetchall()
+        self.cur.execute("""DELETE FROM pendingchecks WHERE fileid=?;""", (fileid,))
+        self.cur.execute("""SELECT DISTINCT configid FROM uniterrors
+            WHERE fileid=?;""", (fileid,))
+        configids = [row[0] for row in self.cur.fetchall()]
+        pendingvalues = [(fileid, configid, index)
+                         for configid in configids for index in newindices]
+        # units that were pending before and are unchanged stay pending
+        pendingvalues.extend([(fileid, configid, moved.get(unitindex, unitindex))
+                              for unitindex, configid in pending
+                              if unitindex not in staleindices])
+        self.cur.executemany("""INSERT INTO pendingchecks
+            (fileid, configid, unitindex) values (?, ?, ?);""", pendingvalues)
+
+        self._cacheunitstats(newunits, fileid, file_totals_record=file_totals_record,
+                             unitindices=newindices)
+        return fileid
+
+    @readonly
     def file_extended_totals(self, filename, store=None):
         stats = {}
         fileid = self._getfileid(filename, store=store)
@@ -493,6 +745,7 @@ class StatsCache(object):
                 }
         return stats
 
+    @readonly
     def filetotals(self, filename, store=None, extended=False):
         """Retrieves the statistics for the given file if possible, otherwise
         delegates to cachestore()."""
@@ -502,8 +755,11 @@ class StatsCache(object):
         return stats
 
     @transaction
-    def _cacheunitschecks(self, units, fileid, configid, checker, unitindex=None):
-        """Helper method for cachestorechecks() and recacheunit()"""
+    def _cacheunitschecks(self, units, fileid, configid, checker, unitindex=None, unitindices=None):
+        """Helper method for cachestorechecks() and recacheunit()
+
+        unitindices can give the index in the store of every unit, for
+        checking some units of a file that already has results."""
         # We always want to store one dummy error to know that we have actually
         # run the checks on this file with the current checker configuration
         dummy = (-1, fileid, configid, "noerror", "")
@@ -515,14 +771,16 @@ class StatsCache(object):
                 # Correctly assign the unitindex
                 if unitindex:
                     index = unitindex
+                elif unitindices is not None:
+                    index = unitindices[index]
                 failures = checker.run_filters(unit)
                 for checkname, checkmessage in failures.iteritems():
                     unitvalues.append((index, fileid, configid, checkname, checkmessage))
                     errornames.append("check-" + checkname)
         checker.setsuggestionstore(None)
 
-        if unitindex:
-            # We are only updating a single unit, so we don't want to add an
+        if unitindex or unitindices is not None:
+            # We are only updating some units, so we don't want to add an
             # extra noerror-entry
             unitvalues.remove(dummy)
             errornames.append("total")
@@ -542,9 +800,29 @@ class StatsCache(object):
         # fill up the database without much use.
         self.cur.execute("""DELETE FROM uniterrors WHERE
             fileid=?;""", (fileid,))
+        self.cur.execute("""DELETE FROM pendingchecks WHERE
+            fileid=?;""", (fileid,))
         self._cacheunitschecks(store.units, fileid, configid, checker)
         return fileid
 
+    @transaction
+    def _cachependingchecks(self, fileid, store, checker, configid):
+        """Runs the checks of the units that changed since the checks of the
+        store were cached. The pending units are looked up again, since
+        another thread might have checked them while we waited to write."""
+        self.cur.execute("""SELECT unitindex FROM pendingchecks
+            WHERE fileid=? AND configid=? ORDER BY unitindex;""", (fileid, configid))
+        unitindices = [row[0] for row in self.cur.fetchall()]
+        if not unitindices:
+            return fileid
+        self.cur.execute("""DELETE FROM pendingchecks WHERE
+            fileid=? AND configid=?;""", (fileid, configid))
+        units = [store.units[index] for index in unitindices]
+        self._cacheunitschecks(units, fileid, configid, checker,
+                               unitindices=unitindices)
+        return fileid
+
+    @readonly
     def get_unit_stats(self, fileid, unitid):
         values = self.cur.execute("""
             SELECT   state, sourcewords, targetwords
@@ -600,9 +878,13 @@ class StatsCache(object):
                 ORDER BY unitindex;""", (fileid, configid))
             return self.cur.fetchone(), self.cur
 
-        first, cur = geterrors()
-        if first is not None:
-            return first, cur
+        self.cur.execute("""SELECT unitindex FROM pendingchecks
+            WHERE fileid=? AND configid=? ORDER BY unitindex;""", (fileid, configid))
+        pending = [row[0] for row in self.cur.fetchall()]
+        if not pending:
+            first, cur = geterrors()
+            if first is not None:
+                return first, cur
 
         # This could happen if we haven't done the checks before, or the
         # file changed, or we are using a different configuration
@@ -613,7 +895,11 @@ class StatsCache(object):
 
         if os.path.exists(suggestion_filename(filename)):
             checker.setsuggestionstore(factory.getobject(suggestion_filename(filename), ignore=suggestion_extension()))
-        self._cachestorechecks(fileid, store, checker, configid)
+        if pending:
+            # only some units changed since the checks were cached
+            self._cachependingchecks(fileid, store, checker, configid)
+        else:
+            self._cachestorechecks(fileid, store, checker, configid)
         return geterrors()
 
     def _geterrors(self, filename, fileid, configid, checker, store):
@@ -623,8 +909,17 @@ class StatsCache(object):
         result.extend(cur.fetchall())
         return result
 
-    @transaction
     def _get_config_id(self, fileid, checker):
+        configid = self._getstoredcheckerconfig(checker)
+        if configid:
+            return configid
+        return self._addcheckerconfig(checker)
+
+    @transaction
+    def _addcheckerconfig(self, checker):
+        """Helper method for _get_config_id() that adds the configuration. It
+        is looked up again, since another thread might have added it while we
+        waited to write."""
         configid = self._getstoredcheckerconfig(checker)
         if configid:
             return configid
@@ -633,6 +928,7 @@ class StatsCache(object):
             (str(checker.config.__dict__),))
         return self.cur.lastrowid
 
+    @readonly
     def filechecks(self, filename, checker, store=None):
         """Retrieves the error statistics for the given file if possible,
         otherwise delegates to cachestorechecks()."""
@@ -651,6 +947,7 @@ class StatsCache(object):
 
         return errors
 
+    @readonly
     def file_fails_test(self, filename, checker, name):
         fileid = self._getfileid(filename)
         configid = self._get_config_id(fileid, checker)
@@ -662,6 +959,7 @@ class StatsCache(object):
             WHERE fileid=? and configid=? and name=?;""", (fileid, configid, name))
         return self.cur.fetchone() is not None
 
+    @readonly
     def filestatestats(self, filename, store=None, extended=False):
         """Return a dictionary of unit stats mapping sets of unit
         indices with those states"""
@@ -684,6 +982,7 @@ class StatsCache(object):
             stats["total"].append(value[2])
         return stats
 
+    @readonly
     def filestats(self, filename, checker, store=None, extended=False):
         """Return a dictionary of property names mapping sets of unit
         indices with those properties."""
@@ -692,6 +991,7 @@ class StatsCache(object):
         stats.update(self.filestatestats(filename, store, extended=extended))
         return stats
 
+    @readonly
     def unitstats(self, filename, _lang=None, store=None):
         # For now, lang and store are unused. lang will allow the user to
         # base stats information on the given language. See the commented
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""An on-disk cache of parsed stores, so that a file that didn't change
+doesn't have to be parsed again by the next tool that opens it.
+
+Stores are saved with marshal if possible and pickle otherwise (see
+L{dumpstore}), under a key made from the path, size, modification time and
+MD5 hash of the file, the store class and the toolkit and Python versions. The least recently used stores are removed when the
+cache grows larger than its maximum size.
+
+Stores that can't be pickled (like the XML formats, that keep an lxml tree
+and set _picklable to False) are simply not cached.
+
+L{translate.storage.factory.getobject} uses the cache in L{factory.storecache}
+if it is set, or the directory named in the TRANSLATE_STORECACHE environment
+variable.
+"""
+
+import cPickle
+import marshal
+import os
+import sys
+import tempfile
+
+from translate import __version__ as toolkitversion
+from translate.misc.hash import md5_f
+
+ENTRY_EXTENSION = ".store"
+# The first byte of an entry says how the store was serialised
+MARSHAL = "M"
+PICKLE = "P"
+
+
+def defaultdir():
+    """Returns the directory that stores are cached in by default"""
+    userdir = os.path.expanduser("~")
+    if os.name == "nt":
+        return os.path.join(userdir, "Translate Toolkit", "stores")
+    return os.path.join(userdir, ".translate_toolkit", "stores")
+
+
+def filehash(filename, blocksize=1 << 16):
+    """Returns the MD5 hex digest of the contents of the given file"""
+    contenthash = md5_f()
+    storefile = open(filename, "rb")
+    try:
+        block = storefile.read(blocksize)
+        while block:
+            contenthash.update(block)
+            block = storefile.read(blocksize)
+    finally:
+        storefile.close()
+    return contenthash.hexdigest()
+
+
+_plaintypes = dict.fromkeys([type(None), bool, int, long, float, str, unicode])
+
+
+def _isplain(value):
+    """Returns whether value only consists of builtin types, that marshal
+    restores exactly. Subclasses like multistring would silently lose their
+    class."""
+    valuetype = type(value)
+    if valuetype in _plaintypes:
+        return True
+    if valuetype is list or valuetype is tuple:
+        for item in value:
+            if not _isplain(item):
+                return False
+        return True
+    if valuetype is dict:
+        for key, item in value.iteritems():
+            if not (_isplain(key) and _isplain(item)):
+                return False
+        return True
+    return False
+
+
+def _dumpmarshal(store):
+    """Returns the attributes of store and its units, with marshal, or None
+    if some of them are not builtin types.
+
+    Classes are stored by name, and the units' references to their store are
+    restored when loading."""
+    classes = []
+    classindex = {}
+
+    def classref(cls):
+        if cls not in classindex:
+            classindex[cls] = len(classes)
+            classes.append((cls.__module__, cls.__name__))
+        return classindex[cls]
+    state = store.__dict__.copy()
+    state.pop("units", None)
+    state.pop("fileobj", None)
+    classattributes = {}
+    for name, value in state.items():
+        if isinstance(value, type):
+            classattributes[name] = classref(value)
+            del state[name]
+    units = []
+    for unit in store.units:
+        if hasattr(unit, "__getstate__"):
+            unitstate = unit.__getstate__()
+        else:
+            unitstate = unit.__dict__.copy()
+        instore = unitstate.pop("_store", None) is store
+        units.append((classref(unit.__class__), instore, unitstate))
+    if not (_isplain(state) and _isplain(units)):
+        return None
+    return marshal.dumps((classref(store.__class__), classes, state,
+                          classattributes, units))
+
+
+def _loadmarshal(data):
+    """Reverses L{_dumpmarshal}"""
+    storeindex, classes, state, classattributes, units = marshal.loads(data)
+    classes = [getattr(__import__(module, {}, {}, [name]), name) for module, name in classes]
+    new = object.__new__
+    store = new(classes[storeindex])
+    store.__dict__.update(state)
+    for name, index in classattributes.iteritems():
+        setattr(store, name, classes[index])
+    store.units = []
+    append = store.units.append
+    for index, instore, unitstate in units:
+        unit = new(classes[index])
+        unit.__dict__ = unitstate
+        if instore:
+            unit._store = store
+        append(unit)
+    return store
+
+
+def dumpstore(store):
+    """Returns the serialised form of store for the cache, or None if it can't
+    be serialised.
+
+    Stores with attributes of builtin types only (like PO files) are saved
+    with marshal, which is several times faster to load than pickle; others
+    are pickled."""
+    if not getattr(store, "_picklable", False):
+        return None
+    data = _dumpmarshal(store)
+    if data is not None:
+        return MARSHAL + data
+    fileobj = getattr(store, "fileobj", None)
+    store.fileobj = None
+    try:
+        try:
+            return PICKLE + cPickle.dumps(store, cPickle.HIGHEST_PROTOCOL)
+        except (TypeError, cPickle.PicklingError), e:
+            return None
+    finally:
+        store.fileobj = fileobj
+
+
+def loadstore(data):
+    """Reverses L{dumpstore}"""
+    if data[:1] == MARSHAL:
+        return _loadmarshal(data[1:])
+    if data[:1] != PICKLE:
+        raise ValueError("Unknown store cache entry")
+    store = cPickle.loads(data[1:])
+    # unpickling opens the file again, like parsefile we leave it closed
+    fileobj = getattr(store, "fileobj", None)
+    if fileobj is not None:
+        fileobj.close()
+    return store
+
+
+class StoreCache(object):
+    """A directory with pickled stores, that is kept below maxsize bytes by
+    removing the least recently used ones.
+
+    The hits, misses and evictions attributes count what happened to the
+    requests to this instance."""
+
+    maxsize = 100 * 1024 * 1024
+    """The default maximum size of the cache directory, in bytes"""
+
+    def __init__(self, cachedir=None, maxsize=None):
+        if not cachedir:
+            cachedir = defaultdir()
+        self.cachedir = cachedir
+        if maxsize is not None:
+            self.maxsize = maxsize
+        if not os.path.isdir(cachedir):
+            os.makedirs(cachedir)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, filename, storeclass):
+        """Returns the cache key of the store of storeclass parsed from
+        filename, as it is now"""
+        realpath = os.path.realpath(filename)
+        file_stat = os.stat(realpath)
+        parts = [realpath, str(file_stat.st_size), repr(file_stat.st_mtime),
+                 filehash(realpath),
+                 "%s.%s" % (storeclass.__module__, storeclass.__name__),
+                 toolkitversion.sver, str(toolkitversion.build),
+                 # marshal data is only valid for the same Python version
+                 "%d.%d" % sys.version_info[:2]]
+        if isinstance(realpath, unicode):
+            parts[0] = realpath.encode("utf-8")
+        return md5_f("\0".join(parts)).hexdigest()
+
+    def _entrypath(self, key):
+        return os.path.join(self.cachedir, key + ENTRY_EXTENSION)
+
+    def load(self, key):
+        """Returns the store cached under key, or None"""
+        entrypath = self._entrypath(key)
+        try:
+            entry = open(entrypath, "rb")
+        except IOError:
+            return None
+        try:
+            try:
+                store = loadstore(entry.read())
+            finally:
+                entry.close()
+            # mark the entry as recently used
+            os.utime(entrypath, None)
+        except (EnvironmentError, EOFError, cPickle.UnpicklingError,
+                AttributeError, ImportError, ValueError, TypeError), e:
+            # another process might have removed it, or it is damaged or from
+            # code that changed; either way it is of no use any more
+            self._remove(entrypath)
+            return None
+        return store
+
+    def save(self, key, store):
+        """Caches store under key, if it can be serialised"""
+        data = dumpstore(store)
+        if data is None:
+            return
+        # write to a temporary file first, so that other processes never see
+        # a partial entry
+        handle, temppath = tempfile.mkstemp(suffix=".tmp", dir=self.cachedir)
+        entry = os.fdopen(handle, "wb")
+        try:
+            entry.write(data)
+        finally:
+            entry.close()
+        entrypath = self._entrypath(key)
+        try:
+            os.rename(temppath, entrypath)
+        except OSError, e:
+            # on Windows we can't rename over an existing entry, which
+            # another process must have written in the meantime
+            self._remove(temppath)
+            return
+        self.evict()
+
+    def getstore(self, filename, storeclass, parse):
+        """Returns the store of storeclass for filename from the cache, or
+        calls parse() to create it and caches the result"""
+        key = self.key(filename, storeclass)
+        store = self.load(key)
+        if store is not None:
+            self.hits += 1
+            return store
+        self.misses += 1
+        store = parse()
+        self.save(key, store)
+        return store
+
+    def evict(self):
+        """Removes the least recently used stores until the cache is not
+        larger than maxsize"""
+        entries = []
+        totalsize = 0
+        for name in os.listdir(self.cachedir):
+            if not name.endswith(ENTRY_EXTENSION):
+                continue
+            entrypath = os.path.join(self.cachedir, name)
+            try:
+                entry_stat = os.stat(entrypath)
+            except OSError, e:
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entrypath))
+            totalsize += entry_stat.st_size
+        if totalsize <= self.maxsize:
+            return
+        entries.sort()
+        for mtime, size, entrypath in entries:
+            if totalsize <= self.maxsize:
+                break
+            self._remove(entrypath)
+            totalsize -= size
+            self.evictions += 1
+
+    def clear(self):
+        """Removes all cached stores"""
+        for name in os.listdir(self.cachedir):
+            if name.endswith(ENTRY_EXTENSION):
+                self._remove(os.path.join(self.cachedir, name))
+
+    def _remove(self, path):
+        try:
+            os.unlink(path)
+        except OSError, e:
+            pass
@@ -25,6 +25,7 @@ import warnings
 
 from py import test
 
+from translate.misc import wStringIO
 from translate.misc.multistring import multistring
 from translate.storage import base, factory
 from translate.storage.placeables import general, parse as rich_parse
@@ -313,6 +314,40 @@ class TestTranslationStore(object):
         newstore = self.StoreClass.parsefile(self.filename)
         self.check_equality(store, newstore)
 
+    def test_serialize(self):
+        """Tests that writing the store in parts gives the same output as
+        str()"""
+        store = self.StoreClass()
+        unit1 = store.addsourceunit("Test String")
+        unit1.target = "Test String"
+        unit2 = store.addsourceunit(u"Beziér curve")
+        unit2.target = u"Beziér-kurwe"
+        expected = str(store)
+        assert "".join(store.iterserialize()) == expected
+        out = wStringIO.StringIO()
+        store.serialize(out)
+        assert out.getvalue() == expected
+        store.savefile(self.filename)
+        assert open(self.filename, "rb").read() == expected
+
+    def test_savefile_failure(self):
+        """Tests that the file on disk survives a store that can't be
+        serialised"""
+        store = self.StoreClass()
+        unit = store.addsourceunit("Test String")
+        unit.target = "Test String"
+        store.savefile(self.filename)
+        saved = open(self.filename, "rb").read()
+
+        def serialize(out):
+            out.write("partial")
+            raise ValueError("can't serialise")
+        store.serialize = serialize
+        test.raises(ValueError, store.savefile, self.filename)
+        assert open(self.filename, "rb").read() == saved
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        assert [name for name in os.listdir(directory) if name.endswith(".tmp")] == []
+
     def test_markup(self):
         """Tests that markup survives the roundtrip. Most usefull for xml types."""
         store = self.StoreClass()
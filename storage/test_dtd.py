@@ -185,6 +185,13 @@ class TestDTD(test_monolingual.TestMonolingualStore):
         assert dtdunit.definition == '"bananas for sale"'
         assert str(dtdfile) == '<!ENTITY test.me "bananas for sale">\n'
 
+    def test_invalid_savefile(self, recwarn):
+        """checks that a store that doesn't validate isn't saved"""
+        open(self.filename, "w").write('<!ENTITY good "correct">\n')
+        dtdfile = self.dtdparse('<!ENTITY test.me "bananas%for;">\n')
+        assert test.raises(TypeError, dtdfile.savefile, self.filename)
+        assert open(self.filename).read() == '<!ENTITY good "correct">\n'
+
     def test_missing_quotes(self, recwarn):
         """test that we fail graacefully when a message without quotes is found (bug #161)"""
         dtdsource = '<!ENTITY bad no quotes">\n<!ENTITY good "correct quotes">\n'
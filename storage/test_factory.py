@@ -9,6 +9,8 @@ except ImportError:
 from gzip import GzipFile
 import os
 
+import py.test
+
 from translate.misc import wStringIO
 from translate.storage import factory
 from translate.storage.directory import Directory
@@ -102,6 +104,15 @@ class BaseTestFactory:
         store = factory.getobject(fileobj)
         assert isinstance(store, self.expected_instance)
 
+    def test_get_noname_gzfile(self):
+        """Tests that a compressed file object without a name is refused."""
+        fileobj = wStringIO.StringIO()
+        gzfile = GzipFile(fileobj=fileobj, mode="wb")
+        gzfile.write(self.file_content)
+        gzfile.close()
+        fileobj.seek(0)
+        assert py.test.raises(ValueError, factory.getobject, fileobj)
+
     def test_gzfile(self):
         """Test that we can open a gzip file correctly."""
         filename = os.path.join(self.testdir, self.filename + '.gz')
@@ -122,6 +133,40 @@ class BaseTestFactory:
         store = factory.getobject(filename)
         assert isinstance(store, self.expected_instance)
 
+    def test_iterunits(self):
+        """Test that iterating over the units gives the units of the store."""
+        filename = os.path.join(self.testdir, self.filename + '.gz')
+        gzfile = GzipFile(filename, mode="wb")
+        gzfile.write(self.file_content)
+        gzfile.close()
+        store = factory.getobject(filename)
+        units = list(factory.iterunits(filename))
+        assert [unit.source for unit in units] == [unit.source for unit in store.units]
+        assert [unit.target for unit in units] == [unit.target for unit in store.units]
+        fileobj = givefile(self.filename, self.file_content)
+        units = list(factory.iterunits(fileobj))
+        assert [unit.source for unit in units] == [unit.source for unit in store.units]
+
+    def test_sniff(self):
+        """Test that stores are recognised by their name or their start."""
+        for name in (self.filename, "renamed.data", "renamed.gz"):
+            filename = os.path.join(self.testdir, name)
+            if name.endswith(".gz"):
+                storefile = GzipFile(filename, mode="wb")
+            else:
+                storefile = open(filename, "wb")
+            storefile.write(self.file_content)
+            storefile.close()
+            extension = factory.sniff(filename)
+            assert extension is not None
+            assert issubclass(self.expected_instance, factory.getclass("file." + extension))
+        filename = os.path.join(self.testdir, "notes.txt")
+        open(filename, "wb").write("Just some notes\n")
+        assert factory.sniff(filename) is None
+        names = [name for dirname, name in Directory(self.testdir, onlystores=True).getfiles()]
+        names.sort()
+        assert names == [self.filename, "renamed.data", "renamed.gz"]
+
     def test_directory(self):
         """Test that a directory is correctly detected."""
         object = factory.getobject(self.testdir)
@@ -135,6 +180,16 @@ class TestPOFactory(BaseTestFactory):
     file_content = '''#: test.c\nmsgid "test"\nmsgstr "rest"\n'''
 
 
+class TestMOFactory(BaseTestFactory):
+    from translate.storage import mo
+    expected_instance = mo.mofile
+    filename = 'dummy.mo'
+    file_content = ('\xde\x12\x04\x95\x00\x00\x00\x00\x01\x00\x00\x00\x1c\x00\x00\x00'
+                    '$\x00\x00\x00\x03\x00\x00\x00,\x00\x00\x00\x04\x00\x00\x008\x00\x00\x00'
+                    '\x04\x00\x00\x00=\x00\x00\x00\x00\x00\x00\x00\x01\x00\x00\x00\x00\x00\x00\x00'
+                    'test\x00rest\x00')
+
+
 class TestXliffFactory(BaseTestFactory):
     from translate.storage import xliff
     expected_instance = xliff.xlifffile
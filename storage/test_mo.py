@@ -158,3 +158,17 @@ class TestMOFile(test_base.TestTranslationStore):
             finally:
                 mo_msgfmt_f.close()
                 mo_pocompile_f.close()
+
+    def test_large(self):
+        """Test that the string tables are written correctly when they span
+        several batches."""
+        store = self.StoreClass()
+        count = mo.STRING_BATCH * 2 + 1
+        for i in range(count):
+            unit = store.addsourceunit(u"Message %d" % i)
+            unit.target = u"Boodskap %d" % i
+        chunks = list(store.iterserialize())
+        assert len(chunks) == 4 + 3 + 3
+        newstore = self.StoreClass.parsestring("".join(chunks))
+        assert len(newstore.units) == count
+        assert newstore.findunit(u"Message 1234").target == u"Boodskap 1234"
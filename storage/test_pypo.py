@@ -3,11 +3,57 @@
 
 from py.test import raises
 
+from translate.misc import quote
 from translate.misc import wStringIO
 from translate.misc.multistring import multistring
 from translate.storage import pypo
 from translate.storage import test_po
 
+# strings that are hard to quote and unquote for the PO line codec
+codec_corpus = [
+    "", "simple", 'a "quoted" word', "back\\slash", "tab\there", "\r\n",
+    "trailing backslash \\", "\\n is not a newline", '\\"', '""',
+    "line one\nline two\n", "\n\n\nstarts with newlines", "ends with newlines\n\n",
+    " leading and trailing spaces ", "\\\\\\",
+    "A long line that certainly needs to be wrapped, since it is longer than the 76 characters allowed.",
+    "A long line with \"quotes\", \\backslashes\\ and\ttabs that needs to be wrapped for the PO file",
+    u"Unicode: \u00e9\u00e8\u00ea \u65e5\u672c\u8a9e \"\u00bb\u00ab\"",
+]
+
+# quoted lines, including malformed ones, with their unquoted value
+codec_lines = [
+    ('"simple"', "simple"),
+    ('"escaped \\" quote"', 'escaped " quote'),
+    ('"\\n\\t\\r\\\\"', "\n\t\r\\"),
+    ('"unknown \\x escape"', "unknown \\x escape"),
+    ('"two" "strings"', "twostrings"),
+    ('"adjacent""strings"', "adjacentstrings"),
+    ('msgid "keyword"', "keyword"),
+    ('"unterminated \\n', "unterminated \\n"),
+    ('\\"escaped outside" "string"', " "),
+    ('no quotes', ""),
+]
+
+
+def test_codec_roundtrip():
+    """checks that quoting and unquoting strings gives back the original"""
+    for string in codec_corpus:
+        quoted = pypo.quoteforpo(string)
+        assert pypo.unquotefrompo(quoted) == string
+        for line in quoted:
+            assert line.startswith('"') and line.endswith('"')
+
+
+def test_codec_lines():
+    """checks the unquoting of single lines, compared to the generic
+    quote.extractwithoutquotes"""
+    for line, expected in codec_lines:
+        assert pypo.extractpoline(line) == expected
+        assert quote.extractwithoutquotes(line, '"', '"', '\\', includeescapes=pypo.unescapehandler)[0] == expected
+    for string in codec_corpus:
+        assert pypo.escapeforpo(string.replace("\n", "")) == \
+               quote.escapequotes(string.replace("\n", ""), escapeescapes=1).replace("\t", "\\t").replace("\r", "\\r")
+
 
 class TestPYPOUnit(test_po.TestPOUnit):
     UnitClass = pypo.pounit
@@ -143,6 +189,32 @@ msgstr ""
         print str(unit)
         assert str(unit) == expected
 
+    def test_decoded_cache(self):
+        """checks that decoded strings are reused until the quoted lines
+        change"""
+        unit = self.UnitClass("Open \"file\"")
+        unit.target = "Maak \"lêer\" oop"
+        unit.setcontext("menu")
+        assert unit.source is unit.source
+        assert unit.target is unit.target
+        assert unit.getcontext() == u"menu"
+        unit.source = "Close"
+        assert unit.source == u"Close"
+        unit.msgstr.append('" toe"')
+        assert unit.target == u"Maak \"lêer\" oop toe"
+        unit.msgstr[0] = '"Sluit"'
+        assert unit.target == u"Sluit toe"
+        unit.msgctxt = ['"window"']
+        assert unit.getcontext() == u"window"
+        unit.msgidcomment = "verb"
+        assert unit.getcontext() == u"windowverb"
+        unit.msgid_plural = ['"Closes"']
+        assert unit.source.strings == [u"Close", u"Closes"]
+        unit.msgstr = {0: ['"Sluit"'], 1: ['"Sluite"']}
+        assert unit.target.strings == [u"Sluit", u"Sluite"]
+        unit.msgstr[1][0] = '"Sluit almal"'
+        assert unit.target.strings == [u"Sluit", u"Sluit almal"]
+
 
 class TestPYPOFile(test_po.TestPOFile):
     StoreClass = pypo.pofile
@@ -270,3 +342,54 @@ msgstr[1] "toetse"
         assert pofile.units[4].prev_source == multistring([u"tast", u"tasts"])
 
         assert str(pofile) == posource
+
+    def test_iterfile(self):
+        """checks that units are parsed one at a time with the charset of the
+        header"""
+        posource = '''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=ISO-8859-1\\n"
+"Language: af\\n"
+
+#: file.c:1
+msgid "File"
+msgstr "L\xeaer"
+
+#~ msgid "Old"
+#~ msgstr "Ou"
+'''
+        units = self.StoreClass.iterfile(wStringIO.StringIO(posource))
+        header = units.next()
+        assert header.isheader()
+        unit = units.next()
+        assert unit.source == u"File"
+        assert unit.target == u"Lêer"
+        assert unit.getlocations() == [u"file.c:1"]
+        assert unit.gettargetlanguage() == "af"
+        assert unit._store.units == [header]
+        unit = units.next()
+        assert unit.isobsolete()
+        assert raises(StopIteration, units.next)
+        pofile = self.poparse(posource)
+        assert [str(unit) for unit in self.StoreClass.iterfile(wStringIO.StringIO(posource))] == \
+               [str(unit) for unit in pofile.units]
+
+    def test_iterserialize(self):
+        """checks that the units are written in the charset of the file, and
+        that the header changes to UTF-8 before anything is written if they
+        don't fit"""
+        posource = '''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=ISO-8859-1\\n"
+
+msgid "File"
+msgstr "L\xeaer"
+'''
+        pofile = self.poparse(posource)
+        chunks = list(pofile.iterserialize())
+        assert len(chunks) == 3
+        assert "".join(chunks) == posource
+        pofile.units[1].target = u"Ł\xeaer"
+        chunks = list(pofile.iterserialize())
+        assert "charset=UTF-8" in chunks[0]
+        assert "".join(chunks).endswith('msgstr "\xc5\x81\xc3\xaaer"\n')
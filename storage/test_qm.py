@@ -39,3 +39,14 @@ class TestQtFile(test_base.TestTranslationStore):
         assert test.raises(Exception, self.StoreClass.__str__,
                            self.StoreClass())
 
+
+    def test_serialize(self):
+        # QM does not implement serialising
+        assert test.raises(Exception, self.StoreClass.serialize,
+                           self.StoreClass(), None)
+
+    def test_savefile_failure(self):
+        # QM does not implement saving, but must leave the file alone
+        open(self.filename, "wb").write("existing")
+        assert test.raises(Exception, self.StoreClass().savefile, self.filename)
+        assert open(self.filename, "rb").read() == "existing"
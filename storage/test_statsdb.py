@@ -2,6 +2,7 @@
 
 import os
 import os.path
+import threading
 import warnings
 
 import py.test
@@ -132,10 +133,14 @@ class TestStatsDb:
         assert s['total'] == [1, 2, 3, 4, 5, 6]
 
     def make_file_and_return_id(self, cache, filename):
-        cache.cur.execute("""
-            SELECT fileid, st_mtime, st_size FROM files
-            WHERE path=?;""", (os.path.realpath(filename),))
-        return cache.cur.fetchone()
+        cache.pool.acquire_reader()
+        try:
+            cache.cur.execute("""
+                SELECT fileid, st_mtime, st_size FROM files
+                WHERE path=?;""", (os.path.realpath(filename),))
+            return cache.cur.fetchone()
+        finally:
+            cache.pool.release_reader()
 
     def test_if_cached_after_filestats(self):
         f, cache = self.setup_file_and_db(jtoolkit_extract)
@@ -147,7 +152,125 @@ class TestStatsDb:
         cache.unitstats(f.filename, checks.UnitChecker())
         assert self.make_file_and_return_id(cache, f.filename) != None
 
+    def test_cached_reads_dont_write(self):
+        """checks that reading cached stats doesn't wait for the writer"""
+        f, cache = self.setup_file_and_db(jtoolkit_extract)
+        checker = checks.UnitChecker()
+        s = cache.filestats(f.filename, checker)
+        errors = cache.filechecks(f.filename, checker)
+
+        def acquire_writer():
+            raise AssertionError("the writer was acquired")
+        cache.pool.acquire_writer = acquire_writer
+        assert cache.filestats(f.filename, checker) == s
+        assert cache.filechecks(f.filename, checker) == errors
+        assert not cache.file_fails_test(f.filename, checker, "fuzzy")
+
     def test_singletonness(self):
         f1, cache1 = self.setup_file_and_db(jtoolkit_extract)
         f2, cache2 = self.setup_file_and_db(fr_terminology_extract)
         assert cache1 == cache2
+
+    def test_recache_changed_units(self):
+        """checks that only changed units are counted and checked again when
+        a file changes"""
+        checker = checks.StandardChecker()
+        f, cache = self.setup_file_and_db(jtoolkit_extract)
+        s = cache.filestats(f.filename, checker)
+        assert s['untranslated'] == [6]
+        fileid = self.make_file_and_return_id(cache, f.filename)[0]
+
+        counted = []
+        checked = []
+        orig_wordsinunit = statsdb.wordsinunit
+        orig_run_filters = checker.run_filters
+
+        def wordsinunit(unit):
+            counted.append(unit.source)
+            return orig_wordsinunit(unit)
+
+        def run_filters(unit):
+            checked.append(unit.source)
+            return orig_run_filters(unit)
+        statsdb.wordsinunit = wordsinunit
+        checker.run_filters = run_filters
+        try:
+            # translate the last unit and remove the fourth
+            contents = jtoolkit_extract.replace(
+                'msgid ", please confirm login"\nmsgstr ""',
+                'msgid ", please confirm login"\nmsgstr ", bevestig asseblief"')
+            contents = contents.replace(
+                '#: web/server.py:97\n#, fuzzy\nmsgid "Exit application"\nmsgstr "Verlaat toepassing"\n', '')
+            open(f.filename, "w").write(contents)
+            s = cache.filestats(f.filename, checker)
+        finally:
+            statsdb.wordsinunit = orig_wordsinunit
+        assert counted == [", please confirm login"]
+        assert checked == [", please confirm login"]
+        assert self.make_file_and_return_id(cache, f.filename)[0] == fileid
+        assert s['translated'] == [2, 3, 4, 5]
+        assert s['fuzzy'] == [1]
+        assert s['total'] == [1, 2, 3, 4, 5]
+        totals = cache.filetotals(f.filename)
+        assert totals['translated'] == 4
+        assert totals['fuzzy'] == 1
+        assert totals['untranslated'] == 0
+        assert cache.unitstats(f.filename)['sourcewordcount'] == [3, 8, 11, 9, 3]
+        assert [key for key in s if key.startswith("check-")]
+        assert cache.filestats(f.filename, checker) == s
+        fresh = statsdb.StatsCache(os.path.join(self.path, "fresh.db"))
+        assert fresh.filestats(f.filename, checks.StandardChecker()) == s
+
+    def test_pending_checks_once(self):
+        """checks that pending checks that another thread ran while we
+        waited to write aren't cached again"""
+        checker = checks.StandardChecker()
+        f, cache = self.setup_file_and_db(jtoolkit_extract)
+        cache.filestats(f.filename, checker)
+        contents = jtoolkit_extract.replace(
+            'msgid ", please confirm login"\nmsgstr ""',
+            'msgid ", please confirm login"\nmsgstr "bevestig asseblief"')
+        open(f.filename, "w").write(contents)
+        errors = cache.filechecks(f.filename, checker)
+        assert [key for key in errors if key.startswith("check-")]
+        fileid = self.make_file_and_return_id(cache, f.filename)[0]
+        cache.pool.acquire_reader()
+        try:
+            configid = cache._get_config_id(fileid, checker)
+        finally:
+            cache.pool.release_reader()
+        cache._cachependingchecks(fileid, factory.getobject(f.filename), checker, configid)
+        assert cache.filechecks(f.filename, checker) == errors
+
+    def test_threads(self):
+        """checks that short-lived threads share a bounded number of
+        connections"""
+        f, cache = self.setup_file_and_db(jtoolkit_extract)
+        filenames = []
+        for i in range(4):
+            filename = os.path.join(self.path, "test%d.po" % i)
+            open(filename, "w").write(jtoolkit_extract)
+            filenames.append(filename)
+        results = []
+        errors = []
+
+        def stats(filename):
+            try:
+                results.append(statsdb.StatsCache(cache.pool.statsfile).filestats(filename, checks.UnitChecker()))
+            except Exception, e:
+                errors.append(e)
+        threads = [threading.Thread(target=stats, args=(filenames[i % 4],)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert errors == []
+        assert len(results) == 20
+        for s in results:
+            assert s['translated'] == [2, 3, 5]
+        assert 0 < len(cache.pool._readers) <= cache.max_readers
+        cache.pool.acquire_reader()
+        try:
+            assert cache.cur.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+        finally:
+            cache.pool.release_reader()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+import os
+import shutil
+
+from translate.misc.multistring import multistring
+from translate.storage import factory, pypo, storecache, tmx
+
+posource = '''msgid ""
+msgstr ""
+"Content-Type: text/plain; charset=UTF-8\\n"
+
+#: file.c:1
+msgid "File"
+msgstr "L\xc3\xaaer"
+
+msgid "One file"
+msgid_plural "%d files"
+msgstr[0] "Een l\xc3\xaaer"
+msgstr[1] "%d l\xc3\xaaers"
+'''
+
+
+class TestStoreCache:
+
+    def setup_method(self, method):
+        self.path = os.path.realpath("%s_%s" % (self.__class__.__name__, method.__name__))
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+        self.cache = storecache.StoreCache(os.path.join(self.path, "cache"))
+
+    def teardown_method(self, method):
+        factory.storecache = None
+        shutil.rmtree(self.path)
+
+    def write_file(self, name, contents):
+        filename = os.path.join(self.path, name)
+        storefile = open(filename, "w")
+        storefile.write(contents)
+        storefile.close()
+        return filename
+
+    def getstore(self, filename, storeclass=pypo.pofile):
+        return self.cache.getstore(filename, storeclass,
+                                   lambda: storeclass.parsefile(filename))
+
+    def test_hit(self):
+        """Tests that a cached store is the same as the parsed one"""
+        filename = self.write_file("test.po", posource)
+        parsed = self.getstore(filename)
+        assert (self.cache.hits, self.cache.misses) == (0, 1)
+        cached = self.getstore(filename)
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+        assert cached is not parsed
+        assert str(cached) == str(parsed) == posource
+        assert cached.filename == filename
+        assert cached.units[1].target == u"L\xeaer"
+        assert cached.units[2].source.strings == [u"One file", u"%d files"]
+        assert cached.units[1]._store is cached
+
+    def test_changed(self):
+        """Tests that a changed file is parsed again"""
+        filename = self.write_file("test.po", posource)
+        self.getstore(filename)
+        # same size and possibly the same mtime, but different content
+        self.write_file("test.po", posource.replace("file.c:1", "file.c:2"))
+        store = self.getstore(filename)
+        assert (self.cache.hits, self.cache.misses) == (0, 2)
+        assert store.units[1].getlocations() == [u"file.c:2"]
+
+    def test_eviction(self):
+        """Tests that the least recently used stores are removed"""
+        filenames = [self.write_file("test%d.po" % i, posource) for i in range(3)]
+        self.getstore(filenames[0])
+        entrysize = os.path.getsize(os.path.join(self.cache.cachedir, os.listdir(self.cache.cachedir)[0]))
+        self.cache.maxsize = entrysize * 2
+        self.getstore(filenames[1])
+        # make sure the first one is the most recently used one
+        entrypath = self.cache._entrypath(self.cache.key(filenames[0], pypo.pofile))
+        os.utime(entrypath, (0, 0))
+        self.getstore(filenames[0])
+        self.getstore(filenames[2])
+        assert self.cache.evictions == 1
+        assert self.cache.load(self.cache.key(filenames[1], pypo.pofile)) is None
+        assert self.cache.load(self.cache.key(filenames[0], pypo.pofile)) is not None
+
+    def test_unpicklable(self):
+        """Tests that stores that can't be pickled are returned uncached"""
+        tmxfile = tmx.tmxfile()
+        tmxfile.addtranslation("File", "en", "Leer", "af")
+        filename = self.write_file("test.tmx", str(tmxfile))
+        assert self.getstore(filename, tmx.tmxfile).translate("File") == "Leer"
+        assert self.getstore(filename, tmx.tmxfile).translate("File") == "Leer"
+        assert (self.cache.hits, self.cache.misses) == (0, 2)
+        assert os.listdir(self.cache.cachedir) == []
+
+    def test_factory(self):
+        """Tests that getobject uses the cache"""
+        filename = self.write_file("test.po", posource)
+        factory.storecache = self.cache
+        factory.getobject(filename)
+        store = factory.getobject(filename)
+        assert self.cache.hits == 1
+        assert str(store) == posource
+
+    def test_pickle(self):
+        """Tests that stores with other objects in them are pickled"""
+        from translate.storage import mo
+        store = mo.mofile()
+        unit = store.addsourceunit(multistring([u"One file", u"%d files"]))
+        unit.target = multistring([u"Een l\xeaer", u"%d l\xeaers"])
+        data = storecache.dumpstore(store)
+        assert data.startswith(storecache.PICKLE)
+        assert str(storecache.loadstore(data)) == str(store)
+        assert storecache.dumpstore(pypo.pofile()).startswith(storecache.MARSHAL)
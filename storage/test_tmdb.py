@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from translate.storage import tmdb
+
+
+class TestTMDB:
+
+    units = [
+        {"source": u"Open file", "target": u"Maak lêer oop", "context": u""},
+        {"source": u"Open files", "target": u"Maak lêers oop", "context": u""},
+        {"source": u"Open a file", "target": u"Maak 'n lêer oop", "context": u""},
+        {"source": u"Close file", "target": u"Maak lêer toe", "context": u""},
+        {"source": u"Save the current document", "target": u"Stoor die huidige dokument", "context": u""},
+        {"source": u"Quit without asking again", "target": u"Verlaat sonder om weer te vra", "context": u""},
+    ]
+
+    def setup_method(self, method):
+        # dropping the shared connection gives every test a fresh database
+        tmdb.TMDB._tm_dbs.pop(u":memory:", None)
+        tmdb.TMDB._tm_indices.pop(u":memory:", None)
+
+    def get_tmdb(self, use_index):
+        return tmdb.TMDB(u":memory:", use_index=use_index)
+
+    def test_translate_unit(self):
+        """test basic suggestions from the database"""
+        db = self.get_tmdb(False)
+        db.add_list(self.units, "en", "af")
+        results = db.translate_unit(u"Open file", "en", "af")
+        assert results[0]["source"] == u"Open file"
+        assert results[0]["quality"] == 100
+        assert len(results) == 3
+        assert db.translate_unit(u"Open file", "en", "fr") == []
+
+    def test_index_matches_database(self):
+        """test that the in-memory index gives the same suggestions as the
+        database"""
+        db = self.get_tmdb(False)
+        db.add_list(self.units, "en", "af")
+        indexed = tmdb.TMDB(u":memory:", use_index=True)
+        assert indexed.index.count == len(self.units)
+        for unit in self.units:
+            expected = db.translate_unit(unit["source"], "en", "af")
+            assert indexed.translate_unit(unit["source"], "en", "af") == expected
+
+    def test_index_add(self):
+        """test that the index is kept current by add_dict and add_list"""
+        db = self.get_tmdb(True)
+        assert db.translate_unit(u"Open file", "en", "af") == []
+        db.add_list(self.units, "en", "af")
+        db.add_dict(self.units[0], "en", "af")
+        assert db.index.count == len(self.units)
+        results = db.translate_unit(u"Open file", "en", "af")
+        assert [result["source"] for result in results] == [u"Open file", u"Open files", u"Open a file"]
+        assert db.translate_unit(u"Open file", "en", "fr") == []
+        assert db.translate_unit(u"Open file", ["en"], ["fr", "af"]) == results
+
+    def test_index_cutoff(self):
+        """test that only the best max_candidates suggestions are returned"""
+        db = tmdb.TMDB(u":memory:", max_candidates=1, use_index=True)
+        db.add_list(self.units, "en", "af")
+        results = db.translate_unit(u"Open files", "en", "af")
+        assert len(results) == 1
+        assert results[0]["source"] == u"Open files"
+
+    def test_index_ngram_filter(self):
+        """test that the n-gram filter does not change suggestions"""
+        db = self.get_tmdb(False)
+        db.add_list(self.units, "en", "af")
+        filtered = tmdb.TMDB(u":memory:", use_index=True, ngram_filter=True)
+        for unit in self.units:
+            expected = db.translate_unit(unit["source"], "en", "af")
+            assert filtered.translate_unit(unit["source"], "en", "af") == expected
+        assert filtered.index.pruned() > 0
+
+    def test_translate_units(self):
+        """test batch suggestions, with and without the index"""
+        db = self.get_tmdb(False)
+        db.add_list(self.units, "en", "af")
+        sources = [u"Open file", u"Close file", "Open file", u"Nothing like it"]
+        expected = [db.translate_unit(source, "en", "af") for source in sources]
+        assert db.translate_units(sources, "en", "af") == expected
+        indexed = tmdb.TMDB(u":memory:", use_index=True)
+        assert indexed.translate_units(sources, "en", "af") == expected
+        assert db.translate_units([], "en", "af") == []
+
+    def test_translate_units_langs(self):
+        """test batch suggestions from several source and target languages"""
+        db = self.get_tmdb(False)
+        db.add_list(self.units, "en", "af")
+        db.add_dict({"source": u"Open file!", "target": u"Maak lêer oop", "context": u""}, "en_ZA", "af")
+        db.add_dict({"source": u"Open file", "target": u"Ouvrir le fichier", "context": u""}, "en", "fr")
+        db.max_candidates = 10
+        results = db.translate_units([u"Open file"], ["en", "en_ZA"], ["af", "fr"])[0]
+        assert len(results) == 5
+        assert u"Open file!" in [result["source"] for result in results]
+        assert u"Ouvrir le fichier" in [result["target"] for result in results]
+
+    def test_length_groups(self):
+        """test that strings are only queried together if their length
+        windows overlap"""
+        db = self.get_tmdb(False)
+        sources = [u"Open", u"Open file", u"Open files", u"Save the current document"]
+        groups = list(db._length_groups(sources))
+        assert [sorted(group) for minlen, maxlen, group in groups] == [[u"Open"], [u"Open file", u"Open files"], [u"Save the current document"]]
+        for minlen, maxlen, group in groups:
+            for source in group:
+                assert minlen <= tmdb.min_levenshtein_length(len(source), db.min_similarity)
+                assert maxlen >= tmdb.max_levenshtein_length(len(source), db.min_similarity, db.max_length)
+
+    def test_add_bulk(self):
+        """test that a bulk import gives the same database as adding units
+        one by one"""
+        db = self.get_tmdb(False)
+        db.add_list(self.units[:2], "en", "af")
+        # duplicates in the input and in the database are skipped
+        assert db.add_bulk(self.units + self.units[:3], "en", "af", batch_size=2) == len(self.units) - 2
+        db.cursor.execute("SELECT COUNT(*) FROM sources")
+        assert db.cursor.fetchone() == (len(self.units),)
+        db.cursor.execute("SELECT COUNT(*) FROM targets")
+        assert db.cursor.fetchone() == (len(self.units),)
+        db.cursor.execute("SELECT name FROM sqlite_master WHERE name = 'targets_sid_idx'")
+        assert db.cursor.fetchone()
+        results = db.translate_unit(u"Open file", "en", "af")
+        assert sorted([result["source"] for result in results]) == [u"Open a file", u"Open file", u"Open files"]
+        if db.fulltext:
+            db.cursor.execute("SELECT COUNT(*) FROM fulltext")
+            assert db.cursor.fetchone() == (len(self.units),)
+            db.add_dict({"source": u"New file", "target": u"Nuwe lêer", "context": u""}, "en", "af")
+            db.cursor.execute("SELECT COUNT(*) FROM fulltext")
+            assert db.cursor.fetchone() == (len(self.units) + 1,)
+
+    def test_add_bulk_count(self):
+        """test that a bulk import returns the number of new translations"""
+        db = self.get_tmdb(False)
+        assert db.add_bulk([], "en", "af") == 0
+        assert db.add_bulk(self.units[:4], "en", "af", batch_size=2) == 4
+        assert db.add_bulk(self.units[:4], "en", "af", batch_size=2) == 0
+        assert db.add_bulk(self.units, "en", "af", batch_size=4) == len(self.units) - 4
+        assert db.add_bulk(self.units[:1], "en", "fr") == 1
+
+    def test_add_bulk_index(self):
+        """test that a bulk import updates the in-memory index"""
+        db = self.get_tmdb(True)
+        db.add_bulk(self.units, "en", "af")
+        assert db.index.count == len(self.units)
+        assert len(db.translate_unit(u"Open file", "en", "af")) == 3
@@ -75,3 +75,22 @@ class TestTMXfile(test_base.TestTranslationStore):
         assert tmxfile.translate('Five < ten') == 'Vyf < tien'
         assert xmltext.index('Five &lt; ten')
         assert xmltext.find('Five < ten') == -1
+
+    def test_iterfile(self):
+        """checks that streamed units match the parsed ones and are removed
+        from the document as we go"""
+        tmxfile = tmx.tmxfile()
+        tmxfile.addtranslation("Mail & News", "en", "Nuus & pos", "af")
+        tmxfile.addtranslation("First line\nSecond line", "en", "Eerste lyn\nTweede lyn", "af")
+        tmxsource = str(tmxfile)
+        units = tmx.tmxfile.iterfile(wStringIO.StringIO(tmxsource))
+        first = units.next()
+        assert first.source == "Mail & News"
+        assert first.target == "Nuus & pos"
+        assert first.xmlelement.getparent() is not None
+        second = units.next()
+        assert first.xmlelement.getparent() is None
+        assert second.source == "First line\nSecond line"
+        assert second.target == "Eerste lyn\nTweede lyn"
+        assert list(units) == []
+        assert first._store.getsourcelanguage() == "en"
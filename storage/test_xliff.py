@@ -4,6 +4,7 @@ from lxml import etree
 
 from translate.storage import xliff, lisa
 from translate.storage import test_base
+from translate.misc import wStringIO
 from translate.storage.placeables import StringElem
 from translate.storage.placeables.xliff import X, G
 
@@ -363,3 +364,28 @@ class TestXLIFFfile(test_base.TestTranslationStore):
                </trans-unit>'''
         xlifffile = xliff.xlifffile.parsestring(xlfsource)
         assert xlifffile.units[0].istranslatable()
+
+    def test_iterfile(self):
+        """checks that streamed units have the same content as parsed ones"""
+        xlfsource = self.skeleton \
+          % '''<group restype="x-gettext-plurals">
+                   <trans-unit id="1" approved="yes">
+                       <source>File</source>
+                       <target>L\xc3\xaaer</target>
+                       <note from="po-translator">A note</note>
+                   </trans-unit>
+               </group>
+               <trans-unit id="2">
+                   <source><![CDATA[<b>Bold</b>]]></source>
+               </trans-unit>'''
+        parsed = xliff.xlifffile.parsestring(xlfsource).units
+        streamed = []
+        for unit in xliff.xlifffile.iterfile(wStringIO.StringIO(xlfsource)):
+            streamed.append((unit.getid(), unit.source, unit.target,
+                             unit.getnotes(), unit.isfuzzy(), unit.getsourcelanguage()))
+        expected = [(unit.getid(), unit.source, unit.target,
+                     unit.getnotes(), unit.isfuzzy(), unit.getsourcelanguage())
+                    for unit in parsed]
+        assert streamed == expected
+        assert streamed[0][2] == u"L\xeaer"
+        assert streamed[1][1] == u"<b>Bold</b>"
@@ -21,6 +21,7 @@
 
 """Module to provide a translation memory database."""
 
+import heapq
 import logging
 import math
 import re
@@ -31,6 +32,7 @@ try:
 except ImportError:
     from pysqlite2 import dbapi2
 
+from translate.search import ngram
 from translate.search.lshtein import LevenshteinComparer
 from translate.lang import data
 
@@ -47,10 +49,122 @@ class LanguageError(Exception):
         return str(self.value)
 
 
+class CandidateIndex(object):
+    """An in-memory index of TM entries used to answer lookups without
+    querying the database.
+
+    Entries are grouped by (source language, target language) and bucketed
+    by the length of the source string, so that a lookup only visits the
+    buckets inside the length window allowed by the similarity cutoff. If
+    use_ngrams is true, a character n-gram index is also kept to skip
+    candidates that can not reach the cutoff."""
+
+    def __init__(self, use_ngrams=False):
+        self.use_ngrams = use_ngrams
+        # (source_lang, target_lang) -> (entries, buckets, ngramindex)
+        self._pairs = {}
+        self.count = 0
+
+    def add(self, source, target, context, source_lang, target_lang):
+        """adds a single TM entry to the index"""
+        pair = self._pairs.get((source_lang, target_lang))
+        if pair is None:
+            ngramindex = None
+            if self.use_ngrams:
+                ngramindex = ngram.NgramIndex()
+            pair = ([], {}, ngramindex)
+            self._pairs[(source_lang, target_lang)] = pair
+        entries, buckets, ngramindex = pair
+        key = len(entries)
+        entries.append((source, target, context))
+        buckets.setdefault(len(source), []).append(key)
+        if ngramindex is not None:
+            ngramindex.add(key, source)
+        self.count += 1
+
+    def pruned(self):
+        """returns the number of candidates skipped by the n-gram filter"""
+        return sum([pair[2].pruned for pair in self._pairs.itervalues()
+                    if pair[2] is not None])
+
+    def lookup(self, unit_source, source_langs, target_langs, comparer,
+               min_similarity, max_candidates, max_length):
+        """returns TM suggestions for unit_source, best first
+
+        The similarity cutoff is raised as soon as max_candidates suggestions
+        better than it are known, which in turn narrows the length window of
+        the buckets that remain to be considered."""
+        length = len(unit_source)
+        cutoff = min_similarity
+        minlen = min_levenshtein_length(length, cutoff)
+        maxlen = max_levenshtein_length(length, cutoff, max_length)
+        pairs = []
+        for source_lang in source_langs:
+            for target_lang in target_langs:
+                pair = self._pairs.get((source_lang, target_lang))
+                if pair is not None:
+                    entries, buckets, ngramindex = pair
+                    ngramquery = None
+                    if ngramindex is not None:
+                        # the window only narrows as the cutoff rises
+                        ngramquery = ngramindex.query(unit_source, comparer.MAX_LEN, minlen, maxlen)
+                    pairs.append((entries, buckets, ngramquery))
+        if not pairs:
+            return []
+
+        # heap of (quality, order, result), order keeps dicts from being compared
+        best = []
+        order = 0
+        # Lengths close to the query are likely to give the best matches, so
+        # we visit them first to let the cutoff rise early.
+        offset = 0
+        while length - offset >= minlen or length + offset <= maxlen:
+            if offset:
+                lengths = (length - offset, length + offset)
+            else:
+                lengths = (length,)
+            offset += 1
+            for bucketlength in lengths:
+                if bucketlength < minlen or bucketlength > maxlen:
+                    continue
+                for entries, buckets, ngramquery in pairs:
+                    keys = buckets.get(bucketlength, ())
+                    if ngramquery is not None:
+                        keys = [key for key in keys
+                                if ngramquery.possible(key, bucketlength, cutoff)]
+                    # the bucket is scored at once with the cutoff from
+                    # before, and checked against the raised cutoff below
+                    qualities = similarities(comparer, unit_source,
+                                             [entries[key][0] for key in keys], cutoff)
+                    for key, quality in zip(keys, qualities):
+                        source, target, context = entries[key]
+                        if quality < cutoff:
+                            continue
+                        if len(best) == max_candidates and quality <= best[0][0]:
+                            continue
+                        order -= 1
+                        result = {'source': source,
+                                  'target': target,
+                                  'context': context,
+                                  'quality': quality,
+                                 }
+                        if len(best) < max_candidates:
+                            heapq.heappush(best, (quality, order, result))
+                        else:
+                            heapq.heapreplace(best, (quality, order, result))
+                        if len(best) == max_candidates and best[0][0] > cutoff:
+                            cutoff = best[0][0]
+                            minlen = min_levenshtein_length(length, cutoff)
+                            maxlen = max_levenshtein_length(length, cutoff, max_length)
+        best.sort(reverse=True)
+        return [result for quality, order, result in best]
+
+
 class TMDB(object):
     _tm_dbs = {}
+    _tm_indices = {}
 
-    def __init__(self, db_file, max_candidates=3, min_similarity=75, max_length=1000):
+    def __init__(self, db_file, max_candidates=3, min_similarity=75, max_length=1000, use_index=False, ngram_filter=False):
 
         self.max_candidates = max_candidates
         self.min_similarity = min_similarity
@@ -71,7 +185,11 @@ class TMDB(object):
 
         self.comparer = LevenshteinComparer(self.max_length)
 
-        self.preload_db()
+        self.index = None
+        if use_index:
+            self.init_index(ngram_filter)
+        else:
+            self.preload_db()
 
     def _get_connection(self, index):
         current_thread = threading.currentThread()
@@ -190,6 +308,20 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
         logging.debug("tmdb has %d records" % numrows)
         return numrows
 
+    def init_index(self, ngram_filter=False):
+        """loads all TM entries into an in-memory L{CandidateIndex} that is
+        used instead of the database to answer translate_unit queries. The
+        index is shared by all instances using the same database file."""
+        if self.db_file not in self._tm_indices:
+            index = CandidateIndex(ngram_filter)
+            query = """SELECT s.text, t.text, s.context, s.lang, t.lang FROM sources s JOIN targets t ON s.sid = t.sid"""
+            self.cursor.execute(query)
+            for row in self.cursor:
+                index.add(*row)
+            logging.debug("tmdb index has %d records" % index.count)
+            self._tm_indices[self.db_file] = index
+        self.index = self._tm_indices[self.db_file]
+
     def add_unit(self, unit, source_lang=None, target_lang=None, commit=True):
         """inserts unit in the database"""
         #TODO: is that really the best way to handle unspecified
@@ -212,9 +344,11 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
         self.add_dict(unitdict, source_lang, target_lang, commit)
 
     def add_dict(self, unit, source_lang, target_lang, commit=True):
-        """inserts units represented as dictionaries in database"""
-        source_lang = data.normalize_code(source_lang)
-        target_lang = data.normalize_code(target_lang)
+        """inserts units represented as dictionaries in database. Their
+        "source_lang" and "target_lang" are used instead of source_lang and
+        target_lang if they are given."""
+        source_lang = data.normalize_code(unit.get("source_lang") or source_lang)
+        target_lang = data.normalize_code(unit.get("target_lang") or target_lang)
         try:
             try:
                 self.cursor.execute("INSERT INTO sources (text, context, lang, length) VALUES(?, ?, ?, ?)",
@@ -239,6 +373,9 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
                                      unit["target"],
                                      target_lang,
                                      int(time.time())))
+                if self.index is not None:
+                    self.index.add(unit["source"], unit["target"],
+                                   unit["context"], source_lang, target_lang)
             except dbapi2.IntegrityError:
                 # target string already exists in db, do nothing
                 pass
@@ -252,8 +389,12 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
 
     def add_store(self, store, source_lang, target_lang, commit=True):
         """insert all units in store in database"""
+        return self.add_units(store.units, source_lang, target_lang, commit)
+
+    def add_units(self, units, source_lang, target_lang, commit=True):
+        """insert all units from an iterable in database"""
         count = 0
-        for unit in store.units:
+        for unit in units:
             if unit.istranslatable() and unit.istranslated():
                 self.add_unit(unit, source_lang, target_lang, commit=False)
                 count += 1
@@ -272,20 +413,136 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
             self.connection.commit()
         return count
 
+    def _normalize_langs(self, langs):
+        """returns a list of normalized language codes"""
+        if not isinstance(langs, list):
+            langs = [langs]
+        return [data.normalize_code(lang) for lang in langs]
+
+    def add_bulk(self, units, source_lang, target_lang, batch_size=10000):
+        """insert many units represented as dictionaries into the database
+        as fast as possible
+
+        Sources are deduplicated in memory and inserted together with their
+        targets with executemany(). The fulltext triggers and the secondary
+        indices are dropped during the import and rebuilt once at the end,
+        and changes are committed every batch_size units.
+
+        Units can give their own languages as "source_lang" and
+        "target_lang", source_lang and target_lang are used otherwise.
+
+        @return: the number of new translations"""
+        codes = {}
+
+        def normalize(lang):
+            if lang not in codes:
+                codes[lang] = data.normalize_code(lang)
+            return codes[lang]
+        start_time = time.time()
+
+        # the sids of the sources in every language that was seen
+        sids = {}
+
+        def loadsids(lang):
+            sids[lang] = langsids = {}
+            self.cursor.execute("SELECT sid, text, context FROM sources WHERE lang=?", (lang,))
+            for sid, text, context in self.cursor:
+                langsids[(text, context)] = sid
+            return langsids
+        loadsids(normalize(source_lang))
+        self.cursor.execute("SELECT MAX(sid) FROM sources")
+        (last_sid,) = self.cursor.fetchone()
+        last_sid = last_sid or 0
+
+        script = """
+DROP TRIGGER IF EXISTS sources_insert_trig;
+DROP TRIGGER IF EXISTS sources_update_trig;
+DROP TRIGGER IF EXISTS sources_delete_trig;
+DROP INDEX IF EXISTS sources_context_idx;
+DROP INDEX IF EXISTS sources_lang_idx;
+DROP INDEX IF EXISTS sources_length_idx;
+DROP INDEX IF EXISTS targets_sid_idx;
+DROP INDEX IF EXISTS targets_lang_idx;
+DROP INDEX IF EXISTS targets_time_idx;
+"""
+        self.cursor.executescript(script)
+
+        count = 0
+        total = 0
+        now = int(time.time())
+        sources = []
+        targets = []
+        try:
+            for unit in units:
+                unit_source_lang = normalize(unit.get("source_lang") or source_lang)
+                unit_target_lang = normalize(unit.get("target_lang") or target_lang)
+                langsids = sids.get(unit_source_lang)
+                if langsids is None:
+                    langsids = loadsids(unit_source_lang)
+                key = (unit["source"], unit["context"])
+                sid = langsids.get(key)
+                if sid is None:
+                    last_sid += 1
+                    sid = langsids[key] = last_sid
+                    sources.append((sid, unit["source"], unit["context"], unit_source_lang, len(unit["source"])))
+                targets.append((sid, unit["target"], unit_target_lang, now))
+                if len(targets) >= batch_size:
+                    count += self._insert_bulk(sources, targets)
+                    total += len(targets)
+                    sources = []
+                    targets = []
+            count += self._insert_bulk(sources, targets)
+            total += len(targets)
+        finally:
+            # recreates the indices, fulltext triggers and index
+            self.init_database()
+            self.init_fulltext()
+
+        if self.index is not None:
+            del self._tm_indices[self.db_file]
+            self.init_index(self.index.use_ngrams)
+
+        elapsed = time.time() - start_time
+        logging.info("imported %d of %d units in %.1f seconds (%.0f units/s)",
+                     count, total, elapsed, total / max(elapsed, 0.001))
+        return count
+
+    def _insert_bulk(self, sources, targets):
+        """inserts a batch of new sources and their targets, returns the number
+        of new targets"""
+        if not targets:
+            return 0
+        try:
+            self.cursor.executemany("INSERT INTO sources (sid, text, context, lang, length) VALUES (?, ?, ?, ?, ?)", sources)
+            # rowcount isn't reliable after executemany(), so we count the
+            # changes of the connection
+            changes = self.connection.total_changes
+            self.cursor.executemany("INSERT OR IGNORE INTO targets (sid, text, lang, time) VALUES (?, ?, ?, ?)", targets)
+            count = self.connection.total_changes - changes
+            self.connection.commit()
+        except:
+            self.connection.rollback()
+            raise
+        return count
+
     def translate_unit(self, unit_source, source_langs, target_langs):
         """return TM suggestions for unit_source"""
         if isinstance(unit_source, str):
             unit_source = unicode(unit_source, "utf-8")
-        if isinstance(source_langs, list):
-            source_langs = [data.normalize_code(lang) for lang in source_langs]
-            source_langs = ','.join(source_langs)
-        else:
-            source_langs = data.normalize_code(source_langs)
-        if isinstance(target_langs, list):
-            target_langs = [data.normalize_code(lang) for lang in target_langs]
-            target_langs = ','.join(target_langs)
-        else:
-            target_langs = data.normalize_code(target_langs)
+        source_langs = self._normalize_langs(source_langs)
+        target_langs = self._normalize_langs(target_langs)
+
+        if self.index is not None:
+            results = self.index.lookup(unit_source, source_langs, target_langs,
+                                        self.comparer, self.min_similarity,
+                                        self.max_candidates, self.max_length)
+            if self.index.use_ngrams:
+                logging.debug("n-gram filter pruned %d candidates so far", self.index.pruned())
+            logging.debug("results: %s", unicode(results))
+            return results
+
+        source_langs = ','.join(source_langs)
+        target_langs = ','.join(target_langs)
 
         minlen = min_levenshtein_length(len(unit_source), self.min_similarity)
         maxlen = max_levenshtein_length(len(unit_source), self.min_similarity, self.max_length)
@@ -310,12 +567,14 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
             self.cursor.execute(query, (source_langs, target_langs, minlen, maxlen))
 
         results = []
-        for row in self.cursor:
+        rows = self.cursor.fetchall()
+        qualities = similarities(self.comparer, unit_source, [row[0] for row in rows], self.min_similarity)
+        for row, quality in zip(rows, qualities):
             result = {}
             result['source'] = row[0]
             result['target'] = row[1]
             result['context'] = row[2]
-            result['quality'] = self.comparer.similarity(unit_source, result['source'], self.min_similarity)
+            result['quality'] = quality
             if result['quality'] >= self.min_similarity:
                 results.append(result)
         results.sort(key=lambda match: match['quality'], reverse=True)
@@ -323,6 +582,91 @@ DROP TRIGGER IF EXISTS sources_delete_trig;
         logging.debug("results: %s", unicode(results))
         return results
 
+    def translate_units(self, unit_sources, source_langs, target_langs):
+        """return TM suggestions for every string in unit_sources
+
+        Identical strings are only looked up once. Without an in-memory index,
+        the strings are grouped by the length window allowed by the
+        similarity cutoff, and the candidates for every group are retrieved
+        from the database with a single query.
+
+        @return: a list with the list of suggestions for every source string,
+        in the same order as unit_sources"""
+        sources = []
+        for unit_source in unit_sources:
+            if isinstance(unit_source, str):
+                unit_source = unicode(unit_source, "utf-8")
+            sources.append(unit_source)
+        unique_sources = dict.fromkeys(sources).keys()
+        if not unique_sources:
+            return []
+        source_langs = self._normalize_langs(source_langs)
+        target_langs = self._normalize_langs(target_langs)
+
+        if self.index is not None:
+            groups = [(self.index, unique_sources)]
+        else:
+            groups = []
+            for minlen, maxlen, group in self._length_groups(unique_sources):
+                index = self._candidate_index(source_langs, target_langs, minlen, maxlen)
+                logging.debug("%d candidates for %d strings", index.count, len(group))
+                groups.append((index, group))
+
+        suggestions = {}
+        for index, group in groups:
+            for unit_source in group:
+                suggestions[unit_source] = index.lookup(unit_source, source_langs, target_langs,
+                                                        self.comparer, self.min_similarity,
+                                                        self.max_candidates, self.max_length)
+        return [suggestions[unit_source] for unit_source in sources]
+
+    def _length_groups(self, unit_sources):
+        """yields (minlen, maxlen, unit_sources) for groups of strings that
+        can share a query
+
+        All the length windows in a group have a length in common, so the
+        window of the group is never much wider than those of its strings."""
+        windows = {}
+        for unit_source in unit_sources:
+            length = len(unit_source)
+            window = (min_levenshtein_length(length, self.min_similarity),
+                      max_levenshtein_length(length, self.min_similarity, self.max_length))
+            windows.setdefault(window, []).append(unit_source)
+        group = []
+        for minlen, maxlen in sorted(windows):
+            # windows are sorted by minlen, so they all share the lengths
+            # from the last minlen up to the smallest maxlen
+            if group and minlen > common:
+                yield groupmin, groupmax, group
+                group = []
+            if not group:
+                groupmin, groupmax, common = minlen, maxlen, maxlen
+            common = min(common, maxlen)
+            groupmax = max(groupmax, maxlen)
+            group.extend(windows[(minlen, maxlen)])
+        yield groupmin, groupmax, group
+
+    def _candidate_index(self, source_langs, target_langs, minlen, maxlen):
+        """returns a L{CandidateIndex} of the database entries with a source
+        length between minlen and maxlen"""
+        query = """SELECT s.text, t.text, s.context, s.lang, t.lang FROM sources s JOIN targets t ON s.sid = t.sid
+        WHERE s.lang IN (%s) AND t.lang IN (%s)
+        AND s.length >= ? AND s.length <= ?""" % (",".join(["?"] * len(source_langs)),
+                                                  ",".join(["?"] * len(target_langs)))
+        self.cursor.execute(query, tuple(source_langs) + tuple(target_langs) + (minlen, maxlen))
+        index = CandidateIndex()
+        for row in self.cursor:
+            index.add(*row)
+        return index
+
+
+def similarities(comparer, unit_source, sources, min_similarity):
+    """returns the similarity of unit_source to each of the sources, in one
+    batch if the comparer supports it"""
+    if hasattr(comparer, "similarities"):
+        return comparer.similarities(unit_source, sources, min_similarity)
+    return [comparer.similarity(unit_source, source, min_similarity) for source in sources]
+
 
 def min_levenshtein_length(length, min_similarity):
     return math.ceil(max(length * (min_similarity/100.0), 2))
@@ -485,3 +485,7 @@ class tsfile(lisa.LISAfile):
         if not "<!DOCTYPE TS>" in output[:30]:
             output = "<!DOCTYPE TS>" + output
         return output
+
+    def serialize(self, out):
+        # the DOCTYPE fix above needs the start of the output
+        out.write(str(self))
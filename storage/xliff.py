@@ -735,6 +735,10 @@ class xlifffile(lisa.LISAfile):
         self.removedefaultfile()
         return super(xlifffile, self).__str__()
 
+    def serialize(self, out):
+        self.removedefaultfile()
+        super(xlifffile, self).serialize(out)
+
     def parsestring(cls, storestring):
         """Parses the string to return the correct file object"""
         xliff = super(xlifffile, cls).parsestring(storestring)
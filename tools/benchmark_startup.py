@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Measures how long it takes to import the module behind every command line
+tool in convert, filters and tools, each in a new interpreter, and compares
+it with the startup budget.
+
+The modules in L{DEFERRED} are slow to import and only needed by a few
+tools or options, so they should be imported where they are used. They are
+listed for every entry point that loads them anyway.
+
+Usage: benchmark_startup.py [-v] [entry point names...]
+
+With -v, the slowest modules imported by every entry point are listed too.
+Exits with status 1 if an entry point is over its budget.
+"""
+
+import os
+import sys
+
+STARTUP_BUDGET = 0.15
+"""The default time that importing an entry point may take, in seconds"""
+
+BUDGETS = {
+    # these need lxml for their main format
+    "odf2xliff": 0.3,
+    "xliff2odf": 0.3,
+    "build_tmdb": 0.2,
+}
+"""Budgets for entry points that differ from L{STARTUP_BUDGET}"""
+
+DEFERRED = ["Levenshtein", "enchant", "inspect", "multiprocessing",
+            "urllib", "lxml"]
+"""Modules that a simple run of a tool shouldn't need"""
+
+PACKAGES = ["convert", "filters", "tools"]
+REPEAT = 3
+
+# Run in the new interpreter: times the import with a hook on __import__ that
+# records the time spent in every module, without its submodules.
+_profiler = r"""
+import sys, time, __builtin__
+original = __builtin__.__import__
+times = {}
+stack = [0.0]
+def profiled(name, *args, **kwargs):
+    before = len(sys.modules)
+    stack.append(0.0)
+    start = time.time()
+    try:
+        return original(name, *args, **kwargs)
+    finally:
+        elapsed = time.time() - start
+        inner = stack.pop()
+        stack[-1] += elapsed
+        if len(sys.modules) != before:
+            times[name] = times.get(name, 0.0) + elapsed - inner
+__builtin__.__import__ = profiled
+start = time.time()
+__import__(sys.argv[1])
+total = time.time() - start
+__builtin__.__import__ = original
+print repr((total, times, sys.modules.keys()))
+"""
+
+
+def entrypoints(packages=PACKAGES):
+    """Returns the (name, module) of every command line script in the given
+    packages of the toolkit"""
+    basedir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    found = []
+    for package in packages:
+        packagedir = os.path.join(basedir, package)
+        for name in os.listdir(packagedir):
+            if os.path.splitext(name)[1] or name.upper() == name:
+                continue
+            if os.path.isfile(os.path.join(packagedir, name + ".py")):
+                found.append((name, "translate.%s.%s" % (package, name)))
+    found.sort()
+    return found
+
+
+def measure(module):
+    """Imports module in a new interpreter, and returns the time it took, a
+    dictionary with the time spent in every imported module and the list of
+    loaded modules"""
+    import subprocess
+    process = subprocess.Popen([sys.executable, "-c", _profiler, module],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, errors = process.communicate()
+    if process.returncode:
+        raise ImportError("Could not import %s:\n%s" % (module, errors))
+    return eval(output.strip().splitlines()[-1])
+
+
+def deferred(modules):
+    """Returns the modules in L{DEFERRED} that are in the given list"""
+    loaded = dict.fromkeys([module.split(".")[0] for module in modules])
+    return [module for module in DEFERRED if module in loaded]
+
+
+def main():
+    args = sys.argv[1:]
+    verbose = "-v" in args
+    names = [arg for arg in args if arg != "-v"]
+    overbudget = []
+    for name, module in entrypoints():
+        if names and name not in names:
+            continue
+        try:
+            results = [measure(module) for i in range(REPEAT)]
+        except ImportError, e:
+            print "%-16s %s" % (name, str(e).splitlines()[-1])
+            continue
+        results.sort()
+        total, times, modules = results[0]
+        budget = BUDGETS.get(name, STARTUP_BUDGET)
+        status = "ok"
+        if total > budget:
+            status = "OVER"
+            overbudget.append(name)
+        print "%-16s %6.3fs of %.2fs %-4s %4d modules  %s" % \
+              (name, total, budget, status, len(modules), " ".join(deferred(modules)))
+        if verbose:
+            slowest = [(spent, imported) for imported, spent in times.iteritems()]
+            slowest.sort()
+            slowest.reverse()
+            for spent, imported in slowest[:5]:
+                print "    %6.3fs %s" % (spent, imported)
+    if overbudget:
+        print "over budget: %s" % ", ".join(overbudget)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
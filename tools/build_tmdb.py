@@ -23,6 +23,7 @@
 import os
 from optparse import OptionParser
 import sys
+import time
 
 from translate.storage import factory
 from translate.storage import tmdb
@@ -30,48 +31,75 @@ from translate.storage import tmdb
 
 class Builder:
 
-    def __init__(self, tmdbfile, source_lang, target_lang, filenames):
+    def __init__(self, tmdbfile, source_lang, target_lang, filenames, bulk=True):
         self.tmdb = tmdb.TMDB(tmdbfile)
         self.source_lang = source_lang
         self.target_lang = target_lang
 
+        if bulk:
+            start_time = time.time()
+            count = self.tmdb.add_bulk(self.iterunits(filenames),
+                                       self.source_lang, self.target_lang)
+            elapsed = max(time.time() - start_time, 0.001)
+            print "Added %d units in %.1f seconds (%.0f units/s)" % (count, elapsed, count / elapsed)
+        else:
+            for unit in self.iterunits(filenames):
+                try:
+                    self.tmdb.add_dict(unit, self.source_lang, self.target_lang, commit=False)
+                except Exception, e:
+                    print >> sys.stderr, "cannot add %r: %s" % (unit["source"], e)
+            self.tmdb.connection.commit()
+
+    def iterunits(self, filenames):
+        """yields the translated units in all files as dictionaries"""
         for filename in filenames:
             if not os.path.exists(filename):
                 print >> sys.stderr, "cannot process %s: does not exist" % filename
                 continue
             elif os.path.isdir(filename):
-                self.handledir(filename)
+                for unit in self.handledir(filename):
+                    yield unit
             else:
-                self.handlefile(filename)
-        self.tmdb.connection.commit()
+                for unit in self.handlefile(filename):
+                    yield unit
 
     def handlefile(self, filename):
+        # the file is parsed while its units are read, so parse errors are
+        # only raised in the loop
         try:
-            store = factory.getobject(filename)
+            for unit in factory.iterunits(filename):
+                if unit.istranslatable() and unit.istranslated():
+                    # bytestrings that sqlite would refuse in the middle of a
+                    # bulk insert fail here, for this file only
+                    yield {"source": unicode(unit.source),
+                           "target": unicode(unit.target),
+                           "context": unit.getcontext(),
+                           # the languages of the options are used if these
+                           # are None
+                           "source_lang": unit.getsourcelanguage(),
+                           "target_lang": unit.gettargetlanguage(),
+                          }
         except Exception, e:
-            print >> sys.stderr, str(e)
+            print >> sys.stderr, "cannot process %s: %s" % (filename, e)
             return
-        # do something useful with the store and db
-        try:
-            self.tmdb.add_store(store, self.source_lang, self.target_lang, commit=False)
-        except Exception, e:
-            print e
         print "File added:", filename
 
     def handlefiles(self, dirname, filenames):
         for filename in filenames:
             pathname = os.path.join(dirname, filename)
             if os.path.isdir(pathname):
-                self.handledir(pathname)
+                units = self.handledir(pathname)
             else:
-                self.handlefile(pathname)
+                units = self.handlefile(pathname)
+            for unit in units:
+                yield unit
 
     def handledir(self, dirname):
         path, name = os.path.split(dirname)
         if name in ["CVS", ".svn", "_darcs", ".git", ".hg", ".bzr"]:
-            return
+            return iter(())
         entries = os.listdir(dirname)
-        self.handlefiles(dirname, entries)
+        return self.handlefiles(dirname, entries)
 
 
 def main():
@@ -90,6 +118,9 @@ def main():
     parser.add_option(
         "-t", "--import-target-lang", dest="target_lang",
         help="target language of translation files")
+    parser.add_option(
+        "--no-bulk", dest="bulk", action="store_false", default=True,
+        help="add units one by one instead of using the faster bulk import")
     (options, args) = parser.parse_args()
 
     if not options.target_lang:
@@ -98,7 +129,8 @@ def main():
     if len(args) < 1:
         parser.error('No input file(s) specified.')
 
-    Builder(options.tmdb_file, options.source_lang, options.target_lang, args)
+    Builder(options.tmdb_file, options.source_lang, options.target_lang, args,
+            options.bulk)
 
 if __name__ == '__main__':
     main()
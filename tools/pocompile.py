@@ -37,6 +37,10 @@ def _do_msgidcomment(string):
 class POCompile:
 
     def convertstore(self, inputfile, includefuzzy=False):
+        return str(self.compilestore(inputfile, includefuzzy))
+
+    def compilestore(self, inputfile, includefuzzy=False):
+        """returns an mofile with the translated units of inputfile"""
         outputfile = mo.mofile()
         for unit in inputfile.units:
             if unit.istranslated() or (unit.isfuzzy() and includefuzzy and unit.target) or unit.isheader():
@@ -55,7 +59,7 @@ class POCompile:
                         mounit.msgctxt = [context]
                 mounit.target = unit.target
                 outputfile.addunit(mounit)
-        return str(outputfile)
+        return outputfile
 
 
 def convertmo(inputfile, outputfile, templatefile, includefuzzy=False):
@@ -65,12 +69,12 @@ def convertmo(inputfile, outputfile, templatefile, includefuzzy=False):
     if inputstore.isempty():
         return 0
     convertor = POCompile()
-    outputmo = convertor.convertstore(inputstore, includefuzzy)
+    outputmo = convertor.compilestore(inputstore, includefuzzy)
     # We have to make sure that we write the files in binary mode, therefore we
     # reopen the file accordingly
     outputfile.close()
     outputfile = open(outputfile.name, 'wb')
-    outputfile.write(outputmo)
+    outputmo.serialize(outputfile)
     return 1
 
 
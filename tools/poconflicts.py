@@ -36,6 +36,9 @@ from translate.misc import optrecurse
 class ConflictOptionParser(optrecurse.RecursiveOptionParser):
     """a specialized Option Parser for the conflict tool..."""
 
+    def setjobsoption(self):
+        """conflicts are found across all the input files, so there is no option to use several processes"""
+
     def parse_args(self, args=None, values=None):
         """parses the command line options, handling implicit input/output args"""
         (options, args) = optrecurse.optparse.OptionParser.parse_args(self, args, values)
@@ -36,6 +36,9 @@ from translate.misc import optrecurse
 class SplitOptionParser(optrecurse.RecursiveOptionParser):
     """a specialized Option Parser for posplit"""
 
+    def setjobsoption(self):
+        """all the entries are collected before they are written, so there is no option to use several processes"""
+
     def parse_args(self, args=None, values=None):
         """parses the command line options, handling implicit input/output args"""
         (options, args) = optrecurse.RecursiveOptionParser.parse_args(self, args, values)
@@ -333,6 +333,9 @@ class TerminologyExtractor(object):
 class TerminologyOptionParser(optrecurse.RecursiveOptionParser):
     """a specialized Option Parser for the terminology tool..."""
 
+    def setjobsoption(self):
+        """terms are extracted from all the input files together, so there is no option to use several processes"""
+
     def parse_args(self, args=None, values=None):
         """parses the command line options, handling implicit input/output args"""
         (options, args) = optrecurse.optparse.OptionParser.parse_args(self, args, values)
@@ -22,35 +22,51 @@
 translation memory and existing translations.
 """
 
+import os
+
 from translate.storage import factory
-from translate.storage import xliff, po
+from translate.storage import po
+from translate.search import compiledtm
 from translate.search import match
 
 # We don't want to reinitialise the TM each time, so let's store it here.
 tmmatcher = None
 
+# The matchers used by worker processes for parallel fuzzy matching. Workers
+# inherit them when they are forked, so they never need to be pickled.
+_worker_matchers = None
+
+
+def _gettmstore(tmfile):
+    """Returns a compiled TM or parsed store for tmfile"""
+    if compiledtm.iscompiledtm(tmfile):
+        return compiledtm.CompiledTM(tmfile)
+    return factory.getobject(tmfile)
+
 
 def memory(tmfiles, max_candidates=1, min_similarity=75, max_length=1000):
-    """Returns the TM store to use. Only initialises on first call."""
+    """Returns the TM store to use. Only initialises on first call.
+    Compiled translation memories (see L{translate.tools.tmcompile}) are
+    used without parsing."""
     global tmmatcher
     # Only initialise first time
     if tmmatcher is None:
         if isinstance(tmfiles, list):
-            tmstore = [factory.getobject(tmfile) for tmfile in tmfiles]
+            tmstore = [_gettmstore(tmfile) for tmfile in tmfiles]
         else:
-            tmstore = factory.getobject(tmfiles)
+            tmstore = _gettmstore(tmfiles)
         tmmatcher = match.matcher(tmstore, max_candidates=max_candidates, min_similarity=min_similarity, max_length=max_length)
     return tmmatcher
 
 
-def pretranslate_file(input_file, output_file, template_file, tm=None, min_similarity=75, fuzzymatching=True):
+def pretranslate_file(input_file, output_file, template_file, tm=None, min_similarity=75, fuzzymatching=True, jobs=1):
     """Pretranslate any factory supported file with old translations and translation memory."""
     input_store = factory.getobject(input_file)
     template_store = None
     if template_file is not None:
         template_store = factory.getobject(template_file)
 
-    output = pretranslate_store(input_store, template_store, tm, min_similarity, fuzzymatching)
+    output = pretranslate_store(input_store, template_store, tm, min_similarity, fuzzymatching, jobs)
     output_file.write(str(output))
     return 1
 
@@ -81,7 +97,7 @@ def match_source(input_unit, template_store):
     """Returns a matching unit from a template. matching based on unit id"""
     # hack for weird mozilla single letter strings, we don't want to
     # match them by anything but locations
-    if len(input_unit.source) > 1:
+    if template_store and len(input_unit.source) > 1:
         matching_unit = template_store.findunit(input_unit.source)
         return matching_unit
 
@@ -93,17 +109,94 @@ def match_fuzzy(input_unit, matchers):
             return fuzzycandidates[0]
 
 
-def pretranslate_unit(input_unit, template_store, matchers=None, mark_reused=False, match_locations=False):
-    """Pretranslate a unit or return unchanged if no translation was found."""
-
-    matching_unit = None
-    #do template matching
+def match_template(input_unit, template_store, match_locations=False):
+    """Returns a matching unit from a template, based on locations or unit id"""
     if template_store:
         if match_locations:
-            matching_unit = match_template_location(input_unit, template_store)
+            return match_template_location(input_unit, template_store)
         else:
-            matching_unit = match_template_id(input_unit, template_store)
+            return match_template_id(input_unit, template_store)
+
+
+class precomputedmatcher(object):
+    """Stands in for a queue of matchers with fuzzy matches that were
+    calculated in advance. Text that was not calculated in advance is passed
+    on to the real matchers."""
+
+    def __init__(self, results, matchers):
+        self.results = results
+        self.matchers = matchers
+
+    def matches(self, text):
+        key = unicode(text)
+        if key in self.results:
+            result = self.results[key]
+            if result is None:
+                return []
+            return [result]
+        for matcher in self.matchers:
+            fuzzycandidates = matcher.matches(text)
+            if fuzzycandidates:
+                return fuzzycandidates
+        return []
+
+
+def _match_fuzzy_worker(source):
+    """Returns the best fuzzy match for source from the inherited matchers"""
+    for matcher in _worker_matchers:
+        fuzzycandidates = matcher.matches(source)
+        if fuzzycandidates:
+            return fuzzycandidates[0]
+
+
+def parallel_matchers(units, template_store, matchers, match_locations=False, jobs=1):
+    """Returns matchers that answer from fuzzy matches calculated in advance
+    by jobs worker processes for all units that will need fuzzy matching.
+
+    The matchers are built once in this process and shared with the forked
+    workers. Fuzzy matching only depends on the main source string, so the
+    results are the same as from the serial run. If the platform can't fork,
+    the given matchers are returned unchanged."""
+    global _worker_matchers
+    if jobs <= 1 or not matchers or not hasattr(os, "fork"):
+        return matchers
+    try:
+        import multiprocessing
+    except ImportError:
+        return matchers
+
+    sources = {}
+    for input_unit in units:
+        if not input_unit.istranslatable():
+            continue
+        matching_unit = match_template(input_unit, template_store, match_locations)
+        if matching_unit and matching_unit.gettargetlen() > 0:
+            continue
+        if template_store:
+            matching_unit = match_source(input_unit, template_store)
+            if matching_unit and matching_unit.gettargetlen():
+                continue
+        sources[unicode(input_unit.source)] = True
+    sources = sources.keys()
+    if not sources:
+        return matchers
+
+    _worker_matchers = matchers
+    pool = multiprocessing.Pool(jobs)
+    try:
+        results = pool.map(_match_fuzzy_worker, sources, max(1, len(sources) // (jobs * 4)))
+    finally:
+        pool.close()
+        pool.join()
+        _worker_matchers = None
+    return [precomputedmatcher(dict(zip(sources, results)), matchers)]
+
 
+def pretranslate_unit(input_unit, template_store, matchers=None, mark_reused=False, match_locations=False):
+    """Pretranslate a unit or return unchanged if no translation was found."""
+
+    #do template matching
+    matching_unit = match_template(input_unit, template_store, match_locations)
 
     if matching_unit and matching_unit.gettargetlen() > 0:
         input_unit.merge(matching_unit, authoritative=True)
@@ -116,6 +209,8 @@ def pretranslate_unit(input_unit, template_store, matchers=None, mark_reused=Fal
             matching_unit = match_fuzzy(input_unit, matchers)
 
         if matching_unit and matching_unit.gettargetlen() > 0:
+            # imported here so that PO runs don't load lxml
+            from translate.storage import xliff
             #FIXME: should we dispatch here instead of this crude type check
             if isinstance(input_unit, xliff.xliffunit):
                 #FIXME: what about origin, lang and matchquality
@@ -132,8 +227,9 @@ def pretranslate_unit(input_unit, template_store, matchers=None, mark_reused=Fal
 
     return input_unit
 
-def pretranslate_store(input_store, template_store, tm=None, min_similarity=75, fuzzymatching=True):
-    """Do the actual pretranslation of a whole store."""
+def pretranslate_store(input_store, template_store, tm=None, min_similarity=75, fuzzymatching=True, jobs=1):
+    """Do the actual pretranslation of a whole store. With jobs > 1 the fuzzy
+    matching is spread over that many processes."""
     #preperation
     matchers = []
     #prepare template
@@ -161,6 +257,7 @@ def pretranslate_store(input_store, template_store, tm=None, min_similarity=75,
 
     #main loop
     match_locations = isinstance(input_store, po.pofile) and input_store.parseheader().get('X-Accelerator-Marker') in ('&', '~')
+    matchers = parallel_matchers(input_store.units, template_store, matchers, match_locations, jobs)
     for input_unit in input_store.units:
         if  input_unit.istranslatable():
             input_unit = pretranslate_unit(input_unit, template_store, matchers, match_locations=match_locations)
@@ -186,6 +283,8 @@ def main(argv=None):
     parser.add_option("--nofuzzymatching", dest="fuzzymatching", action="store_false",
         default=True, help="Disable fuzzy matching")
     parser.passthrough.append("fuzzymatching")
+    # a single file is fuzzy matched with --jobs processes
+    parser.passthrough.append("jobs")
     parser.run(argv)
 
 
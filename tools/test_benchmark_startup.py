@@ -0,0 +1,22 @@
+#!/usr/bin/env python
+
+from translate.tools import benchmark_startup
+
+
+def test_entrypoints():
+    """Tests that the command line tools are found"""
+    entrypoints = dict(benchmark_startup.entrypoints())
+    assert entrypoints["pocount"] == "translate.tools.pocount"
+    assert entrypoints["pofilter"] == "translate.filters.pofilter"
+    assert entrypoints["po2csv"] == "translate.convert.po2csv"
+    assert "TODO" not in entrypoints
+
+
+def test_deferred():
+    """Tests that simple tools don't import the slow modules that they don't
+    need"""
+    for module in ["translate.tools.pocount", "translate.filters.pofilter",
+                   "translate.convert.po2csv", "translate.convert.pot2po"]:
+        total, times, modules = benchmark_startup.measure(module)
+        assert module in modules
+        assert benchmark_startup.deferred(modules) == []
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+from translate.tools import build_tmdb
+
+goodpo = '''msgid "File"
+msgstr "Lêer"
+'''
+
+brokenxliff = '''<?xml version="1.0" encoding="utf-8"?>
+<xliff version="1.1" xmlns="urn:oasis:names:tc:xliff:document:1.1">
+<file original="doc.txt" source-language="en-US"><body>
+<trans-unit id="1"><source>Edit</source><target>Wysig</target></trans-unit>
+<trans-unit id="2"><source>View
+'''
+
+germanxliff = '''<?xml version="1.0" encoding="utf-8"?>
+<xliff version="1.1" xmlns="urn:oasis:names:tc:xliff:document:1.1">
+<file original="doc.txt" source-language="en-US" target-language="de"><body>
+<trans-unit id="1" approved="yes"><source>Edit</source><target>Bearbeiten</target></trans-unit>
+</body></file></xliff>
+'''
+
+
+class TestBuildTMDB:
+
+    def setup_method(self, method):
+        self.path = os.path.realpath("%s_%s" % (self.__class__.__name__, method.__name__))
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.makedirs(self.path)
+
+    def teardown_method(self, method):
+        shutil.rmtree(self.path)
+
+    def write_file(self, name, contents):
+        filename = os.path.join(self.path, name)
+        storefile = open(filename, "w")
+        storefile.write(contents)
+        storefile.close()
+        return filename
+
+    def build(self, filenames, bulk=True):
+        tmdbfile = os.path.join(self.path, "tm.db")
+        builder = build_tmdb.Builder(tmdbfile, "en", "af", filenames, bulk)
+        builder.tmdb.cursor.execute("SELECT text FROM sources ORDER BY text")
+        return [text for (text,) in builder.tmdb.cursor.fetchall()]
+
+    def test_broken_file(self):
+        """Tests that a file that can't be parsed is skipped"""
+        filenames = [self.write_file("broken.xlf", brokenxliff),
+                     self.write_file("good.po", goodpo)]
+        assert u"File" in self.build(filenames)
+        assert u"File" in self.build(filenames, bulk=False)
+
+    def test_languages(self):
+        """Tests that units are filed under their own languages, or those of
+        the options if they have none"""
+        filenames = [self.write_file("de.xlf", germanxliff),
+                     self.write_file("good.po", goodpo)]
+        for bulk in (True, False):
+            tmdbfile = os.path.join(self.path, "tm%d.db" % bulk)
+            builder = build_tmdb.Builder(tmdbfile, "en", "af", filenames, bulk)
+            builder.tmdb.cursor.execute("""SELECT s.text, s.lang, t.lang FROM sources s
+                JOIN targets t ON s.sid = t.sid ORDER BY s.text""")
+            assert builder.tmdb.cursor.fetchall() == [(u"Edit", u"en-us", u"de"), (u"File", u"en", u"af")]
+
+    def test_add_error(self):
+        """Tests that units that can't be added are skipped"""
+        filenames = [self.write_file("good.po", goodpo + '\nmsgid "Edit"\nmsgstr "Wysig"\n')]
+        add_dict = build_tmdb.tmdb.TMDB.add_dict
+
+        def failing_add_dict(tmdb, unit, *args, **kwargs):
+            if unit["source"] == u"Edit":
+                raise ValueError("can't add")
+            return add_dict(tmdb, unit, *args, **kwargs)
+        build_tmdb.tmdb.TMDB.add_dict = failing_add_dict
+        try:
+            assert self.build(filenames, bulk=False) == [u"File"]
+        finally:
+            build_tmdb.tmdb.TMDB.add_dict = add_dict
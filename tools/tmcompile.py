@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright 2010 Zuza Software Foundation
+#
+# This file is part of the Translate Toolkit.
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, see <http://www.gnu.org/licenses/>.
+
+"""Compile translation files into a binary translation memory that
+pretranslate and pot2po can load without parsing (see
+L{translate.search.compiledtm})."""
+
+import os
+from optparse import OptionParser
+import sys
+
+from translate.search import compiledtm
+from translate.search import match
+from translate.storage import factory
+
+
+class Compiler:
+
+    def __init__(self, filenames, usefuzzy=False):
+        self.stores = []
+        for filename in filenames:
+            if not os.path.exists(filename):
+                print >> sys.stderr, "cannot process %s: does not exist" % filename
+                continue
+            elif os.path.isdir(filename):
+                self.handledir(filename)
+            else:
+                self.handlefile(filename)
+        # the matcher applies the same filtering as when it loads the files
+        self.matcher = match.matcher(self.stores, usefuzzy=usefuzzy)
+
+    def handlefile(self, filename):
+        try:
+            store = factory.getobject(filename)
+        except Exception, e:
+            print >> sys.stderr, str(e)
+            return
+        self.stores.append(store)
+
+    def handlefiles(self, dirname, filenames):
+        for filename in filenames:
+            pathname = os.path.join(dirname, filename)
+            if os.path.isdir(pathname):
+                self.handledir(pathname)
+            else:
+                self.handlefile(pathname)
+
+    def handledir(self, dirname):
+        path, name = os.path.split(dirname)
+        if name in ["CVS", ".svn", "_darcs", ".git", ".hg", ".bzr"]:
+            return
+        entries = os.listdir(dirname)
+        self.handlefiles(dirname, entries)
+
+    def write(self, filename):
+        tmfile = open(filename, "wb")
+        try:
+            compiledtm.writetm(self.matcher.candidates.units, tmfile)
+        finally:
+            tmfile.close()
+        return len(self.matcher.candidates.units)
+
+
+def main():
+    parser = OptionParser(usage="%prog [options] <input files>")
+    parser.add_option(
+        "-o", "--output", dest="output", default="tm.ctm",
+        help="compiled translation memory file (default: tm.ctm)")
+    parser.add_option(
+        "--fuzzy", dest="usefuzzy", action="store_true", default=False,
+        help="also use fuzzy translations")
+    (options, args) = parser.parse_args()
+
+    if len(args) < 1:
+        parser.error('No input file(s) specified.')
+
+    compiler = Compiler(args, options.usefuzzy)
+    count = compiler.write(options.output)
+    print "%d units written to %s" % (count, options.output)
+
+if __name__ == '__main__':
+    main()